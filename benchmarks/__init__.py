@@ -0,0 +1,7 @@
+# -----------------------------------------------------------
+# Benchmarks dos caminhos quentes do app
+# -----------------------------------------------------------
+# python -m benchmarks [--pecas 100000] [--clientes 5000] [--repeticoes 20] ...
+# Gera um conjunto de dados sintético em uma pasta temporária, mede cada
+# caminho (p50/p95 e pico de memória) e imprime uma tabela. Nada aqui é
+# importado pelo app.
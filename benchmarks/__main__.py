@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks.dados import RAIZ, gerar_dados
+from benchmarks.github_falso import REPOSITORIO, USUARIO, iniciar_servidor
+from benchmarks.medicao import formatar_tabela, medir
+
+# -----------------------------------------------------------
+# python -m benchmarks
+# -----------------------------------------------------------
+# Roda a partir da raiz do repositório. Os dados sintéticos ficam em uma
+# pasta temporária (ou em --pasta, reaproveitada entre execuções), que
+# vira a pasta de trabalho: o app usa caminhos relativos.
+
+
+def _argumentos():
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos quentes do app.")
+    parser.add_argument("--pecas", type=int, default=100_000)
+    parser.add_argument("--clientes", type=int, default=5_000)
+    parser.add_argument("--pecas-por-cliente", type=int, default=200)
+    parser.add_argument("--imagens", type=int, default=50)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--repeticoes-render", type=int, default=3,
+                        help="repetições das medições com AppTest (bem mais lentas)")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--pasta", help="pasta dos dados (gerados só se ainda não existirem)")
+    parser.add_argument("--so", help="mede só os caminhos cujo nome contém um destes termos (separados por vírgula)")
+    parser.add_argument("--json", dest="saida_json", help="grava os resultados também neste arquivo")
+    return parser.parse_args()
+
+
+def _preparar_pasta(args):
+    """Cria (se preciso) os dados e entra na pasta deles."""
+    pasta = os.path.abspath(args.pasta) if args.pasta else tempfile.mkdtemp(prefix="bench_reposicao_")
+    temporaria = not args.pasta
+    os.makedirs(pasta, exist_ok=True)
+    os.chdir(pasta)
+    if os.path.exists(os.path.join("database", "database.json")):
+        print(f"usando dados existentes em {pasta}")
+    else:
+        inicio = time.perf_counter()
+        resumo = gerar_dados(".", args.pecas, args.clientes, args.pecas_por_cliente, args.imagens)
+        print(f"dados gerados em {pasta} ({time.perf_counter() - inicio:.1f}s): {resumo['pecas']} peças "
+              f"({resumo['database_mb']:.1f} MB), {resumo['clientes']} clientes, {resumo['imagens']} imagens")
+    return pasta, temporaria
+
+
+def _segredos(porta, backend):
+    return {
+        "ADMIN_PASSWORD": "benchmark",
+        "GITHUB_TOKEN": "benchmark",
+        "GITHUB_USER": USUARIO,
+        "GITHUB_REPO": REPOSITORIO,
+        "GITHUB_API_URL": f"http://127.0.0.1:{porta}",
+        "ARMAZENAMENTO": backend,
+    }
+
+
+def _gravar_segredos(segredos):
+    os.makedirs(".streamlit", exist_ok=True)
+    with open(os.path.join(".streamlit", "secrets.toml"), "w", encoding="utf-8") as f:
+        for chave, valor in segredos.items():
+            f.write(f"{chave} = {json.dumps(valor)}\n")
+
+
+def _casos(args, segredos, estado):
+    # importados só depois do chdir para a pasta de dados
+    from streamlit.testing.v1 import AppTest
+
+    import utils.armazenamento as armazenamento_mod
+    import utils.clients as clients_mod
+    import utils.resolucao as resolucao_mod
+    import utils.retentativas as retentativas_mod
+    from utils.armazenamento import obter_armazenamento
+    from utils.clients import INDICE_FILE, carregar_cliente_por_slug, listar_resumos
+    from utils.colunar import caminho_colunar
+    from utils.github import publicar_arquivos
+    from utils.importDatabase import carregar_database, invalidar_cache_database
+    from utils.resolucao import resolver_pecas
+
+    rng = random.Random(7)
+    slugs = [f"cliente_{i:05d}" for i in range(args.clientes)]
+
+    def database_frio():
+        with armazenamento_mod._backend_lock:
+            armazenamento_mod._backend["instancia"] = None
+        invalidar_cache_database()
+
+    def database_frio_sem_colunar():
+        database_frio()
+        colunar = caminho_colunar("database/database.json")
+        if os.path.exists(colunar):
+            os.remove(colunar)
+
+    def indice_clientes_frio():
+        if os.path.exists(INDICE_FILE):
+            os.remove(INDICE_FILE)
+        with clients_mod._indice_lock:
+            clients_mod._indice_cache.update({"chave": None, "indice": None, "por_slug": None})
+
+    def resolucao_fria():
+        with resolucao_mod._cache_lock:
+            resolucao_mod._cache.clear()
+
+    catalogo = {"dados": None}
+
+    def escolher_catalogo():
+        slug = rng.choice(slugs)
+        catalogo["dados"] = carregar_cliente_por_slug(slug)
+        catalogo["slug"] = slug
+
+    def app(script, **query):
+        at = AppTest.from_file(os.path.join(RAIZ, script), default_timeout=300)
+        for chave, valor in segredos.items():
+            at.secrets[chave] = valor
+        for chave, valor in query.items():
+            at.query_params[chave] = valor
+        at.run()
+        if at.exception:
+            raise RuntimeError(f"{script}: {at.exception[0].value}")
+
+    contador = {"n": 0}
+
+    def salvar_peca():
+        contador["n"] += 1
+        codigo = f"B{rng.randrange(args.pecas):06d}"
+        peca = dict(obter_armazenamento().obter_produto(codigo))
+        peca["descricao"] = f"{peca['descricao']} rev{contador['n']}"
+        obter_armazenamento().upsert_produto(peca)
+
+    def publicar_database():
+        obter_armazenamento().exportar(["database/database.json"])
+        resp = publicar_arquivos([("database/database.json", "database/database.json")], "benchmark")
+        if resp.status_code not in (200, 201):
+            raise RuntimeError(resp.text)
+
+    def salvar_e_publicar_catalogo():
+        contador["n"] += 1
+        slug = rng.choice(slugs)
+        caminho = os.path.join("clientes", f"{slug}.json")
+        dados = obter_armazenamento().carregar_catalogo(caminho)
+        dados["contato"] = f"+55{contador['n']:011d}"
+        obter_armazenamento().salvar_catalogo(caminho, dados)
+        resp = publicar_arquivos([(caminho, f"clientes/{slug}.json")], "benchmark")
+        if resp.status_code not in (200, 201):
+            raise RuntimeError(resp.text)
+
+    def pecas_de_uma_sessao():
+        # o que a página Criar Catálogo guarda em session_state.pecas_cliente
+        # para um catálogo do tamanho de --pecas-por-cliente
+        pecas_bd = carregar_database()
+        return [pecas_bd.get(f"B{rng.randrange(args.pecas):06d}") for _ in range(args.pecas_por_cliente)]
+
+    def injetar_falhas():
+        # um 502 no envio do blob e um 429 na criação da árvore a cada publicação
+        salvar_peca()
+        # mede o custo das novas tentativas, não o orçamento se esgotando
+        with retentativas_mod._lock:
+            retentativas_mod._estado["fichas"] = float(retentativas_mod.ORCAMENTO_MAXIMO)
+        estado.injetar(502, metodo="POST", caminho="/blobs")
+        estado.injetar(429, metodo="POST", caminho="/trees", cabecalhos={"Retry-After": "0"})
+
+    n, r = args.repeticoes, args.repeticoes_render
+    return [
+        ("carregar_database (frio, só JSON)", database_frio_sem_colunar, lambda: carregar_database(), n),
+        ("carregar_database (frio)", database_frio, lambda: carregar_database(), n),
+        ("carregar_database (cache)", None, lambda: carregar_database(), n),
+        ("listar_clientes (sem índice)", indice_clientes_frio, listar_resumos, n),
+        ("listar_clientes (índice)", None, listar_resumos, n),
+        ("carregar_cliente_por_slug", None, lambda: carregar_cliente_por_slug(rng.choice(slugs)), n),
+        ("resolver catálogo (frio)", lambda: (resolucao_fria(), escolher_catalogo()),
+         lambda: resolver_pecas(catalogo["dados"], catalogo["slug"]), n),
+        ("resolver catálogo (cache)", None, lambda: resolver_pecas(catalogo["dados"], catalogo["slug"]), n),
+        ("pecas_cliente de uma sessão", None, pecas_de_uma_sessao, n),
+        ("render catalogos.py (lista)", None, lambda: app("catalogos.py"), r),
+        ("render catalogos.py (catálogo)", None, lambda: app("catalogos.py", cliente=rng.choice(slugs)), r),
+        ("salvar peça (database)", None, salvar_peca, n),
+        ("publicar database.json", salvar_peca, publicar_database, n),
+        ("salvar + publicar catálogo", None, salvar_e_publicar_catalogo, n),
+        ("publicar (502 + 429 injetados)", injetar_falhas, publicar_database, n),
+    ]
+
+
+def main():
+    args = _argumentos()
+    pasta, temporaria = _preparar_pasta(args)
+    servidor, estado = iniciar_servidor()
+    segredos = _segredos(servidor.server_port, args.backend)
+    os.environ["ARMAZENAMENTO"] = args.backend
+    _gravar_segredos(segredos)
+
+    filtros = [t.strip().lower() for t in args.so.split(",")] if args.so else None
+    resultados = []
+    try:
+        for nome, preparar, funcao, repeticoes in _casos(args, segredos, estado):
+            if filtros and not any(t in nome.lower() for t in filtros):
+                continue
+            print(f"medindo {nome}...", flush=True)
+            resultados.append(medir(nome, funcao, repeticoes, preparar))
+    finally:
+        servidor.shutdown()
+        os.chdir(RAIZ)
+        if temporaria:
+            shutil.rmtree(pasta, ignore_errors=True)
+
+    print()
+    print(formatar_tabela(resultados))
+    # ru_maxrss vem em KB no Linux
+    pico_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None
+    if pico_rss is not None:
+        print(f"\nRSS máximo do processo: {pico_rss:.0f} MB")
+    print(f"chamadas ao GitHub falso: {estado.chamadas}")
+
+    if args.saida_json:
+        with open(args.saida_json, "w", encoding="utf-8") as f:
+            json.dump({"parametros": vars(args), "resultados": resultados, "rss_max_mb": pico_rss}, f,
+                      ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
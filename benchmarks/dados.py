@@ -0,0 +1,91 @@
+import json
+import os
+import random
+import shutil
+
+from PIL import Image
+
+from utils.images import gerar_variantes
+
+# -----------------------------------------------------------
+# Conjunto de dados sintético
+# -----------------------------------------------------------
+# Mesma estrutura do repositório: database/database.json, clientes/*.json
+# (catálogos por referência) e imagens/ com variantes. As imagens têm
+# ruído para que o JPEG fique com tamanho parecido ao de uma foto real.
+PALAVRAS = [
+    "motor", "inversor", "contator", "rele", "sensor", "botao", "chave", "fusivel",
+    "disjuntor", "soft", "starter", "fonte", "cabo", "borne", "painel", "trifasico",
+    "monofasico", "indutivo", "capacitivo", "emergencia", "seccionadora", "termico",
+]
+VENDEDORES = ["Stefany", "Carlos", "Marina", "Paulo", "Renata"]
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _frase(rng, n):
+    return " ".join(rng.choice(PALAVRAS) for _ in range(n))
+
+
+def gerar_pecas(quantidade, imagens=0, semente=42):
+    rng = random.Random(semente)
+    pecas = []
+    for i in range(quantidade):
+        peca = {
+            "codigo": f"B{i:06d}",
+            "nome": _frase(rng, 3),
+            "descricao": _frase(rng, 12),
+        }
+        if i < imagens:
+            peca["imagem"] = f"imagens/B{i:06d}.jpg"
+        pecas.append(peca)
+    return pecas
+
+
+def gerar_imagem(caminho, largura=1600, altura=1200):
+    ruido = Image.effect_noise((largura // 4, altura // 4), 48).resize((largura, altura))
+    imagem = Image.merge("RGB", (ruido, ruido.rotate(90, expand=False), ruido.transpose(Image.FLIP_LEFT_RIGHT)))
+    imagem.save(caminho, format="JPEG", quality=85)
+    gerar_variantes(caminho, imagem)
+
+
+def gerar_dados(pasta, pecas=100_000, clientes=5_000, pecas_por_cliente=200, imagens=50, semente=42):
+    """
+    Cria o conjunto de dados em `pasta`, que deve ser a pasta atual: as
+    variantes das imagens são gravadas em caminhos relativos, como no app.
+    Retorna um resumo com os tamanhos gerados.
+    """
+    rng = random.Random(semente)
+    for sub in ("database", "clientes", "imagens", "pdfs"):
+        os.makedirs(os.path.join(pasta, sub), exist_ok=True)
+    shutil.copyfile(os.path.join(RAIZ, "imagens", "Logo.png"), os.path.join(pasta, "imagens", "Logo.png"))
+
+    lista = gerar_pecas(pecas, imagens, semente)
+    caminho_db = os.path.join(pasta, "database", "database.json")
+    with open(caminho_db, "w", encoding="utf-8") as f:
+        json.dump(lista, f, ensure_ascii=False, indent=2)
+
+    codigos = [p["codigo"] for p in lista]
+    com_imagem = codigos[:imagens]
+    for i in range(clientes):
+        escolhidos = rng.sample(codigos, min(pecas_por_cliente, len(codigos)))
+        # metade dos catálogos começa pelas peças com imagem (página 1 com fotos)
+        if i % 2 == 0 and com_imagem:
+            escolhidos = com_imagem[:20] + [c for c in escolhidos if c not in com_imagem[:20]]
+        dados = {
+            "cliente": f"Cliente {i:05d}",
+            "vendedor": rng.choice(VENDEDORES),
+            "contato": f"+55159{i:08d}",
+            "pecas": escolhidos,
+        }
+        with open(os.path.join(pasta, "clientes", f"cliente_{i:05d}.json"), "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False, indent=2)
+
+    for codigo in com_imagem:
+        gerar_imagem(os.path.join(pasta, "imagens", f"{codigo}.jpg"))
+
+    return {
+        "pecas": pecas,
+        "clientes": clientes,
+        "imagens": len(com_imagem),
+        "database_mb": os.path.getsize(caminho_db) / (1024 * 1024),
+    }
@@ -0,0 +1,198 @@
+import base64
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+# -----------------------------------------------------------
+# Servidor local que imita a API do GitHub usada pelo app
+# -----------------------------------------------------------
+# Cobre /user, a Git Data API (ref, commits, trees, blobs, PATCH da ref) e
+# a API Contents (GET/PUT). Guarda tudo em memória. Use com
+# GITHUB_API_URL = "http://127.0.0.1:<porta>" e usuário/repositório "u"/"r".
+# Para exercitar as novas tentativas, EstadoGitHub.injetar() faz as
+# próximas chamadas escolhidas falharem e EstadoGitHub.limitar() passa a
+# emitir X-RateLimit-* e a recusar chamadas quando a cota acaba.
+USUARIO, REPOSITORIO = "u", "r"
+
+
+class EstadoGitHub:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.objetos = {}
+        self.chamadas = 0
+        self.falhas = []
+        self.limite = None
+        arvore = self._guardar({"tipo": "tree", "itens": {}})
+        self.ref = self._guardar({"tipo": "commit", "tree": arvore, "parents": []})
+
+    def _guardar(self, objeto):
+        sha = hashlib.sha1(json.dumps(objeto, sort_keys=True).encode("utf-8")).hexdigest()
+        self.objetos[sha] = objeto
+        return sha
+
+    def blob(self, conteudo_b64):
+        bruto = base64.b64decode(conteudo_b64)
+        sha = hashlib.sha1(b"blob %d\0" % len(bruto) + bruto).hexdigest()
+        self.objetos[sha] = {"tipo": "blob", "tamanho": len(bruto)}
+        return sha
+
+    def itens(self):
+        return self.objetos[self.objetos[self.ref]["tree"]]["itens"]
+
+    def injetar(self, status, vezes=1, metodo=None, caminho=None, cabecalhos=None, mensagem="falha injetada"):
+        """As próximas `vezes` chamadas que casarem com `metodo`/`caminho` (trecho) recebem `status`."""
+        with self.lock:
+            for _ in range(vezes):
+                self.falhas.append({"status": status, "metodo": metodo, "caminho": caminho,
+                                    "cabecalhos": cabecalhos or {}, "mensagem": mensagem})
+
+    def limitar(self, total, janela=60):
+        """Cota de `total` chamadas renovada a cada `janela` segundos."""
+        with self.lock:
+            # como no GitHub, o reset é um instante em segundos inteiros
+            self.limite = {"total": total, "restante": total, "janela": janela,
+                           "reinicio": math.ceil(time.time() + janela)}
+
+    def _falha_para(self, metodo, caminho):
+        for i, falha in enumerate(self.falhas):
+            if falha["metodo"] in (None, metodo) and (falha["caminho"] is None or falha["caminho"] in caminho):
+                return self.falhas.pop(i)
+        return None
+
+    def _cabecalhos_limite(self):
+        """Gasta uma chamada da cota; retorna (cabeçalhos, esgotada)."""
+        if self.limite is None:
+            return {}, False
+        agora = time.time()
+        if agora >= self.limite["reinicio"]:
+            self.limite["restante"] = self.limite["total"]
+            self.limite["reinicio"] = math.ceil(agora + self.limite["janela"])
+        esgotada = self.limite["restante"] <= 0
+        if not esgotada:
+            self.limite["restante"] -= 1
+        return {
+            "X-RateLimit-Limit": str(self.limite["total"]),
+            "X-RateLimit-Remaining": str(self.limite["restante"]),
+            "X-RateLimit-Reset": str(self.limite["reinicio"]),
+        }, esgotada
+
+
+def _manipulador(estado):
+    class Manipulador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # cabeçalho e corpo saem em writes separados: sem isso o Nagle +
+        # ACK atrasado somaria ~40 ms a cada chamada
+        disable_nagle_algorithm = True
+        _limite = {}
+
+        def log_message(self, *args):
+            pass
+
+        def _responder(self, status, corpo, cabecalhos=None):
+            dados = json.dumps(corpo).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(dados)))
+            for nome, valor in {**self._limite, **(cabecalhos or {})}.items():
+                self.send_header(nome, valor)
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def _corpo(self):
+            tamanho = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(tamanho)) if tamanho else {}
+
+        def _tratar(self, metodo):
+            corpo = self._corpo() if metodo in ("POST", "PUT", "PATCH") else None
+            caminho = self.path.split("?")[0]
+            with estado.lock:
+                estado.chamadas += 1
+                self._limite, esgotada = estado._cabecalhos_limite()
+                if esgotada:
+                    return self._responder(403, {"message": "API rate limit exceeded"})
+                falha = estado._falha_para(metodo, caminho)
+                if falha is not None:
+                    return self._responder(falha["status"], {"message": falha["mensagem"]}, falha["cabecalhos"])
+                if caminho == "/user":
+                    return self._responder(200, {"login": USUARIO})
+                git = re.match(rf"/repos/{USUARIO}/{REPOSITORIO}/git/(.*)", caminho)
+                if git:
+                    return self._git(metodo, git.group(1), corpo)
+                contents = re.match(rf"/repos/{USUARIO}/{REPOSITORIO}/contents/(.*)", caminho)
+                if contents:
+                    return self._contents(metodo, contents.group(1), corpo)
+                return self._responder(404, {"message": "Not Found"})
+
+        def _git(self, metodo, resto, corpo):
+            if metodo == "GET" and resto.startswith("ref/heads/"):
+                return self._responder(200, {"object": {"sha": estado.ref}})
+            if metodo == "GET" and resto.startswith("commits/"):
+                sha = resto.split("/")[1]
+                return self._responder(200, {"sha": sha, "tree": {"sha": estado.objetos[sha]["tree"]}})
+            if metodo == "GET" and resto.startswith("trees/"):
+                sha = resto.split("/")[1]
+                itens = estado.objetos[sha]["itens"]
+                return self._responder(200, {"sha": sha, "truncated": False, "tree": [
+                    {"path": p, "type": "blob", "sha": s} for p, s in itens.items()
+                ]})
+            if metodo == "POST" and resto == "blobs":
+                return self._responder(201, {"sha": estado.blob(corpo["content"])})
+            if metodo == "POST" and resto == "trees":
+                itens = dict(estado.objetos[corpo["base_tree"]]["itens"]) if corpo.get("base_tree") else {}
+                itens.update({item["path"]: item["sha"] for item in corpo["tree"]})
+                return self._responder(201, {"sha": estado._guardar({"tipo": "tree", "itens": itens})})
+            if metodo == "POST" and resto == "commits":
+                sha = estado._guardar({"tipo": "commit", "tree": corpo["tree"], "parents": corpo["parents"],
+                                       "message": corpo["message"]})
+                return self._responder(201, {"sha": sha})
+            if metodo == "PATCH" and resto.startswith("refs/heads/"):
+                if estado.objetos[corpo["sha"]]["parents"] != [estado.ref]:
+                    return self._responder(422, {"message": "Update is not a fast forward"})
+                estado.ref = corpo["sha"]
+                return self._responder(200, {"object": {"sha": estado.ref}})
+            return self._responder(404, {"message": "Not Found"})
+
+        def _contents(self, metodo, caminho, corpo):
+            caminho = unquote(caminho)
+            itens = estado.itens()
+            if metodo == "GET":
+                if caminho not in itens:
+                    return self._responder(404, {"message": "Not Found"})
+                return self._responder(200, {"path": caminho, "sha": itens[caminho]})
+            if metodo == "PUT":
+                if caminho in itens and corpo.get("sha") != itens[caminho]:
+                    return self._responder(409, {"message": "sha mismatch"})
+                sha_blob = estado.blob(corpo["content"])
+                novos = dict(itens, **{caminho: sha_blob})
+                arvore = estado._guardar({"tipo": "tree", "itens": novos})
+                estado.ref = estado._guardar({"tipo": "commit", "tree": arvore, "parents": [estado.ref],
+                                              "message": corpo["message"]})
+                return self._responder(201, {"content": {"sha": sha_blob}, "commit": {"sha": estado.ref}})
+            return self._responder(405, {"message": "Method Not Allowed"})
+
+        def do_GET(self):
+            self._tratar("GET")
+
+        def do_POST(self):
+            self._tratar("POST")
+
+        def do_PUT(self):
+            self._tratar("PUT")
+
+        def do_PATCH(self):
+            self._tratar("PATCH")
+
+    return Manipulador
+
+
+def iniciar_servidor(porta=0):
+    """Sobe o servidor em uma thread. Retorna (servidor, estado); a porta está em servidor.server_port."""
+    estado = EstadoGitHub()
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), _manipulador(estado))
+    threading.Thread(target=servidor.serve_forever, name="github-falso", daemon=True).start()
+    return servidor, estado
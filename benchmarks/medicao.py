@@ -0,0 +1,68 @@
+import gc
+import time
+import tracemalloc
+
+from utils.perfil import percentil
+
+# -----------------------------------------------------------
+# Medição: tempos (p50/p95) e pico de memória
+# -----------------------------------------------------------
+# As repetições cronometradas rodam sem tracemalloc (ele deixa o Python
+# várias vezes mais lento); uma execução extra, rastreada, dá o pico de
+# memória alocada durante a operação.
+
+
+def medir(nome, funcao, repeticoes=20, preparar=None, memoria=True, aquecer=True):
+    """
+    Executa `funcao` `repeticoes` vezes (chamando `preparar` antes de cada
+    uma, fora do tempo medido) e retorna um dict com os resultados em ms/MB.
+    Com `aquecer`, uma primeira execução fora da conta absorve imports e
+    inicializações preguiçosas.
+    """
+    if aquecer:
+        if preparar:
+            preparar()
+        funcao()
+
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar:
+            preparar()
+        gc.collect()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    pico_mb = None
+    if memoria:
+        if preparar:
+            preparar()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            funcao()
+            pico_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "nome": nome,
+        "repeticoes": repeticoes,
+        "p50_ms": percentil(tempos, 50),
+        "p95_ms": percentil(tempos, 95),
+        "min_ms": min(tempos),
+        "max_ms": max(tempos),
+        "pico_mb": pico_mb,
+    }
+
+
+def formatar_tabela(resultados):
+    linhas = [f"{'caminho':<34} {'n':>4} {'p50 ms':>10} {'p95 ms':>10} {'máx ms':>10} {'pico MB':>9}"]
+    linhas.append("-" * len(linhas[0]))
+    for r in resultados:
+        pico = f"{r['pico_mb']:.1f}" if r["pico_mb"] is not None else "—"
+        linhas.append(
+            f"{r['nome']:<34} {r['repeticoes']:>4} {r['p50_ms']:>10.2f} {r['p95_ms']:>10.2f} "
+            f"{r['max_ms']:>10.2f} {pico:>9}"
+        )
+    return "\n".join(linhas)
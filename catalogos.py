@@ -1,21 +1,26 @@
 import streamlit as st
-import json
 import os
 import urllib.parse
 
-from utils.images import img_to_base64
-from utils.clients import carregar_cliente
-from utils.importDatabase import carregar_database
+from utils.images import img_to_base64, imagem_para_largura
+from utils.clients import carregar_cliente_por_slug, listar_resumos
+from utils.resolucao import resolver_pecas
 from components.header import render_header
-from components.wpp_button import render_wpp_button
-from components.peca import render_peca
+from utils.metricas import iniciar_exportacao
+from utils.perfil import iniciar_execucao, secao
+from components.catalogo import render_catalogo
+from components.perfil_painel import render_painel_perfil
 
 # -----------------------------------------------------------
 # CONFIG INICIAL
 # -----------------------------------------------------------
 st.set_page_config(page_title="WCE", layout="wide")
+iniciar_execucao("catalogos")
+iniciar_exportacao()
+render_painel_perfil()
 
-logo_base64 = img_to_base64("imagens/Logo.png")
+with secao("logo"):
+    logo_base64 = img_to_base64("imagens/Logo.png")
 render_header(logo_base64)
 
 ADMIN_PASSWORD = "SV2024"
@@ -104,37 +109,17 @@ os.makedirs(CLIENTES_DIR, exist_ok=True)
 # Helpers
 # -------------------------
 def listar_clientes():
-    arquivos = [f for f in os.listdir(CLIENTES_DIR) if f.endswith(".json")]
     clientes = []
-    for arq in arquivos:
-        caminho = os.path.join(CLIENTES_DIR, arq)
-        try:
-            with open(caminho, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            clientes.append({
-                "cliente": data.get("cliente", "Sem nome"),
-                "vendedor": data.get("vendedor", "—"),
-                "qtd_pecas": len(data.get("pecas", []))
-            })
-        except Exception as e:
-            st.error(f"Erro ao ler {arq}: {e}")
-    return clientes
-
-def carregar_cliente_por_slug(slug: str):
-    slug = (slug or "").lower()
-    for arq in os.listdir(CLIENTES_DIR):
-        if not arq.endswith(".json"):
+    for resumo in listar_resumos():
+        if "erro" in resumo:
+            st.error(f"Erro ao ler {resumo['arquivo']}: {resumo['erro']}")
             continue
-        caminho = os.path.join(CLIENTES_DIR, arq)
-        try:
-            with open(caminho, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            nome_slug = data.get("cliente", "").lower().replace(" ", "_")
-            if nome_slug == slug:
-                return data
-        except Exception:
-            continue
-    return None
+        clientes.append({
+            "cliente": resumo["cliente"],
+            "vendedor": resumo["vendedor"],
+            "qtd_pecas": resumo["qtd_pecas"]
+        })
+    return clientes
 
 def abrir_catalogo_por_slug(slug: str):
     """
@@ -187,7 +172,8 @@ except Exception:
 # -----------------------------------------------------------
 if st.session_state["cliente_atual"]:
     cliente_slug = st.session_state["cliente_atual"]
-    dados_cliente = carregar_cliente_por_slug(cliente_slug)
+    with secao("carregar_cliente"):
+        dados_cliente = carregar_cliente_por_slug(cliente_slug)
 
     if dados_cliente is None:
         st.warning("Cliente não encontrado. Verifique o nome ou volte à lista.")
@@ -211,26 +197,10 @@ if st.session_state["cliente_atual"]:
     nome_cliente = dados_cliente.get("cliente", cliente_slug)
     contato_vendedor = dados_cliente.get("contato", "")
 
-    pecas_raw = dados_cliente.get("pecas", [])
-    codigos_pecas = []
-    for item in pecas_raw:
-        if isinstance(item, dict):
-            if "codigo" in item:
-                codigos_pecas.append(item["codigo"])
-            else:
-                st.warning(f"Formato inesperado de peça no cliente '{nome_cliente}': {item}")
-        else:
-            codigos_pecas.append(item)
-
-    pecas_bd = carregar_database()
-    pecas = []
-    for codigo in codigos_pecas:
-        if codigo in pecas_bd:
-            item = pecas_bd[codigo].copy()
-            item["codigo"] = codigo
-            pecas.append(item)
-        else:
-            st.warning(f"⚠ Peça '{codigo}' não encontrada no database.")
+    with secao("resolver_pecas"):
+        pecas, faltando = resolver_pecas(dados_cliente, cliente_slug)
+    for codigo in faltando:
+        st.warning(f"⚠ Peça '{codigo}' não encontrada no database.")
 
     # Cabeçalho do catálogo com botão Voltar
     col1, col2 = st.columns([1, 8])
@@ -254,25 +224,14 @@ if st.session_state["cliente_atual"]:
 
     st.subheader("Selecione as peças desejadas abaixo:")
 
-    pecas_selecionadas = []
-    quantidades = {}
-
-    st.subheader("📦 Lista de Peças Disponíveis")
-    for idx, peca in enumerate(pecas):
-        st.markdown("---")
-        render_peca(peca, idx, quantidades, pecas_selecionadas)
+    def botao_manual(peca):
         manual_url = peca.get("manual")
         if manual_url:
             safe_url = urllib.parse.quote(manual_url, safe=":/?&=#%")
             st.markdown(f'<a href="{safe_url}" target="_blank" rel="noopener noreferrer" class="open-btn">📘 Abrir manual</a>', unsafe_allow_html=True)
 
-    if not pecas_selecionadas:
-        st.warning("Selecione pelo menos uma peça para continuar.")
-        st.stop()
-
-    texto_itens = "\n".join([f"- {p['nome']} (código {p['codigo']}) — Quantidade: {quantidades[p['codigo']]}" for p in pecas_selecionadas])
-    mensagem = f"Pedido de Aquisição de Peças\nCliente: {nome_cliente}\n\nItens Selecionados:\n{texto_itens}"
-    render_wpp_button(contato_vendedor, mensagem)
+    with secao("render_catalogo"):
+        render_catalogo(pecas, cliente_slug, nome_cliente, contato_vendedor, render_extra=botao_manual)
 
     st.stop()
 
@@ -282,14 +241,12 @@ if st.session_state["cliente_atual"]:
 st.title("Catálogos Disponíveis")
 st.write("Escolha um catálogo para visualizar os itens e fazer pedidos.")
 
-clientes = listar_clientes()
+with secao("listar_clientes"):
+    clientes = listar_clientes()
 if not clientes:
     st.warning("Nenhum catálogo cadastrado ainda.")
     st.stop()
 
-# Carrega database para prévisualizações
-pecas_bd = carregar_database()
-
 # Grid responsivo: 3 colunas
 cols = st.columns(3, gap="large")
 for i, c in enumerate(clientes):
@@ -335,23 +292,17 @@ if st.session_state.get("preview_cliente"):
             st.markdown("---")
 
             # mostra até 6 miniaturas com nome e código
-            pecas_preview = preview_data.get("pecas", [])[:6]
+            pecas_preview = resolver_pecas(preview_data, preview_slug)[0][:6]
             thumbs_cols = st.columns(len(pecas_preview) if pecas_preview else 1)
-            for idx, p in enumerate(pecas_preview):
-                pc = pecas_preview[idx]
-                # resolve dados da peça a partir do database se for código
-                if isinstance(pc, dict):
-                    codigo = pc.get("codigo") or pc.get("codigo", "")
-                else:
-                    codigo = pc
-                detalhe = pecas_bd.get(codigo, {}) if pecas_bd else {}
-                nome = detalhe.get("nome") or (pc.get("nome") if isinstance(pc, dict) else codigo)
-                imagem = detalhe.get("imagem") or (pc.get("imagem") if isinstance(pc, dict) else None)
+            for idx, pc in enumerate(pecas_preview):
+                codigo = pc["codigo"]
+                nome = pc.get("nome") or codigo
+                imagem = pc.get("imagem")
 
                 with thumbs_cols[idx]:
                     if imagem:
                         try:
-                            st.image(imagem, width=120)
+                            st.image(imagem_para_largura(imagem, 120), width=120)
                         except Exception:
                             st.markdown(f"<div style='width:120px;height:90px;border-radius:8px;background:#f1f5f9;display:flex;align-items:center;justify-content:center;color:#6b7280;border:1px solid #e6eef8'>{codigo}</div>", unsafe_allow_html=True)
                     else:
@@ -0,0 +1,40 @@
+import streamlit as st
+
+from utils.busca import buscar_pecas, preparar_indice
+
+# -----------------------------------------------------------
+# Caixa de busca de peças do database (código, nome ou descrição)
+# -----------------------------------------------------------
+def render_busca_pecas(key, ao_adicionar, limite=8):
+    """
+    Mostra um campo de busca e, para cada resultado, um botão "Adicionar".
+    `ao_adicionar(peca)` recebe a Peca escolhida, a mesma instância do
+    database (compartilhada: guarde-a sem copiar, mas não a altere).
+    """
+    # o índice é montado em segundo plano enquanto o usuário digita
+    preparar_indice()
+    termo = st.text_input(
+        "🔎 Pesquisar peça cadastrada (código, nome ou descrição)",
+        key=key,
+        placeholder="ex.: botao emergencia, 6800, soft starter",
+    )
+    if not termo.strip():
+        return
+
+    resultados = buscar_pecas(termo, limite=limite)
+    if resultados is None:
+        st.info("⏳ Preparando o índice de busca... tente de novo em alguns segundos.")
+        return
+    if not resultados:
+        st.info("Nenhuma peça encontrada para essa busca.")
+        return
+
+    for peca in resultados:
+        col_info, col_btn = st.columns([5, 1])
+        with col_info:
+            st.write(f"**{peca.get('nome', '—')}** — {peca.get('codigo')}")
+            if peca.get("descricao"):
+                st.caption(peca["descricao"])
+        with col_btn:
+            if st.button("➕ Adicionar", key=f"{key}_add_{peca['codigo']}"):
+                ao_adicionar(peca)
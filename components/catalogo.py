@@ -0,0 +1,127 @@
+import math
+import streamlit as st
+
+from utils.busca import dobrar
+from utils.manuais import arquivo_manual, buscar_manuais, garantir_indice
+from utils.perfil import iniciar_execucao, secao
+from components.peca import render_peca
+from components.wpp_button import render_wpp_button
+
+TAMANHOS_PAGINA = [10, 20, 50, 100]
+TAMANHO_PAGINA_PADRAO = 20
+
+# st.fragment: interações dentro do catálogo reexecutam só esta função,
+# sem recarregar cliente, database, cabeçalho e CSS da página
+fragmento = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", lambda f: f)
+
+# -----------------------------------------------------------
+# Catálogo paginado: filtro, página atual e pedido
+# -----------------------------------------------------------
+def _texto_filtro(peca):
+    return dobrar(f"{peca.get('codigo', '')} {peca.get('nome', '')} {peca.get('descricao', '')}")
+
+
+@fragmento
+def render_catalogo(pecas, chave, nome_cliente, contato_vendedor, render_extra=None,
+                    tamanho_pagina=TAMANHO_PAGINA_PADRAO):
+    """
+    Exibe apenas a página visível do catálogo e o resumo do pedido.
+    - `chave` identifica o catálogo (ex.: slug do cliente) e isola o
+      estado de seleção/paginação de cada cliente na sessão;
+    - `render_extra(peca)` é chamado após cada peça (ex.: botão do manual).
+    Roda como fragmento: marcar uma peça, mudar a quantidade, filtrar ou
+    paginar reexecuta apenas a página visível e o resumo do pedido.
+    """
+    # interação só no fragmento: conta como uma execução própria no perfil
+    iniciar_execucao(f"catálogo {chave} (fragmento)", fragmento=True)
+    key_selecao = f"selecao_{chave}"
+    key_pagina = f"pagina_{chave}"
+    key_filtro = f"filtro_{chave}"
+    key_tamanho = f"tam_pagina_{chave}"
+
+    if key_selecao not in st.session_state:
+        st.session_state[key_selecao] = {}
+    if key_pagina not in st.session_state:
+        st.session_state[key_pagina] = 0
+    selecao = st.session_state[key_selecao]
+
+    # remove códigos repetidos (cada peça tem widgets com chave pelo código)
+    vistos = set()
+    pecas = [p for p in pecas if not (p["codigo"] in vistos or vistos.add(p["codigo"]))]
+
+    def voltar_ao_inicio():
+        st.session_state[key_pagina] = 0
+
+    def mudar_pagina(delta):
+        st.session_state[key_pagina] += delta
+
+    col_filtro, col_tam = st.columns([4, 1])
+    with col_filtro:
+        filtro = st.text_input("🔎 Filtrar peças deste catálogo (também busca nos manuais)", key=key_filtro,
+                               on_change=voltar_ao_inicio)
+    with col_tam:
+        opcoes = sorted(set(TAMANHOS_PAGINA + [tamanho_pagina]))
+        por_pagina = st.selectbox("Itens por página", opcoes, index=opcoes.index(tamanho_pagina),
+                                  key=key_tamanho, on_change=voltar_ao_inicio)
+
+    # o filtro também procura no texto dos manuais (índice montado em segundo plano)
+    garantir_indice()
+    termos = dobrar(filtro).split()
+    pelo_manual = set()
+    if termos:
+        with secao("filtro"):
+            nos_manuais = buscar_manuais(termos)
+            visiveis = []
+            for p in pecas:
+                if all(t in _texto_filtro(p) for t in termos):
+                    visiveis.append(p)
+                elif nos_manuais and arquivo_manual(p) in nos_manuais:
+                    visiveis.append(p)
+                    pelo_manual.add(p["codigo"])
+    else:
+        visiveis = pecas
+
+    total_paginas = max(1, math.ceil(len(visiveis) / por_pagina))
+    pagina = min(st.session_state[key_pagina], total_paginas - 1)
+    st.session_state[key_pagina] = pagina
+
+    st.subheader("📦 Lista de Peças Disponíveis")
+    if not visiveis:
+        st.info("Nenhuma peça corresponde ao filtro.")
+
+    inicio = pagina * por_pagina
+    with secao("render_peca"):
+        for peca in visiveis[inicio:inicio + por_pagina]:
+            st.markdown("---")
+            render_peca(peca, selecao, chave)
+            if peca["codigo"] in pelo_manual:
+                st.caption("📘 Termo encontrado no manual desta peça.")
+            if render_extra:
+                render_extra(peca)
+
+    if total_paginas > 1:
+        st.markdown("---")
+        col_ant, col_info, col_prox = st.columns([1, 2, 1])
+        with col_ant:
+            st.button("◀ Anterior", key=f"ant_{chave}", disabled=pagina == 0,
+                      on_click=mudar_pagina, args=(-1,))
+        with col_info:
+            st.caption(f"Página {pagina + 1} de {total_paginas} — {len(visiveis)} peças")
+        with col_prox:
+            st.button("Próxima ▶", key=f"prox_{chave}", disabled=pagina >= total_paginas - 1,
+                      on_click=mudar_pagina, args=(1,))
+
+    render_pedido(pecas, selecao, nome_cliente, contato_vendedor)
+
+
+def render_pedido(pecas, selecao, nome_cliente, contato_vendedor):
+    pecas_selecionadas = [p for p in pecas if p["codigo"] in selecao]
+    if not pecas_selecionadas:
+        st.warning("Selecione pelo menos uma peça para continuar.")
+        return
+
+    st.markdown("---")
+    st.write(f"**Itens selecionados:** {len(pecas_selecionadas)}")
+    texto_itens = "\n".join([f"- {p.get('nome', '—')} (código {p['codigo']}) — Quantidade: {selecao[p['codigo']]}" for p in pecas_selecionadas])
+    mensagem = f"Pedido de Aquisição de Peças\nCliente: {nome_cliente}\n\nItens Selecionados:\n{texto_itens}"
+    render_wpp_button(contato_vendedor, mensagem)
@@ -0,0 +1,69 @@
+import datetime
+import streamlit as st
+
+from utils.fila import contagem_jobs, descartar_job, iniciar_worker, listar_jobs, reenfileirar_job
+from utils.github import estatisticas_envio, latencias_recentes
+from utils.perfil import percentil
+
+# -----------------------------------------------------------
+# Painel de status da fila de envios ao GitHub (páginas admin)
+# -----------------------------------------------------------
+def _hora(ts):
+    return datetime.datetime.fromtimestamp(ts).strftime("%d/%m %H:%M:%S")
+
+
+def _mb(n):
+    return f"{n / (1024 * 1024):.1f} MB"
+
+
+def render_status_fila():
+    contagem = contagem_jobs()
+    pendentes = contagem.get("pendente", 0) + contagem.get("em_andamento", 0)
+    falhos = contagem.get("falhou", 0)
+    if pendentes:
+        # jobs deixados por um processo anterior voltam a andar
+        iniciar_worker()
+
+    titulo = f"📤 Envios ao GitHub — {pendentes} pendente(s), {falhos} com falha"
+    with st.expander(titulo, expanded=falhos > 0):
+        if st.button("🔄 Atualizar status", key="fila_atualizar"):
+            st.rerun()
+
+        for job in listar_jobs("em_andamento") + listar_jobs("pendente"):
+            info = f"#{job['id']} {job['mensagem']} — {len(job['arquivos'])} arquivo(s)"
+            if job["tentativas"]:
+                info += f" — tentativa {job['tentativas'] + 1}, último erro: {job['erro']}"
+            st.write(("⏳ " if job["status"] == "pendente" else "🚚 ") + info)
+
+        for job in listar_jobs("falhou"):
+            st.error(f"#{job['id']} {job['mensagem']} ({_hora(job['atualizado_em'])}): {job['erro']}")
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("Tentar novamente", key=f"fila_retry_{job['id']}"):
+                    reenfileirar_job(job["id"])
+                    st.rerun()
+            with col2:
+                if st.button("Descartar", key=f"fila_drop_{job['id']}"):
+                    descartar_job(job["id"])
+                    st.rerun()
+
+        if not pendentes and not falhos:
+            st.caption("Nenhum envio pendente.")
+
+        envio = estatisticas_envio()
+        if envio["arquivos_enviados"] or envio["arquivos_ignorados"]:
+            st.caption(
+                f"Desde o início do app: {envio['arquivos_enviados']} arquivo(s) enviado(s) "
+                f"({_mb(envio['bytes_enviados'])}); {envio['arquivos_ignorados']} sem alteração não reenviado(s) "
+                f"({_mb(envio['bytes_ignorados'])}); {envio['commits_evitados']} commit(s) evitado(s)."
+            )
+
+        latencias = latencias_recentes()
+        if latencias:
+            segundos = [l["segundos"] for l in latencias]
+            ultima = latencias[-1]
+            st.caption(
+                f"Últimas {len(latencias)} chamada(s) à API: p50 {percentil(segundos, 50):.2f} s, "
+                f"p95 {percentil(segundos, 95):.2f} s; última {ultima['metodo']} "
+                f"→ {ultima['status'] or 'erro'} em {ultima['segundos']:.2f} s."
+            )
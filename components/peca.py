@@ -1,15 +1,23 @@
 import streamlit as st
 
+from utils.images import imagem_para_largura
+
 # -----------------------------------------------------------
 # Função para renderizar cada peça
 # -----------------------------------------------------------
-def render_peca(peca, idx, quantidades, pecas_selecionadas):
+def render_peca(peca, selecao, chave):
+    """
+    Renderiza uma peça do catálogo.
+    `selecao` é o dict {codigo: quantidade} persistido na sessão; ele é
+    atualizado pelos callbacks dos widgets, então a escolha sobrevive à
+    troca de página mesmo quando a linha deixa de ser renderizada.
+    """
     col_img, col_info, col_sel = st.columns([1.4, 3, 1.1])
 
     # Imagem
     with col_img:
         if peca.get("imagem"):
-            st.image(peca["imagem"], use_container_width=True)
+            st.image(imagem_para_largura(peca["imagem"], 400), use_container_width=True)
         else:
             st.write("Sem imagem")
 
@@ -21,15 +29,30 @@ def render_peca(peca, idx, quantidades, pecas_selecionadas):
 
     # Seleção
     with col_sel:
-        key_chk = f"chk_{peca['codigo']}_{idx}"
-        key_qtd = f"qtd_{peca['codigo']}_{idx}"
-        adicionar = st.checkbox("Selecionar", key=key_chk)
+        codigo = peca["codigo"]
+        key_chk = f"chk_{chave}_{codigo}"
+        key_qtd = f"qtd_{chave}_{codigo}"
+
+        def ao_marcar():
+            if st.session_state[key_chk]:
+                selecao[codigo] = st.session_state.get(key_qtd, selecao.get(codigo, 1))
+            else:
+                selecao.pop(codigo, None)
+
+        def ao_mudar_qtd():
+            selecao[codigo] = st.session_state[key_qtd]
+
+        # widgets fora da página atual perdem o estado; restaura a partir da seleção
+        if key_chk not in st.session_state:
+            st.session_state[key_chk] = codigo in selecao
+        adicionar = st.checkbox("Selecionar", key=key_chk, on_change=ao_marcar)
         if adicionar:
-            qtd = st.number_input(
+            if key_qtd not in st.session_state:
+                st.session_state[key_qtd] = selecao.get(codigo, 1)
+            st.number_input(
                 "Quantidade",
                 min_value=1,
                 step=1,
-                key=key_qtd
+                key=key_qtd,
+                on_change=ao_mudar_qtd
             )
-            pecas_selecionadas.append(peca)
-            quantidades[peca['codigo']] = qtd
@@ -0,0 +1,70 @@
+import datetime
+import pandas as pd
+import streamlit as st
+
+from utils.perfil import ativo, historico, percentil, ultima_execucao
+
+# -----------------------------------------------------------
+# Painel de perfil (só para administradores, com PERFIL ativo)
+# -----------------------------------------------------------
+def _eh_admin():
+    return bool(st.session_state.get("auth") or st.session_state.get("is_admin"))
+
+
+def _tabela_secoes(secoes):
+    linhas = [{"seção": nome, "ms": round(s["ms"], 2), "vezes": s["vezes"]} for nome, s in secoes.items()]
+    return pd.DataFrame(linhas).sort_values("ms", ascending=False) if linhas else None
+
+
+def render_painel_perfil():
+    if not ativo() or not _eh_admin():
+        return
+
+    with st.sidebar.expander("⏱️ Perfil da página", expanded=False):
+        ultima = ultima_execucao()
+        if ultima is None:
+            st.caption("A medição aparece a partir da próxima interação.")
+        else:
+            st.markdown(
+                f"**Execução anterior** ({ultima['pagina']}, "
+                f"{datetime.datetime.fromtimestamp(ultima['quando']).strftime('%H:%M:%S')}): "
+                f"{ultima['total_ms']:.0f} ms"
+            )
+            st.caption(
+                f"{ultima['leituras']} arquivo(s) lido(s), {ultima['bytes_lidos'] / 1024:.0f} KB; "
+                f"{ultima['http']} chamada(s) HTTP ({ultima['http_ms']:.0f} ms)"
+            )
+            tabela = _tabela_secoes(ultima["secoes"])
+            if tabela is not None:
+                st.dataframe(tabela, hide_index=True)
+
+        execucoes = historico()
+        if execucoes:
+            st.markdown(f"**Histórico** (últimas {len(execucoes)} execuções, todas as sessões)")
+            por_pagina = {}
+            for e in execucoes:
+                por_pagina.setdefault(e["pagina"], []).append(e)
+            linhas = []
+            for pagina, lista in sorted(por_pagina.items()):
+                totais = [e["total_ms"] for e in lista]
+                linhas.append({
+                    "página": pagina,
+                    "execuções": len(lista),
+                    "p50 ms": round(percentil(totais, 50), 1),
+                    "p95 ms": round(percentil(totais, 95), 1),
+                    "leituras/exec": round(sum(e["leituras"] for e in lista) / len(lista), 1),
+                    "HTTP/exec": round(sum(e["http"] for e in lista) / len(lista), 2),
+                })
+            st.dataframe(pd.DataFrame(linhas), hide_index=True)
+
+            secoes = {}
+            for e in execucoes:
+                for nome, s in e["secoes"].items():
+                    secoes.setdefault(nome, []).append(s["ms"])
+            linhas = [
+                {"seção": nome, "execuções": len(v), "p50 ms": round(percentil(v, 50), 2),
+                 "p95 ms": round(percentil(v, 95), 2)}
+                for nome, v in secoes.items()
+            ]
+            if linhas:
+                st.dataframe(pd.DataFrame(linhas).sort_values("p95 ms", ascending=False), hide_index=True)
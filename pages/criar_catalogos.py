@@ -1,16 +1,28 @@
 # Streamlit page name: Criar Catálogo
 import streamlit as st
-import json
 import os
-from PIL import Image
-import base64
-import requests
-import time
+
+from utils.armazenamento import CodigoDuplicado, obter_armazenamento
+from utils.importDatabase import carregar_database
+from utils.modelo import Peca
+from utils.resolucao import referencias
+from utils.manuais import agendar_indexacao
+from utils.uploads import UploadGrandeDemais, gravar_upload, salvar_imagem_upload
+from utils.github import github_raw_url
+from utils.fila import enfileirar_publicacao
+from components.busca_pecas import render_busca_pecas
+from utils.metricas import iniciar_exportacao
+from utils.perfil import iniciar_execucao, secao
+from components.fila_status import render_status_fila
+from components.perfil_painel import render_painel_perfil
 
 # ===========================
 # CONFIGURAÇÕES
 # ===========================
 st.set_page_config(page_title="Criar Catálogo", page_icon="📘")
+iniciar_execucao("criar_catalogos")
+iniciar_exportacao()
+render_painel_perfil()
 
 PASSWORD = st.secrets["ADMIN_PASSWORD"]
 
@@ -23,113 +35,15 @@ os.makedirs(CLIENTES_DIR, exist_ok=True)
 os.makedirs(IMAGENS_DIR, exist_ok=True)
 os.makedirs(PDFS_DIR, exist_ok=True)
 
-DEFAULT_BRANCH = st.secrets.get("GITHUB_BRANCH", "main")
-
 # ===========================
 # FUNÇÕES AUXILIARES
 # ===========================
-def carregar_produtos():
-    if not os.path.exists(PRODUTOS_FILE):
-        return []
-    with open(PRODUTOS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def salvar_produtos(produtos):
-    os.makedirs(os.path.dirname(PRODUTOS_FILE) or ".", exist_ok=True)
-    with open(PRODUTOS_FILE, "w", encoding="utf-8") as f:
-        json.dump(produtos, f, indent=2, ensure_ascii=False)
-
-def buscar_produto_por_codigo(produtos, codigo):
-    for p in produtos:
-        if p.get("codigo") == codigo:
-            return p
-    return None
-
-def github_raw_url(repo_path):
-    user = st.secrets["GITHUB_USER"]
-    repo = st.secrets["GITHUB_REPO"]
-    branch = st.secrets.get("GITHUB_BRANCH", DEFAULT_BRANCH)
-    return f"https://raw.githubusercontent.com/{user}/{repo}/{branch}/{repo_path}"
-
-def _resp_obj(status, text):
-    class R:
-        def __init__(self, status, text):
-            self.status_code = status
-            self._text = text
-        def json(self):
-            try:
-                return json.loads(self._text)
-            except Exception:
-                return {"error": self._text}
-        @property
-        def text(self):
-            return self._text
-    return R(status, text)
-
-def github_upload(path, repo_path, message, max_retries=2):
-    """
-    Upload file to GitHub repository contents API.
-    Returns requests.Response or a compatible object on error.
-    """
-    token = st.secrets["GITHUB_TOKEN"].strip()
-    user = st.secrets["GITHUB_USER"]
-    repo = st.secrets["GITHUB_REPO"]
-    headers = {
-        "Authorization": f"token {token}",
-        "Accept": "application/vnd.github.v3+json"
-    }
-
-    # quick auth test
-    try:
-        auth_resp = requests.get("https://api.github.com/user", headers=headers, timeout=10)
-    except Exception as e:
-        return _resp_obj(500, f"Auth test failed: {e}")
-    if auth_resp.status_code != 200:
-        return _resp_obj(auth_resp.status_code, auth_resp.text)
-
-    url = f"https://api.github.com/repos/{user}/{repo}/contents/{repo_path}"
-
-    try:
-        with open(path, "rb") as f:
-            content_bytes = f.read()
-    except Exception as e:
-        return _resp_obj(500, f"File read failed: {e}")
-
-    content_b64 = base64.b64encode(content_bytes).decode()
-
-    # GET with retry on 500
-    get_file = None
-    for attempt in range(max_retries):
-        try:
-            get_file = requests.get(url, headers=headers, timeout=15)
-        except Exception as e:
-            if attempt + 1 < max_retries:
-                time.sleep(1)
-                continue
-            else:
-                return _resp_obj(500, f"GET failed: {e}")
-        if get_file.status_code == 500 and attempt + 1 < max_retries:
-            time.sleep(1)
-            continue
-        break
-
-    sha = None
-    if get_file is not None and get_file.status_code == 200:
-        try:
-            sha = get_file.json().get("sha")
-        except Exception:
-            sha = None
-
-    payload = {"message": message, "content": content_b64}
-    if sha:
-        payload["sha"] = sha
-
-    try:
-        resp = requests.put(url, headers=headers, json=payload, timeout=30)
-    except Exception as e:
-        return _resp_obj(500, f"PUT failed: {e}")
+# leitura/gravação passam pelo backend configurado (JSON ou SQLite)
+armazenamento = obter_armazenamento()
 
-    return resp
+def buscar_produto_por_codigo(codigo):
+    # a própria Peca do database: pecas_cliente guarda referências, não cópias
+    return carregar_database().get(codigo)
 
 # ===========================
 # LOGIN
@@ -155,6 +69,7 @@ defaults = {
     "cliente": "",
     "vendedor": "",
     "contato": "",
+    "termo_busca": "",
     "codigo_busca": "",
     "nome_novo": "",
     "descricao_novo": "",
@@ -180,6 +95,7 @@ if st.session_state.reset:
 # INTERFACE PRINCIPAL
 # ===========================
 st.title("📘 Criar Catálogo")
+render_status_fila()
 
 cliente = st.text_input("Nome do Cliente", key="cliente")
 vendedor = st.text_input("Nome do Vendedor", key="vendedor")
@@ -187,12 +103,17 @@ contato = st.text_input("Contato do Vendedor", key="contato")
 
 st.subheader("🔧 Adicionar Peças ao Catálogo")
 
-produtos = carregar_produtos()
+# PESQUISAR PRODUTO CADASTRADO (código, nome ou descrição)
+def adicionar_peca_encontrada(produto):
+    st.session_state.pecas_cliente.append(produto)
+    st.success(f"Produto adicionado: {produto.get('nome')}")
+
+render_busca_pecas("termo_busca", adicionar_peca_encontrada)
 
 # BUSCAR PRODUTO
 codigo_busca = st.text_input("Código da Peça", key="codigo_busca")
 if st.button("🔍 Buscar peça por código"):
-    produto = buscar_produto_por_codigo(produtos, codigo_busca)
+    produto = buscar_produto_por_codigo(codigo_busca)
     if produto:
         st.success(f"Produto encontrado: {produto.get('nome')}")
         st.session_state.pecas_cliente.append(produto)
@@ -211,6 +132,8 @@ if st.button("💾 Salvar Novo Produto"):
         st.error("Digite o CÓDIGO do novo produto!")
     elif not nome_novo or not descricao_novo or upload_novo is None:
         st.error("Preencha todos os campos e envie a imagem!")
+    elif armazenamento.obter_produto(codigo_busca) is not None:
+        st.error(f"Já existe uma peça com o código {codigo_busca}. Use a busca por código para adicioná-la.")
     else:
         # salvar imagem localmente e manter o fluxo original (salva local e faz upload ao GitHub como antes)
         orig_ext = upload_novo.name.split(".")[-1].lower()
@@ -219,63 +142,52 @@ if st.button("💾 Salvar Novo Produto"):
         img_filename = f"{codigo_busca}.{orig_ext}"
         img_path = os.path.join(IMAGENS_DIR, img_filename)
 
-        image = Image.open(upload_novo)
-        if orig_ext == "jpg" and image.mode in ("RGBA", "P"):
-            image = image.convert("RGB")
-        format_map = {"jpg": "JPEG", "png": "PNG"}
-        image_format = format_map.get(orig_ext, "PNG")
-        image.save(img_path, format=image_format)
-
-        # upload da imagem para o GitHub (mantendo exatamente o comportamento anterior)
-        image_url = None
-        resp_img = github_upload(img_path, f"imagens/{img_filename}", f"Adicionando imagem do produto {codigo_busca}")
-        if getattr(resp_img, "status_code", None) in [200, 201]:
-            # se quiser manter exatamente como antes, você pode optar por gravar o caminho local.
-            # aqui mantemos compatibilidade: se upload OK, usamos a URL raw; caso contrário, mantemos caminho local.
-            image_url = github_raw_url(f"imagens/{img_filename}")
-
-        # SALVAR PDF LOCAL E UPLOAD AO GITHUB (apenas o PDF recebe URL pública)
+        try:
+            variantes = salvar_imagem_upload(upload_novo, img_path, orig_ext)
+        except ValueError as e:
+            st.error(f"Imagem recusada: {e}")
+            st.stop()
+
+        # todos os arquivos desta operação vão ao GitHub em um único commit
+        arquivos_publicar = [(img_path, f"imagens/{img_filename}")]
+        arquivos_publicar += [(caminho_variante, caminho_variante) for caminho_variante in variantes]
+
+        # SALVAR PDF LOCAL (apenas o PDF recebe URL pública)
         manual_url = None
         if upload_pdf is not None:
             manual_filename = f"{codigo_busca}.pdf"
             manual_path = os.path.join(PDFS_DIR, manual_filename)
-            os.makedirs(PDFS_DIR, exist_ok=True)
-            with open(manual_path, "wb") as f:
-                f.write(upload_pdf.read())
-
-            resp_pdf = github_upload(manual_path, f"pdfs/{manual_filename}", f"Adicionando manual PDF do produto {codigo_busca}")
-            if getattr(resp_pdf, "status_code", None) in [200, 201]:
-                manual_url = github_raw_url(f"pdfs/{manual_filename}")
-
-        # montar objeto do produto mantendo imagens como antes
+            try:
+                _, sha_manual = gravar_upload(upload_pdf, manual_path)
+            except UploadGrandeDemais as e:
+                st.error(f"Manual recusado: {e}")
+                st.stop()
+            agendar_indexacao([manual_path], hashes={manual_path: sha_manual})
+            arquivos_publicar.append((manual_path, f"pdfs/{manual_filename}"))
+            # o PDF entra no mesmo commit do database.json que o referencia
+            manual_url = github_raw_url(f"pdfs/{manual_filename}")
+
+        # montar objeto do produto mantendo imagens como caminho local
         novo_produto = {
             "codigo": codigo_busca,
             "nome": nome_novo,
             "descricao": descricao_novo,
+            "imagem": f"{IMAGENS_DIR}/{img_filename}",
         }
-        # manter imagem como era: preferir comportamento anterior (local path) se desejar
-        if image_url:
-            # se preferir manter exatamente o fluxo anterior que gravava caminho local,
-            # substitua a linha abaixo por: novo_produto["imagem"] = f"{IMAGENS_DIR}/{img_filename}"
-            novo_produto["imagem"] = f"{IMAGENS_DIR}/{img_filename}"
-        else:
-            novo_produto["imagem"] = f"{IMAGENS_DIR}/{img_filename}"
-
-        # manual: somente se upload do PDF foi bem sucedido
         if manual_url:
             novo_produto["manual"] = manual_url
 
-        produtos.append(novo_produto)
-        salvar_produtos(produtos)
+        try:
+            armazenamento.inserir_produto(novo_produto)
+        except CodigoDuplicado:
+            st.error(f"Já existe uma peça com o código {codigo_busca}. Use a busca por código para adicioná-la.")
+            st.stop()
+        arquivos_publicar.append((PRODUTOS_FILE, "database/database.json"))
 
-        # enviar database.json ao GitHub (se desejar manter esse envio)
-        resp_db = github_upload(PRODUTOS_FILE, "database/database.json", f"Atualizando database.json após cadastrar produto {codigo_busca}")
-        if getattr(resp_db, "status_code", None) in [200, 201]:
-            st.success("📘 database.json atualizado no GitHub!")
-        else:
-            st.warning("database.json salvo localmente; envio ao GitHub falhou ou não autorizado.")
+        enfileirar_publicacao(arquivos_publicar, f"Cadastrando produto {codigo_busca}")
+        st.info("📤 Envio ao GitHub agendado (acompanhe em 'Envios ao GitHub').")
 
-        st.session_state.pecas_cliente.append(novo_produto)
+        st.session_state.pecas_cliente.append(Peca.de_dict(novo_produto))
         st.success("Produto cadastrado e adicionado ao catálogo!")
 
 # LISTA DE PEÇAS
@@ -309,21 +221,18 @@ if st.button("📁 Salvar Catálogo do Cliente"):
         "cliente": cliente,
         "vendedor": vendedor,
         "contato": contato,
-        "pecas": st.session_state.pecas_cliente
+        # só os códigos: os dados das peças ficam no database
+        "pecas": referencias([p["codigo"] for p in st.session_state.pecas_cliente])
     }
 
     json_name = f"{cliente.replace(' ', '_').lower()}.json"
     json_path_local = f"{CLIENTES_DIR}/{json_name}"
-    with open(json_path_local, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    with secao("salvar_catalogo"):
+        armazenamento.salvar_catalogo(json_path_local, data)
 
     st.success("Catálogo salvo localmente!")
 
-    resp_json = github_upload(json_path_local, f"clientes/{json_name}", f"Salvando catálogo do cliente {cliente}")
-    if getattr(resp_json, "status_code", None) in [200, 201]:
-        st.success("🎉 Catálogo enviado ao GitHub!")
-    else:
-        st.warning("Catálogo salvo localmente; envio ao GitHub falhou ou não autorizado.")
+    enfileirar_publicacao([(json_path_local, f"clientes/{json_name}")], f"Salvando catálogo do cliente {cliente}")
 
     st.session_state.reset = True
     st.rerun()
@@ -1,12 +1,24 @@
 import streamlit as st
-import json
 import os
-from PIL import Image
-import base64
-import requests
-import time
+
+from utils.armazenamento import CodigoDuplicado, ConflitoVersao, obter_armazenamento
+from utils.travas import versao_registro
+from utils.resolucao import ajustes_da_entrada, codigo_da_entrada, referencias, resolver_pecas
+from utils.images import imagem_para_largura
+from utils.manuais import agendar_indexacao
+from utils.uploads import UploadGrandeDemais, gravar_upload, salvar_imagem_upload
+from utils.github import github_raw_url
+from utils.fila import enfileirar_publicacao
+from components.busca_pecas import render_busca_pecas
+from utils.metricas import iniciar_exportacao
+from utils.perfil import iniciar_execucao, secao
+from components.fila_status import render_status_fila
+from components.perfil_painel import render_painel_perfil
 
 st.set_page_config(page_title="Editar Catálogo", page_icon="📘")
+iniciar_execucao("editar_catalogos")
+iniciar_exportacao()
+render_painel_perfil()
 
 # --------------------------------------------------
 # Autenticação local nesta página (login integrado)
@@ -41,126 +53,38 @@ CATALOGOS_DIR = "clientes"
 IMAGENS_DIR = "imagens"
 PDFS_DIR = "pdfs"
 PRODUTOS_FILE = "database/database.json"
-DEFAULT_BRANCH = st.secrets.get("GITHUB_BRANCH", "main")
 
 # --------------------------------------------------
 # Funções auxiliares
 # --------------------------------------------------
+# leitura/gravação passam pelo backend configurado (JSON ou SQLite)
+armazenamento = obter_armazenamento()
+
 def carregar_catalogo(caminho):
-    with open(caminho, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return armazenamento.carregar_catalogo(caminho)
 
 def salvar_catalogo(caminho, dados):
-    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
-    with open(caminho, "w", encoding="utf-8") as f:
-        json.dump(dados, f, indent=4, ensure_ascii=False)
-
-def carregar_produtos():
-    if not os.path.exists(PRODUTOS_FILE):
-        return []
-    with open(PRODUTOS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def salvar_produtos(produtos):
-    os.makedirs(os.path.dirname(PRODUTOS_FILE) or ".", exist_ok=True)
-    with open(PRODUTOS_FILE, "w", encoding="utf-8") as f:
-        json.dump(produtos, f, indent=2, ensure_ascii=False)
-
-def _resp_obj(status, text):
-    class R:
-        def __init__(self, status, text):
-            self.status_code = status
-            self._text = text
-        def json(self):
-            try:
-                return json.loads(self._text)
-            except Exception:
-                return {"error": self._text}
-        @property
-        def text(self):
-            return self._text
-    return R(status, text)
-
-def github_raw_url_with_commit(repo_path, commit_sha):
-    user = st.secrets["GITHUB_USER"]
-    repo = st.secrets["GITHUB_REPO"]
-    return f"https://raw.githubusercontent.com/{user}/{repo}/{commit_sha}/{repo_path}"
-
-def github_raw_url(repo_path):
-    user = st.secrets["GITHUB_USER"]
-    repo = st.secrets["GITHUB_REPO"]
-    branch = st.secrets.get("GITHUB_BRANCH", DEFAULT_BRANCH)
-    return f"https://raw.githubusercontent.com/{user}/{repo}/{branch}/{repo_path}"
-
-def github_upload(path, repo_path, message, max_retries=2):
     """
-    Envia arquivo ao GitHub (API Contents).
-    Retorna requests.Response ou objeto compatível em caso de erro.
+    Grava o catálogo (só com as referências das peças) se ninguém o
+    alterou desde a versão que este admin estava vendo; do contrário
+    avisa e interrompe.
     """
-    token = st.secrets["GITHUB_TOKEN"].strip()
-    user = st.secrets["GITHUB_USER"]
-    repo = st.secrets["GITHUB_REPO"]
-    headers = {
-        "Authorization": f"token {token}",
-        "Accept": "application/vnd.github.v3+json"
-    }
-
-    # quick auth test
+    dados["pecas"] = referencias(dados["pecas"])
     try:
-        auth_resp = requests.get("https://api.github.com/user", headers=headers, timeout=10)
-    except Exception as e:
-        return _resp_obj(500, f"Auth test failed: {e}")
-    if auth_resp.status_code != 200:
-        return _resp_obj(auth_resp.status_code, auth_resp.text)
-
-    url = f"https://api.github.com/repos/{user}/{repo}/contents/{repo_path}"
-
-    try:
-        with open(path, "rb") as f:
-            content_bytes = f.read()
-    except Exception as e:
-        return _resp_obj(500, f"File read failed: {e}")
-
-    content_b64 = base64.b64encode(content_bytes).decode()
-
-    # GET with retry on 500
-    get_file = None
-    for attempt in range(max_retries):
-        try:
-            get_file = requests.get(url, headers=headers, timeout=15)
-        except Exception as e:
-            if attempt + 1 < max_retries:
-                time.sleep(1)
-                continue
-            else:
-                return _resp_obj(500, f"GET failed: {e}")
-        if get_file.status_code == 500 and attempt + 1 < max_retries:
-            time.sleep(1)
-            continue
-        break
-
-    sha = None
-    if get_file is not None and get_file.status_code == 200:
-        try:
-            sha = get_file.json().get("sha")
-        except Exception:
-            sha = None
-
-    payload = {"message": message, "content": content_b64}
-    if sha:
-        payload["sha"] = sha
-
-    try:
-        resp = requests.put(url, headers=headers, json=payload, timeout=30)
-    except Exception as e:
-        return _resp_obj(500, f"PUT failed: {e}")
-
-    return resp
+        with secao("salvar_catalogo"):
+            armazenamento.salvar_catalogo(caminho, dados, versao_esperada=versao_vista)
+    except ConflitoVersao:
+        # a versão atual passa a ser a vista: a próxima tentativa parte dela
+        st.session_state[key_versao] = versao_registro(carregar_catalogo(caminho))
+        st.error("⚠️ Este catálogo foi alterado por outra sessão. A página foi recarregada com a versão atual; refaça a alteração.")
+        st.stop()
+    st.session_state[key_versao] = versao_registro(carregar_catalogo(caminho))
 
 # --------------------------------------------------
 # Página
 # --------------------------------------------------
 st.header("🛠 Editar Catálogos Existentes")
+render_status_fila()
 
 if not os.path.exists(CATALOGOS_DIR):
     st.warning(f"A pasta '{CATALOGOS_DIR}' não existe.")
@@ -174,7 +98,25 @@ if len(arquivos) == 0:
 nome_catalogo = st.selectbox("Selecione um catálogo:", arquivos)
 caminho_catalogo = os.path.join(CATALOGOS_DIR, nome_catalogo)
 
-catalogo = carregar_catalogo(caminho_catalogo)
+with secao("carregar_catalogo"):
+    catalogo = carregar_catalogo(caminho_catalogo)
+
+# versão que o admin carregou: guardada ao escolher o catálogo (ou ao
+# recarregá-lo) e renovada só depois de salvar; reruns de outros widgets
+# não a trocam, então uma gravação de outra sessão nesse meio tempo é
+# detectada ao salvar
+key_versao = f"versao_catalogo_{nome_catalogo}"
+recarregar = st.button("🔄 Recarregar catálogo")
+if recarregar or st.session_state.get("catalogo_carregado") != nome_catalogo:
+    for chave in [k for k in st.session_state if str(k).startswith(f"versao_peca_{nome_catalogo}_")]:
+        del st.session_state[chave]
+    # o formulário das peças volta a mostrar o que está gravado
+    for i in range(len(catalogo.get("pecas", []))):
+        st.session_state.pop(f"nome_{i}", None)
+        st.session_state.pop(f"desc_{i}", None)
+    st.session_state[key_versao] = versao_registro(catalogo)
+    st.session_state["catalogo_carregado"] = nome_catalogo
+versao_vista = st.session_state[key_versao]
 
 if "pecas" not in catalogo:
     st.error("Esse catálogo não possui o formato esperado (sem 'pecas').")
@@ -184,33 +126,55 @@ catalogo.setdefault("cliente", "")
 
 cliente_edit = st.text_input("Nome do cliente:", value=catalogo["cliente"])
 
+# o catálogo guarda referências; para exibir, cada peça vem do database
+with secao("resolver_pecas"):
+    pecas_resolvidas = {peca["codigo"]: peca for peca in resolver_pecas(catalogo, nome_catalogo)[0]}
+
 st.markdown("---")
 st.subheader("Peças do catálogo")
 
 remover_indices = []
 
-for i, p in enumerate(catalogo["pecas"]):
+for i, entrada in enumerate(catalogo["pecas"]):
+    codigo_entrada = codigo_da_entrada(entrada)
+    p = pecas_resolvidas.get(codigo_entrada) or {"codigo": codigo_entrada}
+    # o formulário edita a peça do database (vale para todos os catálogos),
+    # então parte dela e não da versão com os ajustes deste cliente
+    base = armazenamento.obter_produto(codigo_entrada)
+    # versão da peça de quando o formulário foi carregado, guardada como a
+    # do catálogo: é ela que vai para o upsert ao confirmar
+    key_versao_peca = f"versao_peca_{nome_catalogo}_{codigo_entrada}"
+    if key_versao_peca not in st.session_state:
+        st.session_state[key_versao_peca] = versao_registro(base)
+    versao_peca_vista = st.session_state[key_versao_peca]
+    if base is None:
+        # entrada antiga com a peça embutida e ausente do database
+        base = {k: v for k, v in entrada.items() if k != "ajustes"} if isinstance(entrada, dict) else dict(p)
+    ajustes_cliente = ajustes_da_entrada(entrada)
     with st.expander(f"{p.get('nome', 'Sem nome')} — {p.get('codigo', '')}", expanded=False):
+        if ajustes_cliente:
+            st.caption(f"Este catálogo ajusta: {', '.join(sorted(ajustes_cliente))}. "
+                       "O formulário altera a peça do database, sem esses ajustes.")
         form_key = f"form_peca_{i}"
         with st.form(key=form_key):
-            nome_input = st.text_input("Nome:", value=p.get("nome", ""), key=f"nome_{i}")
-            desc_input = st.text_area("Descrição:", value=p.get("descricao", ""), key=f"desc_{i}")
+            nome_input = st.text_input("Nome:", value=base.get("nome", ""), key=f"nome_{i}")
+            desc_input = st.text_area("Descrição:", value=base.get("descricao", ""), key=f"desc_{i}")
 
             st.write("Imagem atual:")
-            imagem_atual = p.get("imagem", None)
+            imagem_atual = base.get("imagem", None)
             if imagem_atual:
                 if isinstance(imagem_atual, str) and (imagem_atual.startswith("http://") or imagem_atual.startswith("https://")):
                     st.image(imagem_atual, width=200)
                 else:
                     if os.path.exists(imagem_atual):
-                        st.image(imagem_atual, width=200)
+                        st.image(imagem_para_largura(imagem_atual, 200), width=200)
                     else:
                         st.info("Imagem não encontrada localmente.")
             else:
                 st.info("Sem imagem.")
 
-            if p.get("manual"):
-                st.markdown(f"[📘 Manual atual em PDF]({p['manual']})")
+            if base.get("manual"):
+                st.markdown(f"[📘 Manual atual em PDF]({base['manual']})")
 
             nova_img = st.file_uploader("Nova imagem (opcional)", type=["png", "jpg", "jpeg"], key=f"img_{i}")
             nova_pdf = st.file_uploader("Novo manual em PDF (opcional)", type=["pdf"], key=f"pdf_{i}")
@@ -219,20 +183,19 @@ for i, p in enumerate(catalogo["pecas"]):
             remover = st.form_submit_button("Remover peça")
 
             if remover:
+                # processada logo abaixo, após o laço (um st.rerun() aqui descartaria a marcação)
                 remover_indices.append(i)
                 st.success("Peça marcada para remoção. Clique em 'Salvar catálogo' para confirmar.")
-                st.rerun()
 
             if confirmar:
-                # Atualiza campos locais
-                catalogo["pecas"][i]["nome"] = nome_input
-                catalogo["pecas"][i]["descricao"] = desc_input
-
                 img_filename = None
                 manual_filename = None
                 manual_url = None
 
-                # Nova imagem: salva localmente e faz upload (mantém caminho local no catálogo)
+                # arquivos desta alteração: vão ao GitHub em um único commit
+                arquivos_publicar = []
+
+                # Nova imagem: salva localmente (mantém caminho local no catálogo)
                 if nova_img is not None:
                     ext = nova_img.name.split(".")[-1].lower()
                     if ext == "jpeg":
@@ -242,88 +205,58 @@ for i, p in enumerate(catalogo["pecas"]):
 
                     os.makedirs(IMAGENS_DIR, exist_ok=True)
 
-                    image = Image.open(nova_img)
-                    if ext == "jpg" and image.mode in ("RGBA", "P"):
-                        image = image.convert("RGB")
-                    format_map = {"jpg": "JPEG", "png": "PNG"}
-                    image_format = format_map.get(ext)
-                    image.save(img_path, format=image_format)
-
-                    # Mantém caminho local no catálogo
-                    catalogo["pecas"][i]["imagem"] = f"{IMAGENS_DIR}/{img_filename}"
-
-                    # Faz upload ao GitHub (mantendo comportamento anterior)
-                    resp_img = github_upload(
-                        img_path,
-                        f"imagens/{img_filename}",
-                        f"Atualizando imagem da peça {p.get('codigo', i)}"
-                    )
-                    if getattr(resp_img, "status_code", None) in [200, 201]:
-                        st.success("📸 Imagem atualizada no GitHub!")
-                    else:
-                        st.warning("Imagem salva localmente; envio ao GitHub falhou ou não autorizado.")
+                    try:
+                        variantes = salvar_imagem_upload(nova_img, img_path, ext)
+                    except ValueError as e:
+                        st.error(f"Imagem recusada: {e}")
+                        st.stop()
+
+                    arquivos_publicar.append((img_path, f"imagens/{img_filename}"))
+                    arquivos_publicar += [(caminho_variante, caminho_variante) for caminho_variante in variantes]
 
-                # Novo PDF: salva localmente, tenta upload e só grava URL pública se upload OK
+                # Novo PDF: salva localmente; a URL pública aponta para o branch,
+                # pois o PDF vai no mesmo commit do database.json que o referencia
                 if nova_pdf is not None:
                     manual_filename = f"{p.get('codigo', i)}.pdf"
                     manual_path = os.path.join(PDFS_DIR, manual_filename)
-                    os.makedirs(PDFS_DIR, exist_ok=True)
-                    with open(manual_path, "wb") as f:
-                        f.write(nova_pdf.read())
-
-                    resp_pdf = github_upload(
-                        manual_path,
-                        f"pdfs/{manual_filename}",
-                        f"Atualizando manual PDF da peça {p.get('codigo', i)}"
-                    )
-                    if getattr(resp_pdf, "status_code", None) in [200, 201]:
-                        # tenta extrair commit SHA do retorno da API para montar URL que referencia a versão exata
-                        commit_sha = None
-                        try:
-                            resp_json = resp_pdf.json()
-                            commit_sha = resp_json.get("commit", {}).get("sha")
-                        except Exception:
-                            commit_sha = None
-
-                        if commit_sha:
-                            manual_url = github_raw_url_with_commit(f"pdfs/{manual_filename}", commit_sha)
-                        else:
-                            # fallback para branch-based raw URL
-                            manual_url = github_raw_url(f"pdfs/{manual_filename}")
-
-                        catalogo["pecas"][i]["manual"] = manual_url
-                        st.success("📑 Manual PDF atualizado no GitHub!")
-                    else:
-                        st.error("Erro ao atualizar manual PDF no GitHub")
-                        st.code(getattr(resp_pdf, "text", str(resp_pdf)))
-                        # não altera o campo manual no catálogo
-
-                # SALVAR CATALOGO IMEDIATAMENTE para refletir mudanças na UI
-                salvar_catalogo(caminho_catalogo, catalogo)
-
-                # Atualiza também o database/local produtos (mantendo imagem como caminho local)
-                produtos = carregar_produtos()
-                for prod in produtos:
-                    if prod.get("codigo") == p.get("codigo"):
-                        prod["nome"] = nome_input
-                        prod["descricao"] = desc_input
-                        if img_filename:
-                            prod["imagem"] = f"{IMAGENS_DIR}/{img_filename}"
-                        if manual_filename and manual_url:
-                            prod["manual"] = manual_url
-                        break
-                salvar_produtos(produtos)
-
-                # Tenta atualizar database.json no GitHub (se falhar, mantemos local)
-                resp_db = github_upload(
-                    PRODUTOS_FILE,
-                    "database/database.json",
-                    f"Atualizando produto {p.get('codigo')} no database.json"
-                )
-                if getattr(resp_db, "status_code", None) in [200, 201]:
-                    st.success("📘 database.json atualizado no GitHub!")
-                else:
-                    st.warning("database.json salvo localmente; envio ao GitHub falhou ou não autorizado.")
+                    try:
+                        _, sha_manual = gravar_upload(nova_pdf, manual_path)
+                    except UploadGrandeDemais as e:
+                        st.error(f"Manual recusado: {e}")
+                        st.stop()
+                    agendar_indexacao([manual_path], hashes={manual_path: sha_manual})
+
+                    manual_url = github_raw_url(f"pdfs/{manual_filename}")
+                    arquivos_publicar.append((manual_path, f"pdfs/{manual_filename}"))
+
+                # a peça só existe no database: uma única gravação atualiza
+                # todos os catálogos que a referenciam (imagem como caminho local)
+                prod = armazenamento.obter_produto(p.get("codigo"))
+                peca_nova = prod is None
+                if peca_nova:
+                    prod = dict(base)
+                prod["nome"] = nome_input
+                prod["descricao"] = desc_input
+                if img_filename:
+                    prod["imagem"] = f"{IMAGENS_DIR}/{img_filename}"
+                if manual_filename and manual_url:
+                    prod["manual"] = manual_url
+                try:
+                    armazenamento.upsert_produto(prod, versao_esperada=versao_peca_vista)
+                except ConflitoVersao:
+                    st.session_state[key_versao_peca] = versao_registro(armazenamento.obter_produto(prod["codigo"]))
+                    st.error("⚠️ Esta peça foi alterada por outra sessão no database. Refaça a alteração.")
+                    st.stop()
+                st.session_state[key_versao_peca] = versao_registro(armazenamento.obter_produto(prod["codigo"]))
+                arquivos_publicar.append((PRODUTOS_FILE, "database/database.json"))
+
+                # entrada antiga com a peça embutida: com a peça no database,
+                # salvar_catalogo a reduz à referência (mais os ajustes explícitos)
+                if isinstance(entrada, dict) and set(entrada) - {"codigo", "ajustes"}:
+                    salvar_catalogo(caminho_catalogo, catalogo)
+
+                # imagem, manual e database.json vão juntos, em segundo plano
+                enfileirar_publicacao(arquivos_publicar, f"Atualizando produto {p.get('codigo')}")
 
                 st.success("Alterações aplicadas localmente. Clique em 'Salvar catálogo' para gravar no arquivo.")
                 st.rerun()
@@ -332,31 +265,32 @@ for i, p in enumerate(catalogo["pecas"]):
 # Remover peças
 # --------------------------------------------------
 if remover_indices:
+    # só a referência sai deste catálogo: a peça continua no database,
+    # onde outros catálogos podem usá-la
     for idx in sorted(remover_indices, reverse=True):
-        p_to_remove = catalogo["pecas"][idx]
-        codigo_removido = p_to_remove.get("codigo")
         catalogo["pecas"].pop(idx)
 
-        # SALVAR CATALOGO IMEDIATAMENTE após remoção
-        salvar_catalogo(caminho_catalogo, catalogo)
-
-        produtos = carregar_produtos()
-        produtos = [prod for prod in produtos if prod.get("codigo") != codigo_removido]
-        salvar_produtos(produtos)
-
-        resp_db = github_upload(
-            PRODUTOS_FILE,
-            "database/database.json",
-            f"Removendo produto {codigo_removido} do database.json"
-        )
-        if getattr(resp_db, "status_code", None) in [200, 201]:
-            st.success("📘 database.json atualizado no GitHub!")
-        else:
-            st.warning("database.json salvo localmente; envio ao GitHub falhou ou não autorizado.")
+    # SALVAR CATALOGO IMEDIATAMENTE após remoção
+    salvar_catalogo(caminho_catalogo, catalogo)
 
     st.success("Peças removidas localmente. Clique em 'Salvar catálogo' para gravar no arquivo.")
     st.rerun()
 
+st.markdown("---")
+st.subheader("Adicionar peça já cadastrada")
+
+def adicionar_peca_existente(produto):
+    codigos_no_catalogo = {codigo_da_entrada(e) for e in catalogo["pecas"]}
+    if produto.get("codigo") in codigos_no_catalogo:
+        st.warning("Essa peça já está no catálogo.")
+        return
+    catalogo["pecas"].append(produto["codigo"])
+    salvar_catalogo(caminho_catalogo, catalogo)
+    st.success(f"Peça {produto.get('codigo')} adicionada ao catálogo.")
+    st.rerun()
+
+render_busca_pecas("busca_existente", adicionar_peca_existente)
+
 st.markdown("---")
 st.subheader("Adicionar nova peça ao catálogo")
 
@@ -369,6 +303,8 @@ pdf_novo = st.file_uploader("Manual em PDF (novo):", type=["pdf"], key="pdf_novo
 if st.button("Adicionar peça"):
     if not codigo_novo or not nome_novo or not img_nova:
         st.error("Preencha todos os campos e envie uma imagem.")
+    elif armazenamento.obter_produto(codigo_novo) is not None:
+        st.error(f"Já existe uma peça com o código {codigo_novo}. Use 'Adicionar peça já cadastrada'.")
     else:
         # ---------------- SALVAR IMAGEM ----------------
         ext = img_nova.name.split(".")[-1].lower()
@@ -380,12 +316,11 @@ if st.button("Adicionar peça"):
 
         os.makedirs(IMAGENS_DIR, exist_ok=True)
 
-        image = Image.open(img_nova)
-        if ext == "jpg" and image.mode in ("RGBA", "P"):
-            image = image.convert("RGB")
-        format_map = {"jpg": "JPEG", "png": "PNG"}
-        image_format = format_map.get(ext)
-        image.save(img_path, format=image_format)
+        try:
+            variantes = salvar_imagem_upload(img_nova, img_path, ext)
+        except ValueError as e:
+            st.error(f"Imagem recusada: {e}")
+            st.stop()
 
         # ---------------- SALVAR PDF (se existir) ----------------
         manual_filename = None
@@ -393,33 +328,15 @@ if st.button("Adicionar peça"):
         if pdf_novo is not None:
             manual_filename = f"{codigo_novo}.pdf"
             manual_path = os.path.join(PDFS_DIR, manual_filename)
-            os.makedirs(PDFS_DIR, exist_ok=True)
-            with open(manual_path, "wb") as f:
-                f.write(pdf_novo.read())
-
-            resp_pdf = github_upload(
-                manual_path,
-                f"pdfs/{manual_filename}",
-                f"Adicionando manual PDF da peça {codigo_novo}"
-            )
-            if getattr(resp_pdf, "status_code", None) in [200, 201]:
-                # extrai commit sha para garantir versão exata
-                commit_sha = None
-                try:
-                    resp_json = resp_pdf.json()
-                    commit_sha = resp_json.get("commit", {}).get("sha")
-                except Exception:
-                    commit_sha = None
-
-                if commit_sha:
-                    manual_url = github_raw_url_with_commit(f"pdfs/{manual_filename}", commit_sha)
-                else:
-                    manual_url = github_raw_url(f"pdfs/{manual_filename}")
+            try:
+                _, sha_manual = gravar_upload(pdf_novo, manual_path)
+            except UploadGrandeDemais as e:
+                st.error(f"Manual recusado: {e}")
+                st.stop()
+            agendar_indexacao([manual_path], hashes={manual_path: sha_manual})
 
-                st.success("📑 Manual PDF enviado ao GitHub!")
-            else:
-                st.error("Erro ao enviar manual PDF")
-                st.code(getattr(resp_pdf, "text", str(resp_pdf)))
+            # vai no mesmo commit do database.json, então a URL aponta para o branch
+            manual_url = github_raw_url(f"pdfs/{manual_filename}")
 
         # ---------------- CRIAR PEÇA ----------------
         nova_peca = {
@@ -432,35 +349,25 @@ if st.button("Adicionar peça"):
         if manual_url:
             nova_peca["manual"] = manual_url
 
-        catalogo["pecas"].append(nova_peca)
+        try:
+            armazenamento.inserir_produto(nova_peca)
+        except CodigoDuplicado:
+            st.error(f"Já existe uma peça com o código {codigo_novo}. Use 'Adicionar peça já cadastrada'.")
+            st.stop()
+
+        catalogo["pecas"].append(codigo_novo)
 
         # SALVAR CATALOGO IMEDIATAMENTE
         salvar_catalogo(caminho_catalogo, catalogo)
 
-        produtos = carregar_produtos()
-        produtos.append(nova_peca)
-        salvar_produtos(produtos)
-
-        # Faz upload da imagem ao GitHub (mantendo comportamento anterior)
-        resp_img = github_upload(
-            img_path,
-            f"imagens/{img_filename}",
-            f"Adicionando imagem da peça {codigo_novo}"
-        )
-        if getattr(resp_img, "status_code", None) in [200, 201]:
-            st.success("📸 Imagem enviada ao GitHub!")
-        else:
-            st.warning("Imagem salva localmente; envio ao GitHub falhou ou não autorizado.")
-
-        resp_db = github_upload(
-            PRODUTOS_FILE,
-            "database/database.json",
-            f"Atualizando database.json após adicionar produto {codigo_novo}"
-        )
-        if getattr(resp_db, "status_code", None) in [200, 201]:
-            st.success("📘 database.json atualizado no GitHub!")
-        else:
-            st.warning("database.json salvo localmente; envio ao GitHub falhou ou não autorizado.")
+        # imagem, variantes, manual e database.json em um único commit
+        arquivos_publicar = [(img_path, f"imagens/{img_filename}")]
+        arquivos_publicar += [(caminho_variante, caminho_variante) for caminho_variante in variantes]
+        if manual_url:
+            arquivos_publicar.append((manual_path, f"pdfs/{manual_filename}"))
+        arquivos_publicar.append((PRODUTOS_FILE, "database/database.json"))
+
+        enfileirar_publicacao(arquivos_publicar, f"Adicionando produto {codigo_novo}")
 
         st.success("Peça adicionada com sucesso! Clique em 'Salvar catálogo' para gravar no arquivo.")
         st.rerun()
@@ -474,14 +381,11 @@ if st.button("💾 Salvar catálogo"):
     catalogo["cliente"] = cliente_edit
     salvar_catalogo(caminho_catalogo, catalogo)
 
-    resp_json = github_upload(
-        caminho_catalogo,
-        f"clientes/{nome_catalogo}",
+    enfileirar_publicacao(
+        [(caminho_catalogo, f"clientes/{nome_catalogo}")],
         f"Atualizando catálogo do cliente {cliente_edit}"
     )
-    if getattr(resp_json, "status_code", None) in [200, 201]:
-        st.success("🎉 Catálogo atualizado e enviado ao GitHub!")
-    else:
-        st.warning("Catálogo salvo localmente; envio ao GitHub falhou ou não autorizado.")
+    st.success("🎉 Catálogo salvo localmente!")
+    st.info("📤 Envio ao GitHub agendado (acompanhe em 'Envios ao GitHub').")
 
     st.rerun()
@@ -0,0 +1,119 @@
+# Streamlit page name: Importar Produtos
+import streamlit as st
+import tempfile
+import zipfile
+
+from utils.armazenamento import obter_armazenamento
+from utils.importacao import extrair_imagens, imagens_do_zip, importar, ler_planilha, validar
+from utils.uploads import UploadGrandeDemais
+from utils.metricas import iniciar_exportacao
+from utils.perfil import iniciar_execucao, secao
+from components.fila_status import render_status_fila
+from components.perfil_painel import render_painel_perfil
+
+# ===========================
+# CONFIGURAÇÕES
+# ===========================
+st.set_page_config(page_title="Importar Produtos", page_icon="📥")
+iniciar_execucao("importar_produtos")
+iniciar_exportacao()
+render_painel_perfil()
+
+PASSWORD = st.secrets["ADMIN_PASSWORD"]
+
+# ===========================
+# LOGIN
+# ===========================
+if "auth" not in st.session_state:
+    st.session_state.auth = False
+
+if not st.session_state.auth:
+    st.title("🔐 Área Restrita")
+    senha = st.text_input("Digite a senha:", type="password")
+    if st.button("Entrar"):
+        if senha == PASSWORD:
+            st.session_state.auth = True
+            st.rerun()
+        else:
+            st.error("Senha incorreta!")
+    st.stop()
+
+# ===========================
+# INTERFACE PRINCIPAL
+# ===========================
+st.title("📥 Importar Produtos em Lote")
+render_status_fila()
+
+st.write(
+    "Envie uma planilha **CSV** ou **XLSX** com as colunas `codigo` e `nome` "
+    "(obrigatórias) e, opcionalmente, `descricao`, `imagem` e `manual`. "
+    "Na coluna `imagem`, use uma URL ou o nome do arquivo dentro do ZIP de imagens."
+)
+
+planilha = st.file_uploader("Planilha de produtos", type=["csv", "xlsx"])
+zip_imagens = st.file_uploader("Imagens (ZIP, opcional)", type=["zip"])
+atualizar = st.checkbox("Atualizar peças já cadastradas (em vez de recusá-las)")
+
+if planilha is None:
+    st.stop()
+
+try:
+    with secao("ler_planilha"):
+        df = ler_planilha(planilha, planilha.name)
+except Exception as e:
+    st.error(f"Não foi possível ler a planilha: {e}")
+    st.stop()
+
+imagens_disponiveis = set()
+if zip_imagens is not None:
+    try:
+        with zipfile.ZipFile(zip_imagens) as zf:
+            imagens_disponiveis = imagens_do_zip(zf)
+    except (zipfile.BadZipFile, UploadGrandeDemais) as e:
+        st.error(f"Não foi possível ler o ZIP de imagens: {e}")
+        st.stop()
+
+armazenamento = obter_armazenamento()
+with secao("validar"):
+    validos, erros = validar(df, armazenamento.mapa_produtos(), imagens_disponiveis, atualizar)
+
+col1, col2, col3 = st.columns(3)
+col1.metric("Linhas", len(df))
+col2.metric("Válidas", len(validos))
+col3.metric("Com erro", len(erros))
+
+if len(erros):
+    st.warning("As linhas abaixo serão ignoradas:")
+    st.dataframe(erros, hide_index=True, use_container_width=True)
+
+if len(validos):
+    with st.expander(f"Prévia das {len(validos)} linha(s) válida(s)"):
+        st.dataframe(validos.head(200), hide_index=True, use_container_width=True)
+
+if st.button(f"📥 Importar {len(validos)} produto(s)", disabled=len(validos) == 0):
+    barra = st.progress(0.0, text="Processando imagens...")
+
+    def ao_progresso(feitos, total):
+        barra.progress(feitos / total, text=f"Processando imagens... {feitos}/{total}")
+
+    with tempfile.TemporaryDirectory() as pasta:
+        if zip_imagens is not None:
+            # só as imagens citadas nas linhas válidas
+            citadas = validos.loc[validos["imagem"] != "", "imagem"].str.replace("\\", "/", regex=False)
+            zip_imagens.seek(0)
+            try:
+                with zipfile.ZipFile(zip_imagens) as zf:
+                    extrair_imagens(zf, citadas, pasta)
+            except (zipfile.BadZipFile, UploadGrandeDemais) as e:
+                st.error(f"ZIP de imagens recusado: {e}")
+                st.stop()
+        with secao("importar"):
+            resultado = importar(validos, pasta, ao_progresso=ao_progresso)
+    barra.progress(1.0, text="Concluído")
+
+    if len(resultado["erros"]):
+        st.warning("Falharam no processamento das imagens:")
+        st.dataframe(resultado["erros"], hide_index=True, use_container_width=True)
+    st.success(f"✅ {resultado['importados']} produto(s) gravado(s) no database.")
+    if resultado["job"] is not None:
+        st.info("📤 Envio ao GitHub agendado (acompanhe em 'Envios ao GitHub').")
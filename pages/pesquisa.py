@@ -1,21 +1,26 @@
 import streamlit as st
-import json
 import urllib.parse
 
 from utils.images import img_to_base64
 from utils.clients import carregar_cliente
-from utils.importDatabase import carregar_database
+from utils.resolucao import resolver_pecas
 from components.header import render_header
-from components.wpp_button import render_wpp_button
-from components.peca import render_peca
+from utils.metricas import iniciar_exportacao
+from utils.perfil import iniciar_execucao, secao
+from components.catalogo import render_catalogo
+from components.perfil_painel import render_painel_perfil
 
 
 # -----------------------------------------------------------
 # CONFIG INICIAL
 # -----------------------------------------------------------
 st.set_page_config(page_title="WCE", layout="wide")
+iniciar_execucao("pesquisa")
+iniciar_exportacao()
+render_painel_perfil()
 
-logo_base64 = img_to_base64("imagens/Logo.png")
+with secao("logo"):
+    logo_base64 = img_to_base64("imagens/Logo.png")
 render_header(logo_base64)
 
 ADMIN_PASSWORD = "SV2024"
@@ -139,7 +144,8 @@ if cliente_id == "":
 # 1. PROCESSAR CLIENTE
 # -----------------------------------------------------------
 
-dados_cliente = carregar_cliente(cliente_id)
+with secao("carregar_cliente"):
+    dados_cliente = carregar_cliente(cliente_id)
 
 if dados_cliente is None:
     st.error(f"❌ O cliente '{cliente_id}' não foi encontrado.")
@@ -148,36 +154,14 @@ if dados_cliente is None:
 nome_cliente = dados_cliente.get("cliente", cliente_id)
 contato_vendedor = dados_cliente.get("contato", "")
 
-# Normalizar lista de peças do cliente
-pecas_raw = dados_cliente.get("pecas", [])
-
-codigos_pecas = []
-
-for item in pecas_raw:
-    if isinstance(item, dict):
-        # caso venha algo como {"codigo": "123"}
-        if "codigo" in item:
-            codigos_pecas.append(item["codigo"])
-        else:
-            st.warning(f"Formato inesperado de peça no cliente '{nome_cliente}': {item}")
-    else:
-        # caso seja apenas o código como string
-        codigos_pecas.append(item)
-
-
 # -----------------------------------------------------------
-# 2. CARREGAR BASE DE PRODUTOS DO DATABASE.JSON
+# 2. RESOLVER AS PEÇAS DO CLIENTE NO DATABASE
 # -----------------------------------------------------------
-pecas_bd = carregar_database()
-
-pecas = []
-for codigo in codigos_pecas:
-    if codigo in pecas_bd:
-        item = pecas_bd[codigo].copy()
-        item["codigo"] = codigo
-        pecas.append(item)
-    else:
-        st.warning(f"⚠ Peça '{codigo}' não encontrada no database.")
+# o catálogo guarda só os códigos (e ajustes do cliente); os dados vêm do database
+with secao("resolver_pecas"):
+    pecas, faltando = resolver_pecas(dados_cliente, cliente_id)
+for codigo in faltando:
+    st.warning(f"⚠ Peça '{codigo}' não encontrada no database.")
 
 # -----------------------------------------------------------
 # 3. EXIBIR LISTA DE PEÇAS
@@ -204,25 +188,11 @@ with col1:
             st.rerun()
 st.subheader("Selecione as peças desejadas abaixo:")
 
-pecas_selecionadas = []
-quantidades = {}
-
-st.subheader("📦 Lista de Peças Disponíveis")
-
-for idx, peca in enumerate(pecas):
-    st.markdown("---")
-    # renderiza o componente visual da peça (mantém comportamento atual)
-    render_peca(peca, idx, quantidades, pecas_selecionadas)
-
+def botao_manual(peca):
     # Ao exibir o catálogo para o cliente, se a peça tiver manual, mostramos um botão estilizado
     manual_url = peca.get("manual")
     if manual_url:
         pdf_button(manual_url, "📘 Abrir manual")
 
-if not pecas_selecionadas:
-    st.warning("Selecione pelo menos uma peça para continuar.")
-    st.stop()
-
-texto_itens = "\n".join([f"- {p['nome']} (código {p['codigo']}) — Quantidade: {quantidades[p['codigo']]}" for p in pecas_selecionadas])
-mensagem = f"Pedido de Aquisição de Peças\nCliente: {nome_cliente}\n\nItens Selecionados:\n{texto_itens}"
-render_wpp_button(contato_vendedor, mensagem)
+with secao("render_catalogo"):
+    render_catalogo(pecas, cliente_id, nome_cliente, contato_vendedor, render_extra=botao_manual)
@@ -0,0 +1,795 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+
+import streamlit as st
+
+from utils.clients import CLIENTES_DIR, registrar_cliente, slug_cliente
+from utils.colunar import MapaProdutos, abrir_colunar, conflitos_colunar, gravar_colunar
+from utils.metricas import contar, cronometrar
+from utils.modelo import Peca
+from utils.perfil import registrar_leitura
+from utils.travas import gravar_atomico, trava_arquivo, versao_registro
+
+# -----------------------------------------------------------
+# Camada de armazenamento de peças e catálogos
+# -----------------------------------------------------------
+# Backends:
+#   "json"   -> database/database.json e clientes/*.json (padrão);
+#               alterações de peças vão para um journal ao lado do
+#               database.json e são incorporadas a ele na compactação
+#   "sqlite" -> database/armazenamento.db, com escrita linha a linha;
+#               database.json e clientes/*.json continuam sendo gerados
+#               para o espelho no GitHub.
+# Escolhido por ARMAZENAMENTO em secrets (ou variável de ambiente).
+#
+# Concorrência: toda gravação acontece sob a trava do arquivo
+# (utils/travas.py) e arquivos inteiros são trocados com os.replace.
+# upsert_produto / salvar_catalogo aceitam `versao_esperada`
+# (versao_registro() do que a sessão leu): se outra sessão gravou no
+# meio-tempo, levantam ConflitoVersao em vez de sobrescrever.
+PRODUTOS_FILE = "database/database.json"
+JOURNAL_FILE = "database/database.journal.jsonl"
+LIMITE_JOURNAL = 256 * 1024   # bytes; acima disso o journal é compactado
+SQLITE_FILE = "database/armazenamento.db"
+
+
+class ConflitoVersao(Exception):
+    """O registro mudou desde que a sessão o leu."""
+
+
+class CodigoDuplicado(Exception):
+    """Já existe uma peça com este código."""
+
+
+def _gravar_json(caminho, dados, indent=2):
+    tipo = "database" if caminho == PRODUTOS_FILE else "catalogo"
+    with cronometrar("reposicao_json_gravacao_segundos", arquivo=tipo):
+        gravar_atomico(caminho, json.dumps(dados, indent=indent, ensure_ascii=False, default=dict).encode("utf-8"))
+
+
+def _conferir_versao(atual, versao_esperada, descricao):
+    if versao_esperada is not None and versao_registro(atual) != versao_esperada:
+        raise ConflitoVersao(f"{descricao} foi alterado por outra sessão")
+
+
+def _aplicar_registro(pecas, registro):
+    """Aplica uma linha do journal sobre o dict {codigo: peça} (idempotente)."""
+    if registro.get("op") == "upsert":
+        pecas[registro["produto"]["codigo"]] = Peca.de_dict(registro["produto"])
+    elif registro.get("op") == "remover":
+        for codigo in registro["codigos"]:
+            pecas.pop(codigo, None)
+
+
+def _indexar(produtos):
+    """
+    Lista -> dict {codigo: Peca} na ordem do arquivo. Retorna também os
+    códigos repetidos com conteúdo diferente (fica a última cópia, como
+    sempre foi; `deduplicar` resolve de vez).
+    """
+    pecas = {}
+    conflitos = set()
+    for p in produtos:
+        p = Peca.de_dict(p)
+        anterior = pecas.get(p.codigo)
+        if anterior is not None and anterior != p:
+            conflitos.add(p.codigo)
+        pecas[p.codigo] = p
+    return pecas, conflitos
+
+
+def _gravar_colunar_em_segundo_plano(produtos, stat_json):
+    # fora do caminho da leitura/gravação; até a cópia ficar pronta (ou se
+    # ficar para trás de outra), os leitores usam o JSON
+    threading.Thread(target=gravar_colunar, args=(PRODUTOS_FILE, produtos, stat_json), name="copia-colunar").start()
+
+
+class ArmazenamentoJSON:
+    """
+    database.json é o último snapshot; cada alteração de peça é anexada
+    como uma linha em database.journal.jsonl e os leitores reaplicam o
+    journal sobre o snapshot. O snapshot só é reescrito na compactação e
+    no exportar (arquivo temporário + os.replace), nunca pela metade. Gravações de
+    peças usam a trava do database.json; cada catálogo tem a sua.
+
+    Em memória as peças ficam em um dict {codigo: Peca} (utils/modelo.py),
+    reconstruído só quando os arquivos mudam; consultas e upserts por
+    código são O(1).
+    Com a cópia colunar do snapshot em dia (utils/colunar.py), esse dict
+    é um MapaProdutos sobre a tabela Arrow, sem ler o JSON.
+    """
+    nome = "json"
+
+    def __init__(self):
+        # contador de gravações deste processo: entra na chave do cache
+        # para que duas gravações no mesmo tique de mtime não passem batido
+        self._geracao = 0
+        self._memo_lock = threading.Lock()
+        self._memo = {"chave": None, "pecas": None}
+        self._conflitos_avisados = set()
+        self._exportado = None   # chave_produtos logo após o último exportar
+
+    # ----------------- peças -----------------
+    def chave_produtos(self):
+        """Identifica a versão atual das peças; FileNotFoundError se não houver base."""
+        st_arq = os.stat(PRODUTOS_FILE)
+        try:
+            st_jor = os.stat(JOURNAL_FILE)
+            jor = (st_jor.st_mtime_ns, st_jor.st_size)
+        except FileNotFoundError:
+            jor = None
+        return (st_arq.st_mtime_ns, st_arq.st_size, jor, self._geracao)
+
+    def _chave_ou_none(self):
+        try:
+            return self.chave_produtos()
+        except FileNotFoundError:
+            return None
+
+    def _ler_journal(self):
+        if not os.path.exists(JOURNAL_FILE):
+            return []
+        registros = []
+        with cronometrar("reposicao_json_leitura_segundos", arquivo="journal"), \
+                open(JOURNAL_FILE, "r", encoding="utf-8") as f:
+            registrar_leitura(os.fstat(f.fileno()).st_size)
+            for linha in f:
+                try:
+                    registros.append(json.loads(linha))
+                except ValueError:
+                    # última linha incompleta (queda no meio da escrita): ignora
+                    continue
+        return registros
+
+    def _ler_snapshot(self):
+        """(dict {codigo: Peca}, códigos em conflito) lidos de database.json."""
+        if not os.path.exists(PRODUTOS_FILE):
+            return _indexar([])
+        with cronometrar("reposicao_json_leitura_segundos", arquivo="database"), \
+                open(PRODUTOS_FILE, "r", encoding="utf-8") as f:
+            stat_json = os.fstat(f.fileno())
+            registrar_leitura(stat_json.st_size)
+            produtos = json.load(f)
+        indexado = _indexar(produtos)
+        # JSON sem cópia colunar atual (primeira execução, edição por fora): refaz
+        # a cópia, só depois de montar as peças para não disputar o GIL com isso
+        _gravar_colunar_em_segundo_plano(produtos, stat_json)
+        return indexado
+
+    def _ler_base(self):
+        """(dict {codigo: Peca}, códigos em conflito) do snapshot, pela cópia colunar se estiver em dia."""
+        tabela = abrir_colunar(PRODUTOS_FILE)
+        if tabela is None:
+            return self._ler_snapshot()
+        with cronometrar("reposicao_json_leitura_segundos", arquivo="database_colunar"):
+            registrar_leitura(tabela.nbytes)
+            pecas = MapaProdutos(tabela)
+            return pecas, conflitos_colunar(tabela) if pecas.tem_repetidos() else set()
+
+    def mapa_produtos(self):
+        """
+        Dict {codigo: Peca} atual, compartilhado: não altere o dict
+        (obter_produto devolve a peça como dict próprio, para edição).
+        """
+        chave = self._chave_ou_none()
+        with self._memo_lock:
+            if chave is not None and self._memo["chave"] == chave:
+                contar("reposicao_cache_consultas_total", cache="produtos", resultado="acerto")
+                return self._memo["pecas"]
+        contar("reposicao_cache_consultas_total", cache="produtos", resultado="falta")
+        # journal antes do snapshot: se uma compactação acontecer entre as
+        # duas leituras, o journal é reaplicado (idempotente) sobre o
+        # snapshot novo, sem perder alterações e sem precisar da trava
+        registros = self._ler_journal()
+        pecas, conflitos = self._ler_base()
+        for registro in registros:
+            _aplicar_registro(pecas, registro)
+        novos = conflitos - self._conflitos_avisados
+        if novos:
+            self._conflitos_avisados |= novos
+            print(f"[armazenamento] códigos repetidos com conteúdo diferente em {PRODUTOS_FILE}: "
+                  f"{', '.join(sorted(novos))} (rode python -m utils.armazenamento deduplicar)")
+        with self._memo_lock:
+            self._memo = {"chave": chave, "pecas": pecas}
+        return pecas
+
+    def carregar_produtos(self):
+        return list(self.mapa_produtos().values())
+
+    def salvar_produtos(self, produtos):
+        """Grava um snapshot completo e descarta o journal."""
+        with trava_arquivo(PRODUTOS_FILE):
+            self._gravar_snapshot(produtos)
+
+    def _gravar_snapshot(self, produtos, manter_journal=False):
+        _gravar_json(PRODUTOS_FILE, produtos)
+        _gravar_colunar_em_segundo_plano(produtos, os.stat(PRODUTOS_FILE))
+        # se cair aqui (ou com manter_journal), o journal antigo é reaplicado
+        # sobre o snapshot novo; como upsert/remoção são idempotentes, o
+        # resultado é o mesmo
+        if not manter_journal and os.path.exists(JOURNAL_FILE):
+            os.remove(JOURNAL_FILE)
+        self._geracao += 1
+
+    def _gravar_mapa(self, pecas, manter_journal=False):
+        """
+        Snapshot a partir do dict {codigo: Peca} atual. O dict em memória
+        continua valendo para a chave nova: as mesmas instâncias seguem
+        compartilhadas (a busca atualiza só o que mudou).
+        """
+        self._gravar_snapshot(list(pecas.values()), manter_journal)
+        with self._memo_lock:
+            if self._memo["pecas"] is pecas:
+                self._memo = {"chave": self._chave_ou_none(), "pecas": pecas}
+
+    def _anexar(self, registro):
+        """Anexa um registro ao journal; chamado com a trava do database.json."""
+        chave_antes = self._chave_ou_none()
+        os.makedirs(os.path.dirname(JOURNAL_FILE) or ".", exist_ok=True)
+        linha = (json.dumps(registro, ensure_ascii=False, default=dict) + "\n").encode("utf-8")
+        with cronometrar("reposicao_json_gravacao_segundos", arquivo="journal"), \
+                open(JOURNAL_FILE, "a+b") as f:
+            # fecha uma linha deixada incompleta por uma queda anterior
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    linha = b"\n" + linha
+            f.write(linha)
+            f.flush()
+            os.fsync(f.fileno())
+        self._geracao += 1
+
+        # mantém o dict em memória em dia sem reler os arquivos; é uma
+        # cópia rasa (quem já tem o dict antigo continua com ele intacto)
+        with self._memo_lock:
+            if chave_antes is not None and self._memo["chave"] == chave_antes:
+                pecas = self._memo["pecas"].copy()
+                _aplicar_registro(pecas, registro)
+                self._memo = {"chave": self._chave_ou_none(), "pecas": pecas}
+
+        if os.path.getsize(JOURNAL_FILE) > LIMITE_JOURNAL:
+            self._gravar_mapa(self.mapa_produtos())
+
+    def compactar(self):
+        """Incorpora o journal em um novo database.json."""
+        with trava_arquivo(PRODUTOS_FILE):
+            if os.path.exists(JOURNAL_FILE):
+                self._gravar_mapa(self.mapa_produtos())
+
+    def obter_produto(self, codigo):
+        produto = self.mapa_produtos().get(codigo)
+        return dict(produto) if produto is not None else None
+
+    def upsert_produto(self, produto, versao_esperada=None):
+        with trava_arquivo(PRODUTOS_FILE):
+            if versao_esperada is not None:
+                _conferir_versao(self.obter_produto(produto["codigo"]), versao_esperada,
+                                 f"A peça {produto['codigo']}")
+            self._anexar({"op": "upsert", "produto": produto})
+
+    def upsert_produtos(self, produtos):
+        """Várias peças de uma vez (importação): um único snapshot novo."""
+        with trava_arquivo(PRODUTOS_FILE):
+            pecas = self.mapa_produtos().copy()
+            for produto in produtos:
+                pecas[produto["codigo"]] = produto
+            self._gravar_snapshot(list(pecas.values()))
+
+    def inserir_produto(self, produto):
+        """Cadastra uma peça nova; CodigoDuplicado se o código já existe."""
+        with trava_arquivo(PRODUTOS_FILE):
+            if produto["codigo"] in self.mapa_produtos():
+                raise CodigoDuplicado(produto["codigo"])
+            self._anexar({"op": "upsert", "produto": produto})
+
+    def remover_produtos(self, codigos):
+        with trava_arquivo(PRODUTOS_FILE):
+            self._anexar({"op": "remover", "codigos": sorted(codigos)})
+
+    # ----------------- catálogos -----------------
+    def carregar_catalogo(self, caminho):
+        with cronometrar("reposicao_json_leitura_segundos", arquivo="catalogo"), \
+                open(caminho, "r", encoding="utf-8") as f:
+            registrar_leitura(os.fstat(f.fileno()).st_size)
+            return json.load(f)
+
+    def salvar_catalogo(self, caminho, dados, versao_esperada=None):
+        with trava_arquivo(caminho):
+            if versao_esperada is not None:
+                atual = self.carregar_catalogo(caminho) if os.path.exists(caminho) else None
+                _conferir_versao(atual, versao_esperada, "O catálogo")
+            _gravar_json(caminho, dados)
+            registrar_cliente(caminho, dados)
+
+    # ----------------- espelho -----------------
+    def exportar(self, caminhos_locais=None):
+        """
+        Grava em database.json o estado completo (snapshot + journal) antes
+        de ir para o GitHub, para que o espelho fique em dia. O journal não
+        é apagado (reaplicá-lo dá o mesmo resultado) e continua crescendo
+        até LIMITE_JOURNAL: publicar não força uma compactação a cada envio.
+        Sem alterações desde o último exportar, não regrava nada.
+        """
+        if caminhos_locais is not None and os.path.normpath(PRODUTOS_FILE) not in {
+            os.path.normpath(c) for c in caminhos_locais
+        }:
+            return []
+        with trava_arquivo(PRODUTOS_FILE):
+            chave = self._chave_ou_none()
+            if chave is not None and os.path.exists(JOURNAL_FILE) and chave != self._exportado:
+                self._gravar_mapa(self.mapa_produtos(), manter_journal=True)
+                self._exportado = self._chave_ou_none()
+        return [PRODUTOS_FILE]
+
+
+class ArmazenamentoSQLite:
+    """
+    Peças e catálogos em SQLite. Cada gravação é uma transação
+    BEGIN IMMEDIATE: o próprio SQLite serializa os escritores (entre
+    processos) só pelo tempo de uma linha.
+    """
+    nome = "sqlite"
+
+    def __init__(self, caminho=SQLITE_FILE):
+        self.caminho = caminho
+        with closing(self._conectar()) as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS produtos (
+                    codigo TEXT PRIMARY KEY,
+                    posicao INTEGER NOT NULL,
+                    dados TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_produtos_posicao ON produtos(posicao);
+                CREATE TABLE IF NOT EXISTS catalogos (
+                    arquivo TEXT PRIMARY KEY,
+                    slug TEXT NOT NULL,
+                    dados TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_catalogos_slug ON catalogos(slug);
+                CREATE TABLE IF NOT EXISTS meta (
+                    chave TEXT PRIMARY KEY,
+                    valor TEXT NOT NULL
+                );
+            """)
+            importado = conn.execute("SELECT valor FROM meta WHERE chave = 'importado'").fetchone()
+            if importado is None:
+                self._importar_json(conn)
+
+    def _conectar(self):
+        os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.caminho, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @contextmanager
+    def _transacao(self):
+        conn = self._conectar()
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def _importar_json(self, conn):
+        """Primeira carga: copia database.json e clientes/*.json para o banco."""
+        with conn:
+            if os.path.exists(PRODUTOS_FILE):
+                with open(PRODUTOS_FILE, "r", encoding="utf-8") as f:
+                    pecas, conflitos = _indexar(json.load(f))
+                if conflitos:
+                    print(f"[armazenamento] códigos repetidos com conteúdo diferente importados pela última cópia: "
+                          f"{', '.join(sorted(conflitos))}")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO produtos (codigo, posicao, dados) VALUES (?, ?, ?)",
+                    [(p["codigo"], posicao, json.dumps(p, ensure_ascii=False, default=dict))
+                     for posicao, p in enumerate(pecas.values())],
+                )
+            if os.path.isdir(CLIENTES_DIR):
+                for arq in os.listdir(CLIENTES_DIR):
+                    if not arq.endswith(".json"):
+                        continue
+                    try:
+                        with open(os.path.join(CLIENTES_DIR, arq), "r", encoding="utf-8") as f:
+                            dados = json.load(f)
+                    except Exception:
+                        continue
+                    conn.execute(
+                        "INSERT OR REPLACE INTO catalogos (arquivo, slug, dados) VALUES (?, ?, ?)",
+                        (arq, slug_cliente(dados.get("cliente", "")), json.dumps(dados, ensure_ascii=False)),
+                    )
+            conn.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES ('importado', '1')")
+            self._incrementar_versao(conn)
+
+    def _incrementar_versao(self, conn):
+        conn.execute("""
+            INSERT INTO meta (chave, valor) VALUES ('versao_produtos', '1')
+            ON CONFLICT(chave) DO UPDATE SET valor = CAST(valor AS INTEGER) + 1
+        """)
+
+    # ----------------- peças -----------------
+    def chave_produtos(self):
+        with closing(self._conectar()) as conn:
+            linha = conn.execute("SELECT valor FROM meta WHERE chave = 'versao_produtos'").fetchone()
+        return ("sqlite", linha[0] if linha else "0")
+
+    def carregar_produtos(self):
+        with closing(self._conectar()) as conn:
+            linhas = conn.execute("SELECT dados FROM produtos ORDER BY posicao").fetchall()
+        return [json.loads(l[0]) for l in linhas]
+
+    def mapa_produtos(self):
+        return {p["codigo"]: Peca.de_dict(p) for p in self.carregar_produtos()}
+
+    def salvar_produtos(self, produtos):
+        with self._transacao() as conn:
+            conn.execute("DELETE FROM produtos")
+            conn.executemany(
+                "INSERT OR REPLACE INTO produtos (codigo, posicao, dados) VALUES (?, ?, ?)",
+                [(p["codigo"], i, json.dumps(p, ensure_ascii=False, default=dict)) for i, p in enumerate(produtos)],
+            )
+            self._incrementar_versao(conn)
+
+    def obter_produto(self, codigo):
+        with closing(self._conectar()) as conn:
+            linha = conn.execute("SELECT dados FROM produtos WHERE codigo = ?", (codigo,)).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def upsert_produto(self, produto, versao_esperada=None):
+        with self._transacao() as conn:
+            if versao_esperada is not None:
+                linha = conn.execute("SELECT dados FROM produtos WHERE codigo = ?", (produto["codigo"],)).fetchone()
+                _conferir_versao(json.loads(linha[0]) if linha else None, versao_esperada,
+                                 f"A peça {produto['codigo']}")
+            conn.execute(
+                """
+                INSERT INTO produtos (codigo, posicao, dados)
+                VALUES (?, (SELECT COALESCE(MAX(posicao), -1) + 1 FROM produtos), ?)
+                ON CONFLICT(codigo) DO UPDATE SET dados = excluded.dados
+                """,
+                (produto["codigo"], json.dumps(produto, ensure_ascii=False, default=dict)),
+            )
+            self._incrementar_versao(conn)
+
+    def upsert_produtos(self, produtos):
+        with self._transacao() as conn:
+            conn.executemany(
+                """
+                INSERT INTO produtos (codigo, posicao, dados)
+                VALUES (?, (SELECT COALESCE(MAX(posicao), -1) + 1 FROM produtos), ?)
+                ON CONFLICT(codigo) DO UPDATE SET dados = excluded.dados
+                """,
+                [(p["codigo"], json.dumps(p, ensure_ascii=False, default=dict)) for p in produtos],
+            )
+            self._incrementar_versao(conn)
+
+    def inserir_produto(self, produto):
+        """Cadastra uma peça nova; CodigoDuplicado se o código já existe."""
+        with self._transacao() as conn:
+            try:
+                conn.execute(
+                    "INSERT INTO produtos (codigo, posicao, dados) "
+                    "VALUES (?, (SELECT COALESCE(MAX(posicao), -1) + 1 FROM produtos), ?)",
+                    (produto["codigo"], json.dumps(produto, ensure_ascii=False, default=dict)),
+                )
+            except sqlite3.IntegrityError:
+                raise CodigoDuplicado(produto["codigo"])
+            self._incrementar_versao(conn)
+
+    def remover_produtos(self, codigos):
+        with self._transacao() as conn:
+            conn.executemany("DELETE FROM produtos WHERE codigo = ?", [(c,) for c in codigos])
+            self._incrementar_versao(conn)
+
+    # ----------------- catálogos -----------------
+    def carregar_catalogo(self, caminho):
+        with closing(self._conectar()) as conn:
+            linha = conn.execute(
+                "SELECT dados FROM catalogos WHERE arquivo = ?", (os.path.basename(caminho),)
+            ).fetchone()
+        if linha:
+            return json.loads(linha[0])
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def carregar_catalogo_por_slug(self, slug):
+        with closing(self._conectar()) as conn:
+            linha = conn.execute("SELECT dados FROM catalogos WHERE slug = ?", (slug,)).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def salvar_catalogo(self, caminho, dados, versao_esperada=None):
+        arquivo = os.path.basename(caminho)
+        with trava_arquivo(caminho):
+            with self._transacao() as conn:
+                if versao_esperada is not None:
+                    linha = conn.execute("SELECT dados FROM catalogos WHERE arquivo = ?", (arquivo,)).fetchone()
+                    _conferir_versao(json.loads(linha[0]) if linha else None, versao_esperada, "O catálogo")
+                conn.execute(
+                    "INSERT OR REPLACE INTO catalogos (arquivo, slug, dados) VALUES (?, ?, ?)",
+                    (arquivo, slug_cliente(dados.get("cliente", "")), json.dumps(dados, ensure_ascii=False, default=dict)),
+                )
+            # o arquivo do cliente é pequeno: mantém o espelho sempre em dia
+            _gravar_json(caminho, dados)
+            registrar_cliente(caminho, dados)
+
+    # ----------------- espelho -----------------
+    def exportar(self, caminhos_locais=None):
+        """
+        Regrava database.json a partir do banco (para o espelho no GitHub).
+        Com `caminhos_locais`, só exporta se database.json estiver na lista.
+        """
+        if caminhos_locais is not None and os.path.normpath(PRODUTOS_FILE) not in {
+            os.path.normpath(c) for c in caminhos_locais
+        }:
+            return []
+        with trava_arquivo(PRODUTOS_FILE):
+            _gravar_json(PRODUTOS_FILE, self.carregar_produtos())
+        return [PRODUTOS_FILE]
+
+    def exportar_tudo(self):
+        gerados = self.exportar()
+        with closing(self._conectar()) as conn:
+            linhas = conn.execute("SELECT arquivo, dados FROM catalogos").fetchall()
+        for arquivo, dados in linhas:
+            caminho = os.path.join(CLIENTES_DIR, arquivo)
+            _gravar_json(caminho, json.loads(dados))
+            gerados.append(caminho)
+        return gerados
+
+
+# -----------------------------------------------------------
+# Backend do processo
+# -----------------------------------------------------------
+_backend_lock = threading.Lock()
+_backend = {"instancia": None}
+
+
+def _nome_backend():
+    try:
+        nome = st.secrets.get("ARMAZENAMENTO")
+    except Exception:
+        nome = None
+    return (nome or os.environ.get("ARMAZENAMENTO") or "json").lower()
+
+
+def obter_armazenamento():
+    with _backend_lock:
+        if _backend["instancia"] is None:
+            nome = _nome_backend()
+            _backend["instancia"] = ArmazenamentoSQLite() if nome == "sqlite" else ArmazenamentoJSON()
+        return _backend["instancia"]
+
+
+# -----------------------------------------------------------
+# Migração: códigos repetidos em database.json
+# -----------------------------------------------------------
+def _com_journal(produtos, registros):
+    """
+    Reaplica o journal sobre a lista crua do snapshot. Um código tocado
+    pelo journal fica com uma só cópia (a do journal, na posição da
+    primeira) ou some; as cópias repetidas dos outros continuam na lista.
+    """
+    final = {}
+    for registro in registros:
+        if registro.get("op") == "upsert":
+            final[registro["produto"]["codigo"]] = registro["produto"]
+        elif registro.get("op") == "remover":
+            for codigo in registro["codigos"]:
+                final[codigo] = None
+    resultado, emitidos = [], set()
+    for p in produtos:
+        codigo = p["codigo"]
+        if codigo not in final:
+            resultado.append(p)
+        elif codigo not in emitidos:
+            emitidos.add(codigo)
+            if final[codigo] is not None:
+                resultado.append(final[codigo])
+    resultado += [p for codigo, p in final.items() if p is not None and codigo not in emitidos]
+    return resultado
+
+
+def deduplicar(manter=None):
+    """
+    Remove de database.json as cópias repetidas de um mesmo código.
+    Cópias idênticas são unificadas; cópias diferentes são conflitos e
+    ficam como estão, a menos que `manter` seja "primeira" ou "ultima".
+    Retorna (unificados, conflitos) com conflitos = {codigo: campos que diferem}.
+    """
+    arm = obter_armazenamento()
+    if not isinstance(arm, ArmazenamentoJSON):
+        arm = ArmazenamentoJSON()
+    with trava_arquivo(PRODUTOS_FILE):
+        # o snapshot cru (compactar juntaria as cópias antes de compará-las)
+        # mais o journal, que ninguém grava enquanto a trava estiver aqui
+        with open(PRODUTOS_FILE, "r", encoding="utf-8") as f:
+            produtos = _com_journal(json.load(f), arm._ler_journal())
+
+        grupos = {}
+        for p in produtos:
+            grupos.setdefault(p["codigo"], []).append(p)
+
+        unificados, conflitos, escolhida = [], {}, {}
+        for codigo, copias in grupos.items():
+            if len(copias) == 1:
+                continue
+            if all(c == copias[0] for c in copias):
+                unificados.append(codigo)
+                escolhida[codigo] = copias[0]
+                continue
+            campos = set().union(*copias)
+            conflitos[codigo] = sorted(k for k in campos if len({json.dumps(c.get(k), sort_keys=True) for c in copias}) > 1)
+            if manter in ("primeira", "ultima"):
+                escolhida[codigo] = copias[0] if manter == "primeira" else copias[-1]
+
+        resultado, emitidos = [], set()
+        for p in produtos:
+            codigo = p["codigo"]
+            if codigo not in escolhida:
+                resultado.append(p)   # único ou conflito não resolvido
+            elif codigo not in emitidos:
+                resultado.append(escolhida[codigo])   # na posição da primeira cópia
+                emitidos.add(codigo)
+
+        if len(resultado) != len(produtos):
+            # snapshot novo (journal incorporado, cópia colunar refeita)
+            arm._gravar_snapshot(resultado)
+    return unificados, conflitos
+
+
+# -----------------------------------------------------------
+# Teste de estresse: vários processos gravando ao mesmo tempo
+# -----------------------------------------------------------
+def _novo_backend(nome):
+    return ArmazenamentoSQLite() if nome == "sqlite" else ArmazenamentoJSON()
+
+
+def _com_retentativa(funcao):
+    while True:
+        try:
+            return funcao()
+        except ConflitoVersao:
+            continue
+
+
+def _escritor_estresse(n, escritas, nome_backend, limite_journal):
+    global LIMITE_JOURNAL
+    LIMITE_JOURNAL = limite_journal  # força compactações no meio do teste
+    arm = _novo_backend(nome_backend)
+    catalogo = os.path.join(CLIENTES_DIR, "estresse.json")
+
+    def incluir_no_catalogo(codigo):
+        dados = arm.carregar_catalogo(catalogo)
+        versao = versao_registro(dados)
+        dados["pecas"].append(codigo)
+        arm.salvar_catalogo(catalogo, dados, versao_esperada=versao)
+
+    def incrementar_compartilhada():
+        prod = arm.obter_produto("COMPARTILHADA")
+        versao = versao_registro(prod)
+        prod["contador"] += 1
+        arm.upsert_produto(prod, versao_esperada=versao)
+
+    for j in range(escritas):
+        codigo = f"P{n}-{j}"
+        arm.upsert_produto({"codigo": codigo, "nome": f"Peça {codigo}"})
+        _com_retentativa(lambda: incluir_no_catalogo(codigo))
+        _com_retentativa(incrementar_compartilhada)
+
+
+def teste_estresse(processos=8, escritas=40, nome_backend="json", limite_journal=4096):
+    """
+    Roda `processos` escritores concorrentes em uma pasta temporária,
+    com um leitor lendo os arquivos sem parar, e confere que nenhuma
+    gravação se perdeu e que nenhum leitor viu JSON pela metade.
+    """
+    import multiprocessing
+    import tempfile
+    import time
+
+    origem = os.getcwd()
+    with tempfile.TemporaryDirectory() as pasta:
+        os.chdir(pasta)
+        try:
+            os.makedirs(CLIENTES_DIR)
+            arm = _novo_backend(nome_backend)
+            arm.salvar_produtos([{"codigo": "COMPARTILHADA", "contador": 0}])
+            catalogo = os.path.join(CLIENTES_DIR, "estresse.json")
+            arm.salvar_catalogo(catalogo, {"cliente": "Estresse", "pecas": []})
+
+            parar = threading.Event()
+            leituras = {"ok": 0, "erros": 0}
+
+            def leitor():
+                while not parar.is_set():
+                    try:
+                        arm.carregar_produtos()
+                        with open(catalogo, "r", encoding="utf-8") as f:
+                            json.load(f)
+                        leituras["ok"] += 1
+                    except (ValueError, OSError):
+                        leituras["erros"] += 1
+
+            thread = threading.Thread(target=leitor, daemon=True)
+            thread.start()
+            inicio = time.perf_counter()
+            # "spawn": os escritores não herdam do pai conexões SQLite nem
+            # travas presas pela thread leitora (um fork() aqui corrompe o banco)
+            contexto = multiprocessing.get_context("spawn")
+            procs = [
+                contexto.Process(target=_escritor_estresse, args=(n, escritas, nome_backend, limite_journal))
+                for n in range(processos)
+            ]
+            for proc in procs:
+                proc.start()
+            for proc in procs:
+                proc.join()
+            duracao = time.perf_counter() - inicio
+            parar.set()
+            thread.join()
+
+            arm.exportar()
+            produtos = {p["codigo"]: p for p in arm.carregar_produtos()}
+            esperados = {f"P{n}-{j}" for n in range(processos) for j in range(escritas)}
+            no_catalogo = arm.carregar_catalogo(catalogo)["pecas"]
+            total = processos * escritas
+            falhas = []
+            if any(proc.exitcode != 0 for proc in procs):
+                falhas.append("algum escritor terminou com erro")
+            if not esperados <= produtos.keys():
+                falhas.append(f"{len(esperados - produtos.keys())} peça(s) perdida(s)")
+            if produtos["COMPARTILHADA"]["contador"] != total:
+                falhas.append(f"contador compartilhado = {produtos['COMPARTILHADA']['contador']}, esperado {total}")
+            if sorted(no_catalogo) != sorted(esperados):
+                falhas.append(f"catálogo com {len(no_catalogo)} de {total} peças")
+            if leituras["erros"]:
+                falhas.append(f"{leituras['erros']} leitura(s) de JSON incompleto")
+
+            print(f"backend={nome_backend} processos={processos} gravações={total * 3} "
+                  f"em {duracao:.2f}s, leituras concorrentes={leituras['ok']}")
+            for falha in falhas:
+                print(f"FALHA: {falha}")
+            return not falhas
+        finally:
+            os.chdir(origem)
+
+
+if __name__ == "__main__":
+    # python -m utils.armazenamento exportar  -> regrava database.json e clientes/*.json
+    # python -m utils.armazenamento compactar -> incorpora o journal ao database.json
+    # python -m utils.armazenamento estresse [json|sqlite] -> escritores concorrentes
+    # python -m utils.armazenamento deduplicar [--manter primeira|ultima]
+    import sys
+    if sys.argv[1:2] == ["deduplicar"]:
+        manter = sys.argv[3] if sys.argv[2:3] == ["--manter"] else None
+        unificados, conflitos = deduplicar(manter)
+        for codigo in unificados:
+            print(f"{codigo}: cópias idênticas unificadas")
+        for codigo, campos in conflitos.items():
+            acao = f"mantida a {'última' if manter == 'ultima' else 'primeira'} cópia" if manter else "NÃO alterado"
+            print(f"{codigo}: cópias diferentes em {', '.join(campos)} — {acao}")
+        if not unificados and not conflitos:
+            print("nenhum código repetido")
+        sys.exit(1 if conflitos and not manter else 0)
+    elif sys.argv[1:2] == ["estresse"]:
+        ok = teste_estresse(nome_backend=(sys.argv[2:3] or ["json"])[0])
+        sys.exit(0 if ok else 1)
+    elif sys.argv[1:] == ["compactar"]:
+        arm = obter_armazenamento()
+        if hasattr(arm, "compactar"):
+            arm.compactar()
+        print("journal compactado")
+    elif sys.argv[1:] == ["exportar"]:
+        arm = obter_armazenamento()
+        gerados = arm.exportar_tudo() if hasattr(arm, "exportar_tudo") else arm.exportar()
+        print(f"{len(gerados)} arquivo(s) exportado(s)")
+    else:
+        print("uso: python -m utils.armazenamento exportar|compactar|deduplicar|estresse")
@@ -0,0 +1,324 @@
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+from operator import itemgetter
+
+from utils.colunar import MapaProdutos
+from utils.importDatabase import carregar_database
+
+# -----------------------------------------------------------
+# Índice de busca textual das peças (código, nome, descrição)
+# -----------------------------------------------------------
+# - tokens: token -> {codigo: peso do campo}  (índice invertido)
+# - vocabulario: lista ordenada de tokens     (prefixo via bisect)
+# - trigramas: trigrama -> {token}            (aproximação para erros de digitação)
+# - codigos: código dobrado -> {codigo}       (bônus para o código exato)
+PESOS_CAMPOS = {"codigo": 3, "nome": 2, "descricao": 1}
+MAX_EXPANSAO_PREFIXO = 200
+SIMILARIDADE_MINIMA = 0.4
+
+_nao_alfanumerico = re.compile(r"[^a-z0-9]+")
+
+
+class _TabelaDobra(dict):
+    """Tabela de str.translate: cada caractere é dobrado na primeira vez que aparece."""
+
+    def __missing__(self, ordem):
+        texto = unicodedata.normalize("NFKD", chr(ordem))
+        texto = "".join(c for c in texto if not unicodedata.combining(c)).lower()
+        dobrado = self[ordem] = _nao_alfanumerico.sub(" ", texto)
+        return dobrado
+
+
+_dobra = _TabelaDobra()
+
+
+def dobrar(texto):
+    """Minúsculas, sem acentos e com pontuação trocada por espaço."""
+    return " ".join(str(texto or "").translate(_dobra).split())
+
+
+def _trigramas(token):
+    t = f"  {token} "
+    return {t[i:i + 3] for i in range(len(t) - 2)}
+
+
+class IndiceBusca:
+    def __init__(self):
+        self._docs = {}
+        self._tokens = {}
+        self._vocabulario = []
+        self._trigramas = {}
+        self._codigos = {}
+
+    def __len__(self):
+        return len(self._docs)
+
+    # ----------------- manutenção -----------------
+    def _assinatura(self, peca):
+        return tuple(str(peca.get(campo) or "") for campo in PESOS_CAMPOS)
+
+    def _tokens_da_peca(self, assinatura):
+        pesos = {}
+        for campo, valor in zip(PESOS_CAMPOS, assinatura):
+            for token in dobrar(valor).split():
+                pesos[token] = max(pesos.get(token, 0), PESOS_CAMPOS[campo])
+        return pesos
+
+    @classmethod
+    def construir(cls, pecas):
+        """Índice novo com todas as `pecas` (vocabulário ordenado uma vez, no fim)."""
+        indice = cls()
+        if isinstance(pecas, MapaProdutos):
+            # direto das colunas: não monta uma Peca por linha
+            assinaturas = ((codigo, tuple(str(v or "") for v in valores))
+                           for codigo, valores in pecas.campos(tuple(PESOS_CAMPOS)))
+        else:
+            assinaturas = ((codigo, indice._assinatura(peca)) for codigo, peca in pecas.items())
+        for codigo, assinatura in assinaturas:
+            indice._incluir(codigo, assinatura, ordenar=False)
+        indice._vocabulario = sorted(indice._tokens)
+        return indice
+
+    def adicionar(self, codigo, peca):
+        assinatura = self._assinatura(peca)
+        if self._docs.get(codigo) == assinatura:
+            return
+        self.remover(codigo)
+        self._incluir(codigo, assinatura)
+
+    def _incluir(self, codigo, assinatura, ordenar=True):
+        self._docs[codigo] = assinatura
+        self._codigos.setdefault(dobrar(codigo), set()).add(codigo)
+        for token, peso in self._tokens_da_peca(assinatura).items():
+            postings = self._tokens.get(token)
+            if postings is None:
+                postings = self._tokens[token] = {}
+                if ordenar:
+                    bisect.insort(self._vocabulario, token)
+                for tri in _trigramas(token):
+                    self._trigramas.setdefault(tri, set()).add(token)
+            postings[codigo] = peso
+
+    def remover(self, codigo):
+        assinatura = self._docs.pop(codigo, None)
+        if assinatura is None:
+            return
+        chave = dobrar(codigo)
+        mesmos = self._codigos.get(chave)
+        if mesmos is not None:
+            mesmos.discard(codigo)
+            if not mesmos:
+                del self._codigos[chave]
+        for token in self._tokens_da_peca(assinatura):
+            postings = self._tokens.get(token)
+            if postings is None:
+                continue
+            postings.pop(codigo, None)
+            if not postings:
+                del self._tokens[token]
+                i = bisect.bisect_left(self._vocabulario, token)
+                if i < len(self._vocabulario) and self._vocabulario[i] == token:
+                    self._vocabulario.pop(i)
+                for tri in _trigramas(token):
+                    grupo = self._trigramas.get(tri)
+                    if grupo is not None:
+                        grupo.discard(token)
+                        if not grupo:
+                            del self._trigramas[tri]
+
+    def sincronizar(self, pecas, codigos=None):
+        """
+        Aplica ao índice apenas as peças novas, alteradas ou removidas.
+        `codigos`: só os códigos que mudaram (sem varrer todas as peças).
+        """
+        if codigos is None:
+            for codigo in [c for c in self._docs if c not in pecas]:
+                self.remover(codigo)
+            codigos = pecas
+        for codigo in codigos:
+            peca = pecas.get(codigo)
+            if peca is None:
+                self.remover(codigo)
+            else:
+                self.adicionar(codigo, peca)
+
+    # ----------------- consulta -----------------
+    def _expandir(self, termo):
+        """Retorna {token do vocabulário: fator de casamento} para um termo."""
+        casados = {}
+        if termo in self._tokens:
+            casados[termo] = 1.0
+
+        if len(termo) < 2:
+            return casados
+
+        i = bisect.bisect_left(self._vocabulario, termo)
+        fim = min(len(self._vocabulario), i + MAX_EXPANSAO_PREFIXO)
+        while i < fim and self._vocabulario[i].startswith(termo):
+            casados.setdefault(self._vocabulario[i], 0.8)
+            i += 1
+
+        if not casados and len(termo) >= 3:
+            tri_termo = _trigramas(termo)
+            contagem = {}
+            for tri in tri_termo:
+                for token in self._trigramas.get(tri, ()):
+                    contagem[token] = contagem.get(token, 0) + 1
+            for token, comuns in contagem.items():
+                sim = comuns / (len(tri_termo) + len(_trigramas(token)) - comuns)
+                if sim >= SIMILARIDADE_MINIMA:
+                    casados[token] = 0.6 * sim
+        return casados
+
+    def buscar(self, consulta, limite=10):
+        """
+        Retorna [(codigo, pontuação)] ordenado por relevância.
+        Todos os termos precisam casar; se nenhuma peça casar com todos,
+        devolve as que casarem com algum termo.
+        """
+        termos = dobrar(consulta).split()
+        if not termos:
+            return []
+
+        expansoes = [self._expandir(termo) for termo in termos]
+        # começa pelo termo mais seletivo para reduzir os candidatos cedo
+        expansoes.sort(key=lambda exp: sum(len(self._tokens[t]) for t in exp))
+
+        def pontuar(exp, restritos=None):
+            """
+            ({codigo: maior fator * peso}, multiplicador). Com um só token
+            devolve as próprias postings (não alterar) e o fator à parte,
+            sem copiar nada.
+            """
+            if len(exp) == 1:
+                (token, fator), = exp.items()
+                return self._tokens[token], fator
+            pontos = {}
+            for token, fator in exp.items():
+                postings = self._tokens[token]
+                if restritos is not None and len(restritos) < len(postings):
+                    itens = ((c, postings[c]) for c in restritos if c in postings)
+                else:
+                    itens = postings.items()
+                for codigo, peso in itens:
+                    valor = fator * peso
+                    if valor > pontos.get(codigo, 0):
+                        pontos[codigo] = valor
+            return pontos, 1.0
+
+        scores, mult = pontuar(expansoes[0])
+        for exp in expansoes[1:]:
+            if not scores:
+                break
+            pontos, fator = pontuar(exp, scores)
+            if mult == fator == 1.0:
+                scores = {c: v + pontos[c] for c, v in scores.items() if c in pontos}
+            else:
+                scores = {c: mult * v + fator * pontos[c] for c, v in scores.items() if c in pontos}
+            mult = 1.0
+
+        if not scores:
+            scores, mult = {}, 1.0
+            for exp in expansoes:
+                pontos, fator = pontuar(exp)
+                for codigo, valor in pontos.items():
+                    scores[codigo] = scores.get(codigo, 0) + fator * valor
+
+        # bônus do código exato aplicado só aos candidatos finais (scores pode
+        # ser a lista de postings do índice, que não pode ser alterada)
+        bonus = [(c, mult * scores[c] + 10) for c in self._codigos.get(" ".join(termos), ()) if c in scores]
+        melhores = heapq.nlargest(limite + len(bonus), scores.items(), key=itemgetter(1))
+        if mult != 1.0:
+            melhores = [(c, mult * v) for c, v in melhores]
+        if bonus:
+            melhores = [r for r in melhores if r[0] not in dict(bonus)] + bonus
+        melhores.sort(key=lambda r: (-r[1], r[0]))
+        return melhores[:limite]
+
+
+# -----------------------------------------------------------
+# Índice compartilhado, sincronizado com o cache do database
+# -----------------------------------------------------------
+# A montagem completa roda numa thread, fora das requisições; enquanto
+# isso as buscas usam o índice anterior (ou avisam que ele está sendo
+# preparado). Depois de uma gravação, só os códigos que mudaram são
+# reindexados: as versões do database compartilham as peças que não
+# mudaram (mesma instância), então a diferença sai por identidade.
+# Cada rerun do Streamlit repete a busca digitada: os resultados ficam em
+# cache até o índice mudar.
+MAX_ALTERACOES_INCREMENTAIS = 5000   # acima disso, remonta em segundo plano
+MAX_RESULTADOS_CACHE = 256
+
+_indice_lock = threading.Lock()
+_estado = {"indice": None, "pecas": None, "montando": False}
+_resultados = {}   # (consulta dobrada, limite) -> [(codigo, pontuação)]
+
+
+def _alteradas(anterior, atual):
+    """Códigos com peça diferente entre duas versões do database, ou None se não dá para saber barato."""
+    if isinstance(atual, MapaProdutos) or isinstance(anterior, MapaProdutos):
+        return atual.diferencas(anterior) if isinstance(atual, MapaProdutos) else None
+    get = anterior.get
+    alteradas = {c for c, peca in atual.items() if get(c) is not peca}
+    alteradas.update(c for c in anterior if c not in atual)
+    return alteradas
+
+
+def _montar(pecas):
+    try:
+        indice = IndiceBusca.construir(pecas)
+    except Exception as e:
+        print(f"[busca] erro ao montar o índice: {type(e).__name__}: {e}")
+        indice = None
+    with _indice_lock:
+        _estado["montando"] = False
+        if indice is not None:
+            _estado["indice"], _estado["pecas"] = indice, pecas
+            _resultados.clear()
+
+
+def _atualizar(pecas):
+    """Põe o índice em dia com `pecas`; chamado com _indice_lock."""
+    if _estado["pecas"] is pecas:
+        return
+    if _estado["indice"] is not None and not _estado["montando"]:
+        codigos = _alteradas(_estado["pecas"], pecas)
+        if codigos is not None and len(codigos) <= MAX_ALTERACOES_INCREMENTAIS:
+            _estado["indice"].sincronizar(pecas, codigos)
+            _estado["pecas"] = pecas
+            if codigos:
+                _resultados.clear()
+            return
+    if not _estado["montando"]:
+        _estado["montando"] = True
+        threading.Thread(target=_montar, args=(pecas,), name="indice-busca", daemon=True).start()
+
+
+def preparar_indice():
+    """Começa a indexar o database atual em segundo plano (chame ao exibir a busca)."""
+    pecas = carregar_database()
+    with _indice_lock:
+        _atualizar(pecas)
+
+
+def buscar_pecas(consulta, limite=10):
+    """
+    Busca no database atual; retorna a lista de peças encontradas, ou
+    None se o índice ainda está sendo montado.
+    """
+    pecas = carregar_database()
+    with _indice_lock:
+        _atualizar(pecas)
+        if _estado["indice"] is None:
+            return None
+        chave = (dobrar(consulta), limite)
+        encontrados = _resultados.get(chave)
+        if encontrados is None:
+            encontrados = _estado["indice"].buscar(consulta, limite)
+            if len(_resultados) >= MAX_RESULTADOS_CACHE:
+                _resultados.clear()
+            _resultados[chave] = encontrados
+    return [pecas[codigo] for codigo, _ in encontrados if codigo in pecas]
@@ -1,10 +1,215 @@
 import json
+import os
+import threading
+
+from utils.metricas import contar, cronometrar
+from utils.perfil import registrar_leitura
+from utils.travas import gravar_atomico
+
+CLIENTES_DIR = "clientes"
+INDICE_FILE = "database/indice_clientes.json"
+
+# -----------------------------------------------------------
+# Índice / manifesto dos catálogos de clientes
+# -----------------------------------------------------------
+# Formato persistido:
+#   {"dir_mtime": <mtime_ns da pasta clientes/>,
+#    "clientes": {"wce.json": {"slug": "wce", "cliente": "WCE",
+#                              "vendedor": "Stefany", "qtd_pecas": 1,
+#                              "mtime": <mtime_ns>}, ...}}
+# Serve tanto para a busca slug -> arquivo quanto para a listagem da
+# página inicial. É reconstruído quando a pasta muda (arquivo criado/
+# removido), atualizado entrada a entrada quando um catálogo é salvo e
+# reparado pelo mtime dos arquivos em listar_resumos().
+_indice_lock = threading.Lock()
+_indice_cache = {"chave": None, "indice": None, "por_slug": None}
+
+
+def slug_cliente(nome):
+    return (nome or "").lower().replace(" ", "_")
 
-def carregar_cliente(cliente_id):
-    arquivo = f"clientes/{cliente_id}.json"
 
+def _mtime_ns(caminho):
     try:
-        with open(arquivo, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return os.stat(caminho).st_mtime_ns
     except FileNotFoundError:
         return None
+
+
+def _ler_json(caminho, tipo="catalogo"):
+    with cronometrar("reposicao_json_leitura_segundos", arquivo=tipo), open(caminho, "r", encoding="utf-8") as f:
+        registrar_leitura(os.fstat(f.fileno()).st_size)
+        return json.load(f)
+
+
+def _entrada(data, mtime):
+    return {
+        "slug": slug_cliente(data.get("cliente", "")),
+        "cliente": data.get("cliente", "Sem nome"),
+        "vendedor": data.get("vendedor", "—"),
+        "qtd_pecas": len(data.get("pecas", [])),
+        "mtime": mtime,
+    }
+
+
+def _entrada_do_arquivo(arq):
+    caminho = os.path.join(CLIENTES_DIR, arq)
+    mtime = _mtime_ns(caminho)
+    try:
+        return _entrada(_ler_json(caminho), mtime)
+    except Exception as e:
+        # arquivo ilegível: guarda o erro para não reprocessá-lo até mudar
+        return {"slug": None, "mtime": mtime, "erro": str(e)}
+
+
+def _gravar_indice(indice):
+    with cronometrar("reposicao_json_gravacao_segundos", arquivo="indice_clientes"):
+        gravar_atomico(INDICE_FILE, json.dumps(indice, ensure_ascii=False).encode("utf-8"))
+
+
+def _publicar_no_cache(indice):
+    por_slug = {
+        info["slug"]: arq
+        for arq, info in indice["clientes"].items()
+        if info.get("slug")
+    }
+    try:
+        st_arq = os.stat(INDICE_FILE)
+        chave = (st_arq.st_mtime_ns, st_arq.st_size)
+    except FileNotFoundError:
+        chave = None
+    _indice_cache["chave"] = chave
+    _indice_cache["indice"] = indice
+    _indice_cache["por_slug"] = por_slug
+
+
+def reconstruir_indice():
+    """Varre clientes/ uma única vez e regrava o índice completo."""
+    with _indice_lock:
+        indice = {"dir_mtime": _mtime_ns(CLIENTES_DIR), "clientes": {}}
+        if os.path.isdir(CLIENTES_DIR):
+            for arq in os.listdir(CLIENTES_DIR):
+                if arq.endswith(".json"):
+                    indice["clientes"][arq] = _entrada_do_arquivo(arq)
+        _gravar_indice(indice)
+        _publicar_no_cache(indice)
+        return indice
+
+
+def _carregar_indice():
+    """Retorna (indice, por_slug), relendo o arquivo só quando ele muda."""
+    with _indice_lock:
+        try:
+            st_arq = os.stat(INDICE_FILE)
+            chave = (st_arq.st_mtime_ns, st_arq.st_size)
+        except FileNotFoundError:
+            chave = None
+
+        if chave is not None:
+            if _indice_cache["chave"] == chave:
+                contar("reposicao_cache_consultas_total", cache="indice_clientes", resultado="acerto")
+                return _indice_cache["indice"], _indice_cache["por_slug"]
+            contar("reposicao_cache_consultas_total", cache="indice_clientes", resultado="falta")
+            try:
+                indice = _ler_json(INDICE_FILE, "indice_clientes")
+                _publicar_no_cache(indice)
+                return indice, _indice_cache["por_slug"]
+            except Exception:
+                pass
+
+    indice = reconstruir_indice()
+    return indice, _indice_cache["por_slug"]
+
+
+def registrar_cliente(arquivo, dados):
+    """
+    Atualiza a entrada de um catálogo no índice após salvá-lo.
+    `arquivo` é o nome do arquivo dentro de clientes/ (ex.: "wce.json").
+    """
+    arquivo = os.path.basename(arquivo)
+    indice, _ = _carregar_indice()
+    with _indice_lock:
+        indice = {
+            "dir_mtime": _mtime_ns(CLIENTES_DIR),
+            "clientes": dict(indice["clientes"]),
+        }
+        indice["clientes"][arquivo] = _entrada(
+            dados, _mtime_ns(os.path.join(CLIENTES_DIR, arquivo))
+        )
+        _gravar_indice(indice)
+        _publicar_no_cache(indice)
+
+
+def listar_resumos():
+    """
+    Linhas do manifesto (slug, cliente, vendedor, qtd_pecas, mtime), uma
+    por catálogo. Só relê os arquivos cujo mtime mudou desde a última
+    gravação do manifesto; os demais vêm direto do índice.
+    Entradas de arquivos ilegíveis trazem a chave "erro".
+    """
+    indice, _ = _carregar_indice()
+    if not os.path.isdir(CLIENTES_DIR):
+        return []
+
+    atuais = indice["clientes"]
+    novos = {}
+    alterado = False
+    with os.scandir(CLIENTES_DIR) as it:
+        for entry in it:
+            if not entry.name.endswith(".json"):
+                continue
+            info = atuais.get(entry.name)
+            if (
+                info is None
+                or info.get("mtime") != entry.stat().st_mtime_ns
+                or ("qtd_pecas" not in info and "erro" not in info)
+            ):
+                info = _entrada_do_arquivo(entry.name)
+                alterado = True
+            novos[entry.name] = info
+    if len(novos) != len(atuais):
+        alterado = True
+
+    if alterado:
+        with _indice_lock:
+            indice = {"dir_mtime": _mtime_ns(CLIENTES_DIR), "clientes": novos}
+            _gravar_indice(indice)
+            _publicar_no_cache(indice)
+
+    return [dict(info, arquivo=arq) for arq, info in novos.items()]
+
+
+def carregar_cliente_por_slug(slug):
+    """
+    Localiza o catálogo cujo campo "cliente" corresponde ao slug, lendo
+    apenas o arquivo indicado pelo índice.
+    """
+    slug = (slug or "").lower()
+    if not slug:
+        return None
+
+    for tentativa in range(2):
+        indice, por_slug = _carregar_indice()
+        arq = por_slug.get(slug)
+        if arq:
+            try:
+                data = _ler_json(os.path.join(CLIENTES_DIR, arq))
+                if slug_cliente(data.get("cliente", "")) == slug:
+                    return data
+            except Exception:
+                pass
+        elif indice.get("dir_mtime") == _mtime_ns(CLIENTES_DIR):
+            break
+        # índice desatualizado (arquivo renomeado/removido/editado por fora)
+        if tentativa == 0:
+            reconstruir_indice()
+
+    # compatibilidade: catálogo cujo nome de arquivo é o próprio slug
+    try:
+        return _ler_json(os.path.join(CLIENTES_DIR, f"{slug}.json"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def carregar_cliente(cliente_id):
+    return carregar_cliente_por_slug(cliente_id)
@@ -0,0 +1,281 @@
+import json
+import os
+import threading
+from collections.abc import MutableMapping
+from itertools import repeat
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+except ImportError:  # sem pyarrow o database é sempre lido do JSON
+    pa = None
+
+from utils.modelo import CAMPOS, Peca
+
+# -----------------------------------------------------------
+# Cópia colunar (Arrow IPC) do database.json
+# -----------------------------------------------------------
+# Gravada ao lado do database.json a cada snapshot (database.arrow) e
+# marcada com o (mtime_ns, tamanho) do JSON de origem: se o JSON mudar
+# por fora (edição à mão, git pull), a cópia é ignorada e refeita na
+# próxima leitura. O arquivo não é comprimido, então é aberto por
+# memory-map e só as colunas usadas saem do disco.
+# Colunas: uma por campo das peças. Campos só com texto viram colunas de
+# texto; os demais (números, listas, null explícito) vão como JSON.
+# Valor nulo na coluna = campo ausente na peça.
+_SUFIXO = ".arrow"
+_CHAVE_ORIGEM = b"origem"
+_CHAVE_JSON = b"campos_json"
+
+
+def disponivel():
+    return pa is not None
+
+
+def caminho_colunar(caminho_json):
+    return os.path.splitext(caminho_json)[0] + _SUFIXO
+
+
+def _origem(stat_json):
+    return json.dumps([stat_json.st_mtime_ns, stat_json.st_size]).encode("utf-8")
+
+
+def _tabela(produtos):
+    campos = {}
+    for p in produtos:
+        for campo, valor in p.items():
+            if campos.get(campo, True) and not isinstance(valor, str):
+                campos[campo] = False
+            else:
+                campos.setdefault(campo, True)
+    colunas, campos_json = {}, []
+    for campo, so_texto in campos.items():
+        if so_texto:
+            colunas[campo] = pa.array([p.get(campo) for p in produtos], pa.string())
+        else:
+            campos_json.append(campo)
+            colunas[campo] = pa.array(
+                [json.dumps(p[campo], ensure_ascii=False) if campo in p else None for p in produtos], pa.string()
+            )
+    return pa.table(colunas), campos_json
+
+
+def gravar_colunar(caminho_json, produtos, stat_json):
+    """
+    Grava a cópia colunar de `produtos` (conteúdo de `caminho_json`, cujo
+    os.stat é `stat_json`). Falhas só são registradas: o JSON continua
+    sendo a fonte.
+    """
+    if pa is None:
+        return
+    destino = caminho_colunar(caminho_json)
+    temporario = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        tabela, campos_json = _tabela(produtos)
+        tabela = tabela.replace_schema_metadata({
+            _CHAVE_ORIGEM: _origem(stat_json),
+            _CHAVE_JSON: json.dumps(campos_json).encode("utf-8"),
+        })
+        with pa.OSFile(temporario, "wb") as f:
+            with ipc.new_file(f, tabela.schema) as escritor:
+                escritor.write_table(tabela)
+        os.replace(temporario, destino)
+    except Exception as e:
+        # no Windows um arquivo aberto por memory-map não pode ser substituído
+        print(f"[colunar] cópia colunar não gravada ({destino}): {e}")
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+
+
+def abrir_colunar(caminho_json):
+    """Tabela Arrow do database, ou None se não houver cópia atual do JSON."""
+    if pa is None:
+        return None
+    destino = caminho_colunar(caminho_json)
+    try:
+        origem = _origem(os.stat(caminho_json))
+        if os.name == "nt":
+            # lida inteira: um memory-map aberto impediria o os.replace da próxima gravação
+            with pa.OSFile(destino, "rb") as f:
+                tabela = ipc.open_file(f).read_all()
+        else:
+            tabela = ipc.open_file(pa.memory_map(destino, "r")).read_all()
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return None
+    metadados = tabela.schema.metadata or {}
+    if metadados.get(_CHAVE_ORIGEM) != origem or "codigo" not in tabela.column_names:
+        return None
+    return tabela
+
+
+def conflitos_colunar(tabela):
+    """Códigos repetidos com conteúdo diferente (mesma regra de _indexar)."""
+    contagem = tabela.group_by("codigo").aggregate([("codigo", "count")])
+    repetidos = contagem.filter(pc.greater(contagem["codigo_count"], 1))["codigo"]
+    if len(repetidos) == 0:
+        return set()
+    copias = tabela.filter(pc.is_in(tabela["codigo"], value_set=repetidos)).to_pylist()
+    vistas, conflitos = {}, set()
+    for linha in copias:
+        anterior = vistas.setdefault(linha["codigo"], linha)
+        if anterior != linha:
+            conflitos.add(linha["codigo"])
+    return conflitos
+
+
+# -----------------------------------------------------------
+# dict {codigo: peça} sobre a tabela
+# -----------------------------------------------------------
+class MapaProdutos(MutableMapping):
+    """
+    Funciona como o dict {codigo: Peca} do backend JSON, mas cada peça só
+    vira Peca quando é lida (e fica guardada). Alterações (journal) ficam
+    numa camada por cima da tabela; copy() é barato e compartilha a
+    tabela e as peças já lidas.
+    """
+
+    def __init__(self, tabela):
+        self.tabela = tabela
+        self._campos_json = set(json.loads((tabela.schema.metadata or {}).get(_CHAVE_JSON, b"[]")))
+        # repetidos: vale a última cópia, na posição da primeira (como um dict)
+        self._linhas = dict(zip(tabela.column("codigo").to_pylist(), range(tabela.num_rows)))
+        self._lidas = {}
+        self._alteradas = {}   # código da tabela -> peça
+        self._novas = {}       # códigos fora da tabela (ou removidos e recolocados), na ordem de inclusão
+        self._removidas = set()
+
+    def tem_repetidos(self):
+        return len(self._linhas) < self.tabela.num_rows
+
+    def _ler_linha(self, linha):
+        peca = self._lidas.get(linha)
+        if peca is None:
+            dados = {}
+            for campo in self.tabela.column_names:
+                valor = self.tabela.column(campo)[linha].as_py()
+                if valor is not None:
+                    dados[campo] = json.loads(valor) if campo in self._campos_json else valor
+            peca = self._lidas[linha] = Peca.de_dict(dados)
+        return peca
+
+    def __getitem__(self, codigo):
+        if codigo in self._novas:
+            return self._novas[codigo]
+        if codigo in self._removidas:
+            raise KeyError(codigo)
+        if codigo in self._alteradas:
+            return self._alteradas[codigo]
+        return self._ler_linha(self._linhas[codigo])
+
+    def __contains__(self, codigo):
+        return codigo in self._novas or (codigo in self._linhas and codigo not in self._removidas)
+
+    def __setitem__(self, codigo, peca):
+        if codigo in self._removidas:
+            # como num dict: removido e incluído de novo vai para o fim
+            self._novas[codigo] = peca
+        elif codigo in self._linhas:
+            self._alteradas[codigo] = peca
+        else:
+            self._novas[codigo] = peca
+
+    def __delitem__(self, codigo):
+        if codigo in self._novas:
+            del self._novas[codigo]
+        elif codigo in self._linhas and codigo not in self._removidas:
+            self._alteradas.pop(codigo, None)
+        else:
+            raise KeyError(codigo)
+        if codigo in self._linhas:
+            self._removidas.add(codigo)
+
+    def __iter__(self):
+        for codigo in self._linhas:
+            if codigo not in self._removidas:
+                yield codigo
+        yield from self._novas
+
+    def __len__(self):
+        # código da tabela que está em _novas também está em _removidas
+        return len(self._linhas) - len(self._removidas) + len(self._novas)
+
+    def _ler_todas(self):
+        """Converte a tabela inteira de uma vez (coluna a coluna), para varreduras completas."""
+        if len(self._lidas) >= self.tabela.num_rows:
+            return
+        nomes = self.tabela.column_names
+        lidas, campos_json = self._lidas, self._campos_json
+        if not campos_json and set(nomes) <= set(CAMPOS):
+            # caso comum (só os campos de texto do modelo): direto para os slots
+            colunas = [self.tabela.column(campo).to_pylist() if campo in nomes else repeat(None) for campo in CAMPOS]
+            for linha, valores in enumerate(zip(*colunas)):
+                if linha not in lidas:
+                    lidas[linha] = Peca(*valores)
+            return
+        colunas = [self.tabela.column(campo).to_pylist() for campo in nomes]
+        for linha, valores in enumerate(zip(*colunas)):
+            if linha not in lidas:
+                dados = {campo: valor for campo, valor in zip(nomes, valores) if valor is not None}
+                if campos_json:
+                    for campo in campos_json.intersection(dados):
+                        dados[campo] = json.loads(dados[campo])
+                lidas[linha] = Peca.de_dict(dados)
+
+    def campos(self, nomes):
+        """
+        (codigo, (valor de cada campo em `nomes`)) de todas as peças, lidos
+        direto das colunas, sem montar Peca (None = campo ausente).
+        """
+        colunas = []
+        for nome in nomes:
+            if nome not in self.tabela.column_names:
+                colunas.append(repeat(None))
+            elif nome in self._campos_json:
+                colunas.append(json.loads(v) if v is not None else None for v in self.tabela.column(nome).to_pylist())
+            else:
+                colunas.append(self.tabela.column(nome).to_pylist())
+        linhas, alteradas, removidas = self._linhas, self._alteradas, self._removidas
+        for linha, (codigo, *valores) in enumerate(zip(self.tabela.column("codigo").to_pylist(), *colunas)):
+            # repetidos: só a linha que vale; alteradas e novas vêm da camada de cima
+            if linhas[codigo] != linha or codigo in alteradas or codigo in removidas:
+                continue
+            yield codigo, tuple(valores)
+        for codigo, peca in self._alteradas.items():
+            if codigo not in self._removidas:
+                yield codigo, tuple(peca.get(nome) for nome in nomes)
+        for codigo, peca in self._novas.items():
+            yield codigo, tuple(peca.get(nome) for nome in nomes)
+
+    def diferencas(self, anterior):
+        """
+        Códigos com peça diferente em `anterior` (outra versão sobre a mesma
+        tabela, como as geradas por copy()), ou None se não for o caso.
+        """
+        if not isinstance(anterior, MapaProdutos) or anterior.tabela is not self.tabela \
+                or anterior._linhas is not self._linhas:
+            return None
+        candidatos = set(self._alteradas).union(self._novas, self._removidas,
+                                                anterior._alteradas, anterior._novas, anterior._removidas)
+        return {c for c in candidatos if self.get(c) is not anterior.get(c)}
+
+    def values(self):
+        self._ler_todas()
+        return super().values()
+
+    def items(self):
+        self._ler_todas()
+        return super().items()
+
+    def copy(self):
+        copia = object.__new__(MapaProdutos)
+        copia.tabela = self.tabela
+        copia._campos_json = self._campos_json
+        copia._linhas = self._linhas
+        copia._lidas = self._lidas
+        copia._alteradas = dict(self._alteradas)
+        copia._novas = dict(self._novas)
+        copia._removidas = set(self._removidas)
+        return copia
@@ -0,0 +1,205 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from utils.armazenamento import obter_armazenamento
+from utils.github import publicar_arquivos
+from utils.metricas import contar, registrar_medidor
+from utils.retentativas import espera_limite
+
+# -----------------------------------------------------------
+# Fila persistente de publicações no GitHub
+# -----------------------------------------------------------
+# As páginas gravam localmente e apenas enfileiram o envio; uma thread
+# em segundo plano publica cada job (um commit por job) com novas
+# tentativas. Jobs que tocam os mesmos caminhos saem na ordem em que
+# entraram; jobs de caminhos diferentes não esperam uns pelos outros.
+# O conteúdo é lido do disco na hora do envio, então um job atrasado
+# publica a versão mais recente do arquivo (com o backend SQLite, o
+# database.json é exportado do banco logo antes do envio).
+FILA_FILE = "database/fila_publicacao.db"
+MAX_TENTATIVAS = 8
+ESPERA_BASE = 5          # segundos; dobra a cada falha
+ESPERA_MAXIMA = 600
+INTERVALO_OCIOSO = 2
+
+_worker_lock = threading.Lock()
+_worker = {"thread": None}
+_acordar = threading.Event()
+
+
+def _conectar():
+    os.makedirs(os.path.dirname(FILA_FILE) or ".", exist_ok=True)
+    conn = sqlite3.connect(FILA_FILE, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            arquivos TEXT NOT NULL,
+            mensagem TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pendente',
+            tentativas INTEGER NOT NULL DEFAULT 0,
+            proxima_tentativa REAL NOT NULL DEFAULT 0,
+            erro TEXT,
+            criado_em REAL NOT NULL,
+            atualizado_em REAL NOT NULL
+        )
+    """)
+    return conn
+
+
+def enfileirar_publicacao(arquivos, mensagem, iniciar_envio=True):
+    """
+    Agenda o envio de [(caminho_local, caminho_no_repo)] em um commit.
+    Retorna imediatamente o id do job. Com iniciar_envio=False (scripts de
+    linha de comando) o job só fica gravado; o worker do app o envia.
+    """
+    agora = time.time()
+    with closing(_conectar()) as conn:
+        cur = conn.execute(
+            "INSERT INTO jobs (arquivos, mensagem, criado_em, atualizado_em) VALUES (?, ?, ?, ?)",
+            (json.dumps([list(a) for a in arquivos], ensure_ascii=False), mensagem, agora, agora),
+        )
+        job_id = cur.lastrowid
+    if iniciar_envio:
+        iniciar_worker()
+        _acordar.set()
+    return job_id
+
+
+def listar_jobs(status=None, limite=50):
+    with closing(_conectar()) as conn:
+        if status:
+            linhas = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?", (status, limite)
+            ).fetchall()
+        else:
+            linhas = conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limite,)).fetchall()
+    return [dict(l, arquivos=json.loads(l["arquivos"])) for l in linhas]
+
+
+def contagem_jobs():
+    with closing(_conectar()) as conn:
+        linhas = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+    return {l["status"]: l["n"] for l in linhas}
+
+
+registrar_medidor(
+    "reposicao_fila_jobs",
+    lambda: [({"status": status}, n) for status, n in contagem_jobs().items()],
+)
+
+
+def reenfileirar_job(job_id):
+    with closing(_conectar()) as conn:
+        conn.execute(
+            "UPDATE jobs SET status = 'pendente', tentativas = 0, proxima_tentativa = 0, atualizado_em = ? "
+            "WHERE id = ? AND status = 'falhou'",
+            (time.time(), job_id),
+        )
+    iniciar_worker()
+    _acordar.set()
+
+
+def descartar_job(job_id):
+    with closing(_conectar()) as conn:
+        conn.execute("DELETE FROM jobs WHERE id = ? AND status = 'falhou'", (job_id,))
+
+
+def limpar_concluidos(manter_segundos=24 * 3600):
+    with closing(_conectar()) as conn:
+        conn.execute(
+            "DELETE FROM jobs WHERE status = 'concluido' AND atualizado_em < ?",
+            (time.time() - manter_segundos,),
+        )
+
+
+# -----------------------------------------------------------
+# Worker
+# -----------------------------------------------------------
+def _proximo_job(conn):
+    """Job pendente mais antigo cujos caminhos não estão presos a um job anterior."""
+    agora = time.time()
+    bloqueados = set()
+    for linha in conn.execute(
+        "SELECT * FROM jobs WHERE status IN ('pendente', 'em_andamento') ORDER BY id"
+    ):
+        caminhos = {repo for _, repo in json.loads(linha["arquivos"])}
+        if caminhos & bloqueados or linha["status"] == "em_andamento" or linha["proxima_tentativa"] > agora:
+            bloqueados |= caminhos
+            continue
+        return linha
+    return None
+
+
+def _executar(conn, linha):
+    arquivos = [tuple(a) for a in json.loads(linha["arquivos"])]
+    conn.execute(
+        "UPDATE jobs SET status = 'em_andamento', atualizado_em = ? WHERE id = ?",
+        (time.time(), linha["id"]),
+    )
+    try:
+        obter_armazenamento().exportar([local for local, _ in arquivos])
+        resp = publicar_arquivos(arquivos, linha["mensagem"])
+        status_code = getattr(resp, "status_code", None)
+        erro = None if status_code in (200, 201) else f"{status_code}: {getattr(resp, 'text', '')[:500]}"
+    except Exception as e:
+        erro = f"{type(e).__name__}: {e}"
+
+    agora = time.time()
+    if erro is None:
+        conn.execute(
+            "UPDATE jobs SET status = 'concluido', erro = NULL, atualizado_em = ? WHERE id = ?",
+            (agora, linha["id"]),
+        )
+        contar("reposicao_fila_jobs_total", resultado="concluido")
+        return
+
+    tentativas = linha["tentativas"] + 1
+    if tentativas >= MAX_TENTATIVAS:
+        conn.execute(
+            "UPDATE jobs SET status = 'falhou', tentativas = ?, erro = ?, atualizado_em = ? WHERE id = ?",
+            (tentativas, erro, agora, linha["id"]),
+        )
+        contar("reposicao_fila_jobs_total", resultado="falhou")
+    else:
+        # bloqueado pelo limite de requisições: não volta antes da liberação
+        espera = max(min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** (tentativas - 1)), espera_limite())
+        conn.execute(
+            "UPDATE jobs SET status = 'pendente', tentativas = ?, erro = ?, proxima_tentativa = ?, atualizado_em = ? "
+            "WHERE id = ?",
+            (tentativas, erro, agora + espera, agora, linha["id"]),
+        )
+        contar("reposicao_fila_jobs_total", resultado="retentativa")
+        contar("reposicao_github_retentativas_total", operacao="fila")
+
+
+def _loop():
+    conn = _conectar()
+    # jobs interrompidos por um reinício do processo voltam para a fila
+    conn.execute("UPDATE jobs SET status = 'pendente' WHERE status = 'em_andamento'")
+    while True:
+        try:
+            linha = _proximo_job(conn)
+            if linha is not None:
+                _executar(conn, linha)
+                continue
+        except Exception as e:
+            print(f"[fila] erro no worker: {e}")
+        _acordar.wait(INTERVALO_OCIOSO)
+        _acordar.clear()
+
+
+def iniciar_worker():
+    """Sobe a thread de publicação (uma por processo)."""
+    with _worker_lock:
+        thread = _worker["thread"]
+        if thread is not None and thread.is_alive():
+            return
+        thread = threading.Thread(target=_loop, name="fila-publicacao", daemon=True)
+        thread.start()
+        _worker["thread"] = thread
@@ -0,0 +1,357 @@
+import base64
+import collections
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+import streamlit as st
+
+from utils.metricas import contar, observar
+from utils.perfil import registrar_http
+from utils.retentativas import aguardar_limite, executar, registrar_resposta
+
+# -----------------------------------------------------------
+# Cliente GitHub compartilhado pelas páginas de administração
+# -----------------------------------------------------------
+# - uma requests.Session por processo (conexões keep-alive reaproveitadas);
+# - teste de autenticação (GET /user) feito uma vez por token;
+# - timeouts configuráveis em secrets (GITHUB_TIMEOUT_CONEXAO / _LEITURA);
+# - latência de cada chamada registrada em latencias_recentes() (exibida no
+#   painel da fila) e nas métricas (utils/metricas.py);
+# - arquivos idênticos ao que já está no branch não são reenviados
+#   (estatisticas_envio());
+# - falhas transitórias e limites de requisições tratados em
+#   utils/retentativas.py.
+# GITHUB_API_URL (secrets) permite apontar para um servidor local que
+# imite os endpoints do GitHub.
+API_PADRAO = "https://api.github.com"
+TIMEOUT_CONEXAO_PADRAO = 5
+TIMEOUT_LEITURA_PADRAO = 30
+
+_sessao_lock = threading.Lock()
+_sessao = None
+_tokens_validados = set()
+_latencias = collections.deque(maxlen=500)
+
+
+def _resp_obj(status, text):
+    class R:
+        def __init__(self, status, text):
+            self.status_code = status
+            self._text = text
+        def json(self):
+            try:
+                return json.loads(self._text)
+            except Exception:
+                return {"error": self._text}
+        @property
+        def text(self):
+            return self._text
+    return R(status, text)
+
+
+def _config():
+    return {
+        "api": st.secrets.get("GITHUB_API_URL", API_PADRAO).rstrip("/"),
+        "token": st.secrets["GITHUB_TOKEN"].strip(),
+        "user": st.secrets["GITHUB_USER"],
+        "repo": st.secrets["GITHUB_REPO"],
+        "branch": st.secrets.get("GITHUB_BRANCH", "main"),
+        "timeout": (
+            float(st.secrets.get("GITHUB_TIMEOUT_CONEXAO", TIMEOUT_CONEXAO_PADRAO)),
+            float(st.secrets.get("GITHUB_TIMEOUT_LEITURA", TIMEOUT_LEITURA_PADRAO)),
+        ),
+    }
+
+
+def _headers(cfg):
+    return {
+        "Authorization": f"token {cfg['token']}",
+        "Accept": "application/vnd.github.v3+json"
+    }
+
+
+def github_raw_url(repo_path):
+    cfg = _config()
+    return f"https://raw.githubusercontent.com/{cfg['user']}/{cfg['repo']}/{cfg['branch']}/{repo_path}"
+
+
+def _obter_sessao():
+    global _sessao
+    with _sessao_lock:
+        if _sessao is None:
+            sessao = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            sessao.mount("https://", adaptador)
+            sessao.mount("http://", adaptador)
+            _sessao = sessao
+        return _sessao
+
+
+def _requisitar(metodo, url, cfg, **kwargs):
+    """Faz uma chamada pela sessão compartilhada, respeitando o limite de requisições, e registra a latência."""
+    aguardar_limite()
+    inicio = time.perf_counter()
+    status = None
+    headers = {**_headers(cfg), **kwargs.pop("headers", {})}
+    try:
+        resp = _obter_sessao().request(metodo, url, headers=headers, timeout=cfg["timeout"], **kwargs)
+        status = resp.status_code
+        registrar_resposta(resp)
+        return resp
+    finally:
+        segundos = time.perf_counter() - inicio
+        _latencias.append({
+            "metodo": metodo,
+            "url": url,
+            "status": status,
+            "segundos": segundos,
+        })
+        registrar_http(segundos)
+        contar("reposicao_github_requisicoes_total", metodo=metodo, status=status or "erro")
+        observar("reposicao_github_latencia_segundos", segundos, metodo=metodo)
+
+
+def latencias_recentes():
+    """Últimas chamadas à API: [{metodo, url, status, segundos}]."""
+    return list(_latencias)
+
+
+def _verificar_autenticacao(cfg):
+    """GET /user apenas na primeira vez de cada token; retorna None se OK."""
+    if cfg["token"] in _tokens_validados:
+        return None
+    try:
+        auth_resp = executar(lambda: _requisitar("GET", f"{cfg['api']}/user", cfg), "GET user")
+    except Exception as e:
+        return _resp_obj(500, f"Auth test failed: {e}")
+    if auth_resp.status_code != 200:
+        return _resp_obj(auth_resp.status_code, auth_resp.text)
+    _tokens_validados.add(cfg["token"])
+    return None
+
+
+# -----------------------------------------------------------
+# Corpo JSON com o conteúdo de um arquivo em base64, gerado sob demanda
+# -----------------------------------------------------------
+# Em vez de montar bytes -> base64 -> JSON inteiros em memória (~3x o
+# tamanho do arquivo), o requests lê este objeto em blocos enquanto envia.
+# O tamanho final é conhecido de antemão, então vai com Content-Length.
+BLOCO_BASE64 = 3 * 64 * 1024   # múltiplo de 3: blocos codificados sem "=" intermediário
+
+
+class _CorpoBase64:
+    def __init__(self, caminho, campos):
+        tamanho = os.path.getsize(caminho)
+        inicio = json.dumps(campos)[:-1] + (", " if campos else "") + '"content": "'
+        self._arquivo = open(caminho, "rb")
+        self._pendente = inicio.encode("utf-8")
+        self._fim = b'"}'
+        self._tamanho = len(self._pendente) + 4 * ((tamanho + 2) // 3) + len(self._fim)
+
+    def __len__(self):
+        return self._tamanho
+
+    def read(self, n=-1):
+        while self._arquivo is not None and (n < 0 or len(self._pendente) < n):
+            bloco = self._arquivo.read(BLOCO_BASE64)
+            if bloco:
+                self._pendente += base64.b64encode(bloco)
+            else:
+                self._pendente += self._fim
+                self.close()
+        if n < 0:
+            n = len(self._pendente)
+        saida, self._pendente = self._pendente[:n], self._pendente[n:]
+        return saida
+
+    def close(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+
+def _requisitar_arquivo(metodo, url, cfg, corpo):
+    """Envia um _CorpoBase64 (campos + {"content": base64 do arquivo})."""
+    try:
+        return _requisitar(metodo, url, cfg, data=corpo, headers={"Content-Type": "application/json"})
+    finally:
+        corpo.close()
+
+
+class ErroPublicacao(Exception):
+    def __init__(self, status, text):
+        super().__init__(f"{status}: {text}")
+        self.status_code = status
+        self.text = text
+
+
+def _operacao(metodo, url):
+    """Rótulo curto para as métricas: "POST blobs", "GET ref"..."""
+    return f"{metodo} {url.split('/git/', 1)[-1].split('/', 1)[0]}"
+
+
+def _chamar(metodo, url, cfg, payload=None, arquivo=None):
+    def tentar():
+        if arquivo is not None:
+            # corpo lido em fluxo: cada tentativa reabre o arquivo
+            return _requisitar_arquivo(metodo, url, cfg, _CorpoBase64(arquivo, payload or {}))
+        return _requisitar(metodo, url, cfg, json=payload)
+
+    # erro ao abrir `arquivo` (OSError) sobe como está: não é falha da API
+    try:
+        resp = executar(tentar, _operacao(metodo, url))
+    except requests.RequestException as e:
+        raise ErroPublicacao(500, f"{metodo} {url} failed: {e}")
+    if resp.status_code not in (200, 201):
+        raise ErroPublicacao(resp.status_code, resp.text)
+    return resp.json()
+
+
+# -----------------------------------------------------------
+# Arquivos sem alteração
+# -----------------------------------------------------------
+# O SHA de blob do git é sha1("blob <tamanho>\0" + conteúdo): calculado
+# localmente, é comparado com a listagem da árvore do branch. A listagem
+# fica em cache pelo SHA da árvore (imutável) e, depois de cada commit
+# feito por aqui, é atualizada sem nova leitura.
+_arvore_lock = threading.Lock()
+_arvore = {"sha": None, "arquivos": {}}
+_contadores_lock = threading.Lock()
+_contadores = {
+    "arquivos_enviados": 0,
+    "bytes_enviados": 0,
+    "arquivos_ignorados": 0,
+    "bytes_ignorados": 0,
+    "commits_evitados": 0,
+}
+
+
+def blob_sha(caminho):
+    """SHA de blob do git para o arquivo em `caminho` (lido em blocos)."""
+    resumo = hashlib.sha1(b"blob %d\0" % os.path.getsize(caminho))
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+def _contar(**valores):
+    with _contadores_lock:
+        for chave, valor in valores.items():
+            _contadores[chave] += valor
+    for chave, valor in valores.items():
+        contar(f"reposicao_github_{chave}_total", valor)
+
+
+def estatisticas_envio():
+    """Arquivos/bytes enviados e ignorados (iguais ao branch) neste processo."""
+    with _contadores_lock:
+        return dict(_contadores)
+
+
+def _arquivos_da_arvore(base, cfg, tree_sha):
+    """{caminho: sha do blob} da árvore `tree_sha`, ou None se a listagem veio truncada."""
+    with _arvore_lock:
+        if _arvore["sha"] == tree_sha:
+            return _arvore["arquivos"]
+    resp = _chamar("GET", f"{base}/trees/{tree_sha}?recursive=1", cfg)
+    if resp.get("truncated"):
+        return None
+    arquivos = {item["path"]: item["sha"] for item in resp.get("tree", []) if item.get("type") == "blob"}
+    with _arvore_lock:
+        _arvore["sha"], _arvore["arquivos"] = tree_sha, arquivos
+    return arquivos
+
+
+def _registrar_arvore(tree_sha, anterior, blobs):
+    if anterior is None:
+        return
+    arquivos = dict(anterior)
+    arquivos.update({b["path"]: b["sha"] for b in blobs})
+    with _arvore_lock:
+        _arvore["sha"], _arvore["arquivos"] = tree_sha, arquivos
+
+
+def _contar_envio(operacao, resp):
+    # envios sem alteração contam como "ok" (e em reposicao_github_commits_evitados_total)
+    resultado = "ok" if getattr(resp, "status_code", None) in (200, 201) else "falha"
+    contar("reposicao_github_envios_total", operacao=operacao, resultado=resultado)
+    return resp
+
+
+def publicar_arquivos(arquivos, mensagem, max_tentativas=3):
+    """
+    Envia vários arquivos locais em um único commit.
+    `arquivos` é uma lista de (caminho_local, caminho_no_repo).
+    Arquivos iguais aos do branch ficam de fora; se nenhum mudou, não há
+    commit. Retorna um objeto compatível com requests.Response: status 201
+    e json() == {"commit": {"sha": ...}} em caso de sucesso (200 e
+    "inalterado": True quando não houve commit).
+    """
+    return _contar_envio("publicacao", _publicar_arquivos(arquivos, mensagem, max_tentativas))
+
+
+def _publicar_arquivos(arquivos, mensagem, max_tentativas):
+    cfg = _config()
+    erro_auth = _verificar_autenticacao(cfg)
+    if erro_auth is not None:
+        return erro_auth
+    base = f"{cfg['api']}/repos/{cfg['user']}/{cfg['repo']}/git"
+
+    try:
+        locais = []
+        for caminho_local, caminho_repo in arquivos:
+            locais.append((caminho_local, caminho_repo.replace(os.sep, "/"), blob_sha(caminho_local),
+                           os.path.getsize(caminho_local)))
+        enviados = set()
+
+        for tentativa in range(max_tentativas):
+            ref = _chamar("GET", f"{base}/ref/heads/{cfg['branch']}", cfg)
+            commit_atual = ref["object"]["sha"]
+            tree_atual = _chamar("GET", f"{base}/commits/{commit_atual}", cfg)["tree"]["sha"]
+            remotos = _arquivos_da_arvore(base, cfg, tree_atual)
+
+            blobs = []
+            for caminho_local, caminho_repo, sha, tamanho in locais:
+                if remotos is not None and remotos.get(caminho_repo) == sha:
+                    continue
+                if sha not in enviados:
+                    blob = _chamar("POST", f"{base}/blobs", cfg, {"encoding": "base64"}, arquivo=caminho_local)
+                    # o arquivo pode ter mudado depois do cálculo: vale o SHA devolvido
+                    sha = blob["sha"]
+                    enviados.add(sha)
+                    _contar(arquivos_enviados=1, bytes_enviados=tamanho)
+                blobs.append({"path": caminho_repo, "mode": "100644", "type": "blob", "sha": sha})
+
+            if not blobs:
+                ignorados = [t for *_, t in locais]
+                _contar(arquivos_ignorados=len(ignorados), bytes_ignorados=sum(ignorados), commits_evitados=1)
+                return _resp_obj(200, json.dumps({"commit": {"sha": commit_atual}, "inalterado": True}))
+
+            tree = _chamar("POST", f"{base}/trees", cfg, {"base_tree": tree_atual, "tree": blobs})
+            commit = _chamar("POST", f"{base}/commits", cfg, {
+                "message": mensagem,
+                "tree": tree["sha"],
+                "parents": [commit_atual],
+            })
+            try:
+                _chamar("PATCH", f"{base}/refs/heads/{cfg['branch']}", cfg, {"sha": commit["sha"]})
+            except ErroPublicacao as e:
+                # 409/422: o branch andou entre a leitura da ref e o PATCH; refaz sobre o novo topo
+                if e.status_code in (409, 422) and tentativa + 1 < max_tentativas:
+                    contar("reposicao_github_retentativas_total", operacao="publicar_ref")
+                    continue
+                raise
+            _registrar_arvore(tree["sha"], remotos, blobs)
+            alterados = {b["path"] for b in blobs}
+            ignorados = [t for _, repo, _, t in locais if repo not in alterados]
+            _contar(arquivos_ignorados=len(ignorados), bytes_ignorados=sum(ignorados))
+            return _resp_obj(201, json.dumps({"commit": {"sha": commit["sha"]}}))
+    except ErroPublicacao as e:
+        return _resp_obj(e.status_code, e.text)
+    except OSError as e:
+        return _resp_obj(500, f"File read failed: {e}")
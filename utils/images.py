@@ -1,5 +1,197 @@
 import base64
+import os
+import warnings
+
+from PIL import Image, features
+
+from utils.armazenamento import obter_armazenamento
+from utils.perfil import registrar_leitura
 
 def img_to_base64(path):
     with open(path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode()
+        conteudo = img_file.read()
+    registrar_leitura(len(conteudo))
+    return base64.b64encode(conteudo).decode()
+
+# -----------------------------------------------------------
+# Variantes redimensionadas das imagens das peças
+# -----------------------------------------------------------
+# Para cada imagem em imagens/ são gravadas versões menores em
+# imagens/derivados/<arquivo original>.<variante>.<ext>, onde o lado
+# maior não passa do limite da variante. Só existem as variantes menores
+# que o original (as outras seriam cópias dele), e uma variante mais
+# antiga que o original é ignorada até ser regenerada.
+IMAGENS_DIR = "imagens"
+DERIVADOS_DIR = os.path.join(IMAGENS_DIR, "derivados")
+VARIANTES = {"thumb": 240, "card": 640, "full": 1600}
+EXTENSOES_IMAGEM = (".png", ".jpg", ".jpeg", ".webp")
+
+if features.check("webp"):
+    FORMATO_DERIVADO, EXT_DERIVADO = "WEBP", "webp"
+else:
+    FORMATO_DERIVADO, EXT_DERIVADO = "JPEG", "jpg"
+
+
+# -----------------------------------------------------------
+# Decodificação limitada
+# -----------------------------------------------------------
+# Imagens acima de MAX_PIXELS_IMAGEM são recusadas só pelo cabeçalho, sem
+# decodificar (o limite vale aqui, sem mexer no Image.MAX_IMAGE_PIXELS
+# global do PIL, que é do processo inteiro). JPEGs são decodificados já reduzidos (draft, escalas 1/2 a
+# 1/8); os demais formatos são reduzidos logo após a leitura. O original
+# guardado em imagens/ não passa de LADO_MAX_ORIGINAL px.
+MAX_PIXELS_IMAGEM = 40_000_000
+LADO_MAX_ORIGINAL = 2400
+
+
+class ImagemGrandeDemais(ValueError):
+    pass
+
+
+def abrir_imagem(origem, lado_max=LADO_MAX_ORIGINAL):
+    """Abre e decodifica `origem` (caminho ou arquivo) com o lado maior limitado a `lado_max`."""
+    try:
+        with warnings.catch_warnings():
+            # o aviso do PIL vira a exceção abaixo
+            warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+            imagem = Image.open(origem)
+    except Image.DecompressionBombError as e:
+        raise ImagemGrandeDemais(str(e))
+    largura, altura = imagem.size
+    if largura * altura > MAX_PIXELS_IMAGEM:
+        raise ImagemGrandeDemais(
+            f"imagem de {largura}x{altura} px excede o limite de {MAX_PIXELS_IMAGEM:,} px".replace(",", ".")
+        )
+    if imagem.format == "JPEG":
+        imagem.draft(imagem.mode if imagem.mode in ("RGB", "L") else "RGB", (lado_max, lado_max))
+    imagem.load()
+    fator = max(imagem.size) // lado_max
+    if fator >= 2:
+        imagem = imagem.reduce(fator)
+    if max(imagem.size) > lado_max:
+        imagem.thumbnail((lado_max, lado_max), Image.LANCZOS)
+    return imagem
+
+
+def caminho_variante(caminho_original, variante):
+    nome = os.path.basename(caminho_original)
+    return os.path.join(DERIVADOS_DIR, f"{nome}.{variante}.{EXT_DERIVADO}").replace(os.sep, "/")
+
+
+def _lado_original(caminho_original):
+    """Lado maior da imagem, lido só do cabeçalho."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+        with Image.open(caminho_original) as cabecalho:
+            return max(cabecalho.size)
+
+
+def variantes_necessarias(lado_original):
+    """Variantes menores que o original (as únicas que valem gravar)."""
+    return [variante for variante, lado in VARIANTES.items() if lado < lado_original]
+
+
+def _variante_atual(caminho_original, derivado):
+    """A variante existe e não é mais antiga que o original."""
+    try:
+        mtime_derivado = os.stat(derivado).st_mtime
+    except OSError:
+        return False
+    try:
+        return mtime_derivado >= os.stat(caminho_original).st_mtime
+    except OSError:
+        return True   # sem o original local, a variante é o que há
+
+
+def gerar_variantes(caminho_original, imagem=None):
+    """
+    Gera (ou regenera) as variantes de uma imagem já salva localmente.
+    Aceita a imagem já aberta (a mesma gravada no original) para evitar
+    uma nova decodificação. Retorna a lista de caminhos gravados.
+    """
+    if imagem is None:
+        imagem = abrir_imagem(caminho_original, max(VARIANTES.values()))
+        lado_original = _lado_original(caminho_original)
+    else:
+        lado_original = max(imagem.size)
+    necessarias = variantes_necessarias(lado_original)
+    for variante in VARIANTES:
+        # sobra de um original maior, já substituído
+        if variante not in necessarias and os.path.exists(caminho_variante(caminho_original, variante)):
+            os.remove(caminho_variante(caminho_original, variante))
+    if not necessarias:
+        return []
+    imagem.load()
+    if FORMATO_DERIVADO == "JPEG" and imagem.mode not in ("RGB", "L"):
+        imagem = imagem.convert("RGB")
+    elif imagem.mode not in ("RGB", "RGBA", "L", "LA"):
+        imagem = imagem.convert("RGBA")
+
+    os.makedirs(DERIVADOS_DIR, exist_ok=True)
+    gravados = []
+    # da maior para a menor: cada variante parte da anterior (menos pixels a reamostrar)
+    atual = imagem
+    for variante in sorted(necessarias, key=lambda v: -VARIANTES[v]):
+        lado = VARIANTES[variante]
+        if max(atual.size) > lado:
+            atual = atual.copy()
+            atual.thumbnail((lado, lado), Image.LANCZOS)
+        destino = caminho_variante(caminho_original, variante)
+        atual.save(destino, format=FORMATO_DERIVADO, quality=82)
+        gravados.append(destino)
+    return gravados
+
+
+def imagem_para_largura(caminho, largura):
+    """
+    Escolhe a menor variante que cobre `largura` px (com folga para telas
+    de alta densidade); sem ela (ou desatualizada), tenta as maiores e, por
+    fim, o original. URLs voltam inalteradas.
+    """
+    if not caminho or caminho.startswith(("http://", "https://")):
+        return caminho
+    alvo = largura * 2
+    por_lado = sorted(VARIANTES, key=VARIANTES.get)
+    candidatas = [v for v in por_lado if VARIANTES[v] >= alvo] or por_lado[-1:]
+    for variante in candidatas:
+        derivado = caminho_variante(caminho, variante)
+        if _variante_atual(caminho, derivado):
+            return derivado
+    return caminho
+
+
+def imagens_referenciadas(pasta=IMAGENS_DIR):
+    """Nomes dos arquivos de `pasta` usados como imagem por alguma peça do database."""
+    nomes = set()
+    for peca in obter_armazenamento().mapa_produtos().values():
+        imagem = str(peca.get("imagem") or "").replace("\\", "/")
+        if os.path.dirname(imagem) == pasta.replace(os.sep, "/"):
+            nomes.add(os.path.basename(imagem))
+    return nomes
+
+
+def gerar_variantes_existentes(pasta=IMAGENS_DIR, forcar=False):
+    """
+    Migração: cria as variantes que faltam para as imagens de `pasta`
+    usadas por peças do database (o logo e arquivos soltos ficam de fora).
+    """
+    gerados = []
+    for nome in sorted(imagens_referenciadas(pasta)):
+        caminho = os.path.join(pasta, nome)
+        if not os.path.isfile(caminho) or not nome.lower().endswith(EXTENSOES_IMAGEM):
+            continue
+        try:
+            if not forcar and all(_variante_atual(caminho, caminho_variante(caminho, v))
+                                  for v in variantes_necessarias(_lado_original(caminho))):
+                continue
+            gerados.extend(gerar_variantes(caminho))
+        except Exception as e:
+            print(f"Falha ao gerar variantes de {caminho}: {e}")
+    return gerados
+
+
+if __name__ == "__main__":
+    # python -m utils.images [--forcar]
+    import sys
+    gerados = gerar_variantes_existentes(forcar="--forcar" in sys.argv[1:])
+    print(f"{len(gerados)} variantes geradas em {DERIVADOS_DIR}/")
@@ -1,17 +1,59 @@
-import json
+import threading
 import streamlit as st
 
+from utils.armazenamento import obter_armazenamento
+from utils.metricas import contar
+
+# -----------------------------------------------------------
+# Cache em memória do database (compartilhado por todas as sessões)
+# -----------------------------------------------------------
+# A chave vem do backend de armazenamento ((mtime_ns, tamanho) do
+# database.json, ou a versão do banco SQLite): qualquer gravação
+# invalida o cache automaticamente na próxima leitura.
+_cache_lock = threading.Lock()
+_cache = {"chave": None, "pecas": None}
+_estatisticas = {"hits": 0, "misses": 0}
+
+
+def invalidar_cache_database():
+    """Descarta o dict em cache (ex.: após editar database.json à mão)."""
+    with _cache_lock:
+        _cache["chave"] = None
+        _cache["pecas"] = None
+
+
+def estatisticas_cache_database():
+    with _cache_lock:
+        return dict(_estatisticas)
+
+
 def carregar_database():
+    """
+    Retorna o database como dict {codigo: Peca} (utils/modelo.py).
+    O dict e as peças são compartilhados entre sessões: quem precisar
+    alterar uma peça deve trabalhar sobre dict(peca).
+    """
+    armazenamento = obter_armazenamento()
     try:
-        with open("database/database.json", "r", encoding="utf-8") as f:
-            lista = json.load(f)
+        chave = armazenamento.chave_produtos()
+        with _cache_lock:
+            if _cache["chave"] == chave:
+                _estatisticas["hits"] += 1
+                contar("reposicao_cache_consultas_total", cache="database", resultado="acerto")
+                return _cache["pecas"]
 
-        # converter para dict por código
-        return {item["codigo"]: item for item in lista}
+        contar("reposicao_cache_consultas_total", cache="database", resultado="falta")
+        pecas = armazenamento.mapa_produtos()
+
+        with _cache_lock:
+            _estatisticas["misses"] += 1
+            _cache["chave"] = chave
+            _cache["pecas"] = pecas
+        return pecas
 
     except FileNotFoundError:
         st.error("❌ O arquivo 'database.json' não foi encontrado em /database/")
         return {}
     except Exception as e:
         st.error(f"Erro ao carregar database.json: {e}")
-        return {}
\ No newline at end of file
+        return {}
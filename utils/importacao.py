@@ -0,0 +1,247 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from utils.armazenamento import PRODUTOS_FILE, obter_armazenamento
+from utils.busca import dobrar
+from utils.fila import enfileirar_publicacao
+from utils.images import IMAGENS_DIR
+from utils.uploads import UploadGrandeDemais, gravar_upload, limite_upload, salvar_imagem_upload
+
+# -----------------------------------------------------------
+# Importação de produtos em lote (CSV/XLSX)
+# -----------------------------------------------------------
+# Colunas: codigo, nome (obrigatórias), descricao, imagem, manual.
+# "imagem" pode ser uma URL ou o nome de um arquivo na pasta de imagens
+# (no app, o ZIP enviado junto com a planilha; dele só são extraídos os
+# arquivos citados na planilha, com nomes conferidos e tamanho limitado).
+# A validação é feita sobre a planilha inteira com operações do pandas;
+# as imagens passam pelos mesmos limites dos uploads (tamanho, pixels) e
+# são gravadas e redimensionadas em um pool de processos; o
+# database é gravado uma vez e tudo vai ao GitHub em um único commit.
+COLUNAS = ["codigo", "nome", "descricao", "imagem", "manual"]
+OBRIGATORIAS = ["codigo", "nome"]
+EXTENSOES_IMAGEM = (".png", ".jpg", ".jpeg")
+MIN_TAREFAS_POOL = 8   # abaixo disso, subir processos custa mais que processar aqui
+MAX_ARQUIVOS_ZIP = 5000
+
+
+def ler_planilha(arquivo, nome_arquivo=None):
+    """
+    Lê CSV (separador detectado) ou XLSX como texto. Retorna um DataFrame
+    com as COLUNAS normalizadas e "linha" (número da linha na planilha).
+    """
+    nome = (nome_arquivo or getattr(arquivo, "name", None) or str(arquivo)).lower()
+    if nome.endswith((".xlsx", ".xlsm")):
+        df = pd.read_excel(arquivo, dtype=str)
+    else:
+        df = pd.read_csv(arquivo, dtype=str, sep=None, engine="python", encoding="utf-8-sig")
+
+    # "Código", "DESCRIÇÃO " etc. viram codigo, descricao
+    df.columns = [dobrar(str(c)).strip().replace(" ", "_") for c in df.columns]
+    faltando = [c for c in OBRIGATORIAS if c not in df.columns]
+    if faltando:
+        raise ValueError(f"Coluna(s) obrigatória(s) ausente(s): {', '.join(faltando)}")
+
+    for coluna in COLUNAS:
+        if coluna not in df.columns:
+            df[coluna] = ""
+    df = df[COLUNAS].fillna("")
+    for coluna in COLUNAS:
+        df[coluna] = df[coluna].astype(str).str.strip()
+    df["linha"] = df.index + 2   # linha 1 é o cabeçalho
+    return df
+
+
+def _eh_url(serie):
+    return serie.str.startswith(("http://", "https://"))
+
+
+def validar(df, codigos_existentes, imagens_disponiveis=None, atualizar=False):
+    """
+    Retorna (validos, erros). `erros` tem as colunas linha, codigo e
+    motivo (o primeiro problema encontrado em cada linha).
+    `imagens_disponiveis`: nomes de arquivo (relativos à pasta de imagens).
+    """
+    motivo = pd.Series("", index=df.index)
+
+    def marcar(mascara, texto):
+        motivo[mascara & (motivo == "")] = texto
+
+    codigo = df["codigo"]
+    imagem = df["imagem"]
+    local = (imagem != "") & ~_eh_url(imagem)
+
+    marcar(codigo == "", "código vazio")
+    # o código vira nome de arquivo (imagens/<codigo>.<ext>)
+    marcar(codigo.str.contains(r"[/\\]") | codigo.str.contains("..", regex=False),
+           "código não pode conter /, \\ ou ..")
+    marcar(df["nome"] == "", "nome vazio")
+    marcar(codigo.duplicated(keep=False), "código repetido na planilha")
+    if not atualizar:
+        marcar(codigo.isin(list(codigos_existentes)), "código já cadastrado")
+    marcar(local & ~imagem.str.lower().str.endswith(EXTENSOES_IMAGEM), "imagem deve ser PNG ou JPG")
+    if imagens_disponiveis is not None:
+        marcar(local & ~imagem.str.replace("\\", "/", regex=False).isin(imagens_disponiveis),
+               "imagem não encontrada")
+
+    erros = df.loc[motivo != "", ["linha", "codigo"]].assign(motivo=motivo[motivo != ""])
+    return df[motivo == ""], erros.reset_index(drop=True)
+
+
+def listar_imagens(pasta):
+    """Nomes (relativos, com "/") de todos os arquivos sob `pasta`."""
+    nomes = set()
+    for raiz, _, arquivos in os.walk(pasta):
+        for arq in arquivos:
+            nomes.add(os.path.relpath(os.path.join(raiz, arq), pasta).replace(os.sep, "/"))
+    return nomes
+
+
+def _nome_seguro(nome):
+    """Caminho relativo, sem "..", raiz ou unidade (não sai da pasta de extração)."""
+    partes = nome.split("/")
+    return not nome.startswith("/") and ":" not in partes[0] and not {"", ".", ".."} & set(partes)
+
+
+def _membros_zip(zf):
+    """{nome com "/": ZipInfo} dos arquivos do ZIP; UploadGrandeDemais se houver arquivos demais."""
+    infos = zf.infolist()
+    if len(infos) > MAX_ARQUIVOS_ZIP:
+        raise UploadGrandeDemais(f"ZIP com mais de {MAX_ARQUIVOS_ZIP} arquivos")
+    return {i.filename.replace("\\", "/"): i for i in infos if not i.is_dir()}
+
+
+def imagens_do_zip(zf):
+    """Nomes (com "/") dos arquivos do ZIP que podem ser extraídos."""
+    return {nome for nome in _membros_zip(zf) if _nome_seguro(nome)}
+
+
+def extrair_imagens(zf, nomes, pasta, limite=None):
+    """
+    Extrai de `zf` para `pasta` só os arquivos `nomes` (os citados na
+    planilha). O tamanho descompactado declarado é conferido antes com o
+    limite dos uploads, e a cópia também é limitada (o cabeçalho pode
+    mentir). Levanta UploadGrandeDemais.
+    """
+    limite = limite_upload() if limite is None else limite
+    membros = _membros_zip(zf)
+    escolhidos = [(nome, membros[nome]) for nome in sorted(set(nomes)) if nome in membros and _nome_seguro(nome)]
+    if sum(info.file_size for _, info in escolhidos) > limite:
+        raise UploadGrandeDemais(f"imagens do ZIP somam mais que o limite de {limite // (1024 * 1024)} MB")
+    restante = limite
+    for nome, info in escolhidos:
+        with zf.open(info) as origem:
+            tamanho, _ = gravar_upload(origem, os.path.join(pasta, *nome.split("/")), limite=restante)
+        restante -= tamanho
+
+
+def _processar_imagem(tarefa):
+    """
+    Grava a imagem em imagens/<codigo>.<ext> e gera as variantes (roda no
+    pool), com os limites de tamanho e de pixels dos uploads.
+    """
+    origem, codigo = tarefa
+    try:
+        ext = os.path.splitext(origem)[1].lower().lstrip(".")
+        ext = "jpg" if ext == "jpeg" else ext
+        destino = os.path.join(IMAGENS_DIR, f"{codigo}.{ext}")
+        with open(origem, "rb") as f:
+            variantes = salvar_imagem_upload(f, destino, ext)
+        return codigo, destino, [destino] + variantes, None
+    except Exception as e:
+        return codigo, None, [], f"falha na imagem: {type(e).__name__}: {e}"
+
+
+def processar_imagens(tarefas, processos=None, ao_progresso=None):
+    """Executa _processar_imagem para cada (origem, codigo); retorna a lista de resultados."""
+    if len(tarefas) < MIN_TAREFAS_POOL:
+        resultados = []
+        for i, tarefa in enumerate(tarefas):
+            resultados.append(_processar_imagem(tarefa))
+            if ao_progresso:
+                ao_progresso(i + 1, len(tarefas))
+        return resultados
+
+    # "spawn": o servidor do Streamlit tem várias threads, e fork() com
+    # threads em andamento pode deixar travas presas nos processos filhos
+    contexto = multiprocessing.get_context("spawn")
+    resultados = []
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as pool:
+        for resultado in pool.map(_processar_imagem, tarefas, chunksize=16):
+            resultados.append(resultado)
+            if ao_progresso:
+                ao_progresso(len(resultados), len(tarefas))
+    return resultados
+
+
+def importar(validos, pasta_imagens=None, processos=None, publicar=True, ao_progresso=None,
+             iniciar_envio=True):
+    """
+    Grava as linhas válidas no database (uma única gravação) e, se
+    `publicar`, agenda um único envio ao GitHub com imagens e database.json.
+    Peças já cadastradas são atualizadas só nos campos preenchidos.
+    Retorna {"importados", "erros" (DataFrame), "job"}.
+    """
+    armazenamento = obter_armazenamento()
+    existentes = armazenamento.mapa_produtos()
+
+    locais = validos[(validos["imagem"] != "") & ~_eh_url(validos["imagem"])]
+    tarefas = [(os.path.join(pasta_imagens or ".", img), cod) for img, cod in zip(locais["imagem"], locais["codigo"])]
+    resultados = processar_imagens(tarefas, processos, ao_progresso)
+
+    imagem_de = {cod: f"{IMAGENS_DIR}/{os.path.basename(dest)}" for cod, dest, _, erro in resultados if erro is None}
+    falhas = {cod: erro for cod, _, _, erro in resultados if erro is not None}
+    arquivos_publicar = [(arq, arq.replace(os.sep, "/")) for _, _, gerados, erro in resultados if erro is None for arq in gerados]
+
+    produtos = []
+    for linha in validos[~validos["codigo"].isin(list(falhas))].to_dict("records"):
+        novo = {c: linha[c] for c in COLUNAS if linha[c]}
+        if novo.get("codigo") in imagem_de:
+            novo["imagem"] = imagem_de[novo["codigo"]]
+        produtos.append({**existentes.get(linha["codigo"], {}), **novo})
+
+    if produtos:
+        armazenamento.upsert_produtos(produtos)
+
+    job = None
+    if publicar and produtos:
+        arquivos_publicar.append((PRODUTOS_FILE, "database/database.json"))
+        job = enfileirar_publicacao(arquivos_publicar, f"Importando {len(produtos)} produto(s) em lote",
+                                    iniciar_envio=iniciar_envio)
+
+    erros = validos[validos["codigo"].isin(list(falhas))][["linha", "codigo"]].assign(
+        motivo=lambda d: d["codigo"].map(falhas)
+    ).reset_index(drop=True)
+    return {"importados": len(produtos), "erros": erros, "job": job}
+
+
+if __name__ == "__main__":
+    # python -m utils.importacao planilha.csv [--imagens PASTA] [--atualizar] [--processos N] [--sem-publicar]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Importa produtos de uma planilha CSV/XLSX.")
+    parser.add_argument("planilha")
+    parser.add_argument("--imagens", help="pasta com os arquivos citados na coluna 'imagem'")
+    parser.add_argument("--atualizar", action="store_true", help="atualiza peças já cadastradas")
+    parser.add_argument("--processos", type=int, default=None)
+    parser.add_argument("--sem-publicar", action="store_true", help="não agenda o envio ao GitHub")
+    args = parser.parse_args()
+
+    df = ler_planilha(args.planilha)
+    disponiveis = listar_imagens(args.imagens) if args.imagens else None
+    validos, erros = validar(df, obter_armazenamento().mapa_produtos(), disponiveis, args.atualizar)
+    print(f"{len(df)} linha(s): {len(validos)} válida(s), {len(erros)} com erro")
+    for e in erros.itertuples():
+        print(f"  linha {e.linha} ({e.codigo or '—'}): {e.motivo}")
+
+    # o envio fica na fila persistente e é feito pelo worker do app
+    resultado = importar(validos, args.imagens, args.processos, publicar=not args.sem_publicar,
+                         iniciar_envio=False)
+    for e in resultado["erros"].itertuples():
+        print(f"  linha {e.linha} ({e.codigo}): {e.motivo}")
+    print(f"{resultado['importados']} produto(s) gravado(s) em {PRODUTOS_FILE}")
+    if resultado["job"] is not None:
+        print(f"envio ao GitHub agendado (job {resultado['job']}); o app fará o envio")
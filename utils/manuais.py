@@ -0,0 +1,286 @@
+import bisect
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.busca import dobrar
+from utils.metricas import contar, cronometrar
+from utils.perfil import registrar_leitura
+from utils.travas import gravar_atomico, trava_arquivo
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # sem pypdf os manuais simplesmente não entram na busca
+    PdfReader = None
+
+# -----------------------------------------------------------
+# Índice do texto dos manuais em PDF
+# -----------------------------------------------------------
+# Formato persistido:
+#   {"arquivos": {"soft starter 360.pdf": {"sha256": ..., "tamanho": ..., "mtime": <mtime_ns>}},
+#    "palavras": {<sha256>: "palavras distintas do pdf, dobradas e ordenadas"}}
+# As palavras ficam guardadas pelo hash do conteúdo: reenviar o mesmo PDF
+# (ou o mesmo manual com outro nome) não o processa de novo, e arquivos
+# com mtime/tamanho inalterados nem são relidos.
+# A extração roda em processos separados, disparada por uma thread em
+# segundo plano; as páginas só consultam o índice já pronto.
+# Em memória, as palavras viram um índice invertido palavra -> {sha256}
+# com o vocabulário ordenado (prefixo via bisect, como em utils/busca.py),
+# montado uma vez a cada mudança do arquivo.
+PDFS_DIR = "pdfs"
+INDICE_MANUAIS_FILE = "database/indice_manuais.json"
+MAX_CARACTERES = 400_000
+PROCESSOS_PADRAO = 2
+
+_indice_lock = threading.Lock()
+_indice_cache = {"chave": None, "indice": None, "invertido": None}
+
+_worker_lock = threading.Lock()
+_worker = {"thread": None, "pendentes": {}, "tudo": False, "backfill_feito": False}   # pendentes: {nome: sha256 ou None}
+_acordar = threading.Event()
+
+
+def _indice_vazio():
+    return {"arquivos": {}, "palavras": {}}
+
+
+def _palavras(texto):
+    """Palavras distintas de um texto já dobrado, ordenadas, separadas por espaço."""
+    return " ".join(sorted(set(texto.split())))
+
+
+def _ler_indice():
+    try:
+        with cronometrar("reposicao_json_leitura_segundos", arquivo="indice_manuais"), \
+                open(INDICE_MANUAIS_FILE, "r", encoding="utf-8") as f:
+            registrar_leitura(os.fstat(f.fileno()).st_size)
+            indice = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return _indice_vazio()
+    indice.setdefault("palavras", {})
+    return indice
+
+
+class IndicePalavras:
+    """Índice invertido palavra -> [sha256] dos manuais."""
+
+    def __init__(self, palavras_por_sha):
+        docs = {}
+        for sha, palavras in palavras_por_sha.items():
+            for palavra in palavras.split():
+                grupo = docs.get(palavra)
+                if grupo is None:
+                    docs[palavra] = [sha]
+                else:
+                    grupo.append(sha)
+        self._docs = docs
+        self._vocabulario = sorted(docs)
+
+    def contendo(self, termos):
+        """sha256 dos manuais em que cada termo aparece como palavra ou início de palavra."""
+        resultado = None
+        for termo in termos:
+            shas = set()
+            i = bisect.bisect_left(self._vocabulario, termo)
+            while i < len(self._vocabulario) and self._vocabulario[i].startswith(termo):
+                shas.update(self._docs[self._vocabulario[i]])
+                i += 1
+            resultado = shas if resultado is None else resultado & shas
+            if not resultado:
+                return set()
+        return resultado or set()
+
+
+def _carregar():
+    """(índice, IndicePalavras), relidos só quando o arquivo muda."""
+    try:
+        st = os.stat(INDICE_MANUAIS_FILE)
+        chave = (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        return _indice_vazio(), IndicePalavras({})
+    with _indice_lock:
+        if _indice_cache["chave"] == chave:
+            contar("reposicao_cache_consultas_total", cache="indice_manuais", resultado="acerto")
+            return _indice_cache["indice"], _indice_cache["invertido"]
+    contar("reposicao_cache_consultas_total", cache="indice_manuais", resultado="falta")
+    indice = _ler_indice()
+    invertido = IndicePalavras(indice["palavras"])
+    with _indice_lock:
+        _indice_cache.update(chave=chave, indice=indice, invertido=invertido)
+    return indice, invertido
+
+
+def carregar_indice():
+    """Índice em memória, relido só quando o arquivo muda."""
+    return _carregar()[0]
+
+
+def _hash_arquivo(caminho):
+    resumo = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+def _extrair_palavras(caminho):
+    """Palavras (dobradas) do texto de um PDF (roda no pool de processos)."""
+    try:
+        leitor = PdfReader(caminho)
+        partes, total = [], 0
+        for pagina in leitor.pages:
+            texto = dobrar(pagina.extract_text() or "")
+            partes.append(texto)
+            total += len(texto) + 1
+            if total >= MAX_CARACTERES:
+                break
+        return _palavras(" ".join(partes)[:MAX_CARACTERES]), None
+    except Exception as e:
+        return "", f"{type(e).__name__}: {e}"
+
+
+def indexar_manuais(arquivos=None, processos=PROCESSOS_PADRAO, hashes=None):
+    """
+    Atualiza o índice com os PDFs indicados (nomes dentro de pdfs/) ou,
+    sem `arquivos`, com todos os da pasta (removendo os que sumiram).
+    `hashes`: {nome: sha256} já calculados (na gravação do upload), para
+    não reler esses arquivos. Retorna a quantidade de PDFs cujo texto foi
+    extraído.
+    """
+    hashes = hashes or {}
+    if PdfReader is None:
+        return 0
+    todos = arquivos is None
+    if todos:
+        arquivos = [n for n in os.listdir(PDFS_DIR) if n.lower().endswith(".pdf")] if os.path.isdir(PDFS_DIR) else []
+
+    indice = _ler_indice()
+    atualizados, extrair = {}, {}
+    for nome in arquivos:
+        caminho = os.path.join(PDFS_DIR, nome)
+        try:
+            st = os.stat(caminho)
+        except FileNotFoundError:
+            continue
+        atual = indice["arquivos"].get(nome)
+        if atual and atual["mtime"] == st.st_mtime_ns and atual["tamanho"] == st.st_size:
+            continue
+        sha = hashes.get(nome) or _hash_arquivo(caminho)
+        atualizados[nome] = {"sha256": sha, "tamanho": st.st_size, "mtime": st.st_mtime_ns}
+        if sha not in indice["palavras"]:
+            extrair[sha] = caminho
+
+    palavras = {}
+    if extrair:
+        # "spawn": o processo do app tem várias threads (ver utils/importacao.py)
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(processos, len(extrair)), mp_context=contexto) as pool:
+            for sha, (texto, erro) in zip(extrair, pool.map(_extrair_palavras, extrair.values())):
+                if erro:
+                    print(f"[manuais] falha ao extrair {extrair[sha]}: {erro}")
+                palavras[sha] = texto
+
+    if not atualizados and not todos:
+        return 0
+    with trava_arquivo(INDICE_MANUAIS_FILE):
+        # relê: outro processo pode ter indexado enquanto extraíamos
+        indice = _ler_indice()
+        indice["arquivos"].update(atualizados)
+        indice["palavras"].update(palavras)
+        if todos:
+            indice["arquivos"] = {n: e for n, e in indice["arquivos"].items()
+                                  if os.path.exists(os.path.join(PDFS_DIR, n))}
+        em_uso = {e["sha256"] for e in indice["arquivos"].values()}
+        indice["palavras"] = {sha: p for sha, p in indice["palavras"].items() if sha in em_uso}
+        with cronometrar("reposicao_json_gravacao_segundos", arquivo="indice_manuais"):
+            gravar_atomico(INDICE_MANUAIS_FILE, json.dumps(indice, ensure_ascii=False).encode("utf-8"))
+    return len(palavras)
+
+
+# -----------------------------------------------------------
+# Indexação em segundo plano
+# -----------------------------------------------------------
+def _loop():
+    while True:
+        _acordar.wait()
+        with _worker_lock:
+            _acordar.clear()
+            tudo, pendentes = _worker["tudo"], _worker["pendentes"]
+            _worker["tudo"], _worker["pendentes"] = False, {}
+        try:
+            hashes = {nome: sha for nome, sha in pendentes.items() if sha}
+            indexar_manuais(None if tudo else sorted(pendentes), hashes=hashes)
+        except Exception as e:
+            print(f"[manuais] erro na indexação: {e}")
+
+
+def agendar_indexacao(arquivos=None, hashes=None):
+    """
+    Pede a indexação de `arquivos` (nomes em pdfs/) ou de todos; retorna
+    na hora. `hashes`: {arquivo: sha256} já conhecidos (ex.: devolvidos por
+    utils/uploads.gravar_upload), usados no lugar de reler o arquivo.
+    """
+    if PdfReader is None:
+        return
+    hashes = {os.path.basename(a): sha for a, sha in (hashes or {}).items()}
+    with _worker_lock:
+        if arquivos is None:
+            _worker["tudo"] = True
+            _worker["pendentes"].update(hashes)
+        else:
+            for nome in (os.path.basename(a) for a in arquivos):
+                _worker["pendentes"][nome] = hashes.get(nome)
+        thread = _worker["thread"]
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(target=_loop, name="indexacao-manuais", daemon=True)
+            thread.start()
+            _worker["thread"] = thread
+    _acordar.set()
+
+
+def garantir_indice():
+    """Na primeira chamada do processo, agenda a indexação dos PDFs ainda fora do índice."""
+    with _worker_lock:
+        if _worker["backfill_feito"]:
+            return
+        _worker["backfill_feito"] = True
+    agendar_indexacao()
+
+
+# -----------------------------------------------------------
+# Consulta
+# -----------------------------------------------------------
+def arquivo_manual(peca):
+    """Nome do PDF em pdfs/ a que o campo "manual" da peça aponta (ou None)."""
+    url = peca.get("manual")
+    if not url:
+        return None
+    return urllib.parse.unquote(os.path.basename(urllib.parse.urlparse(url).path)) or None
+
+
+def buscar_manuais(termos):
+    """
+    Nomes dos PDFs com todos os `termos` (já dobrados), cada um como
+    palavra ou início de palavra.
+    """
+    if not termos:
+        return set()
+    indice, invertido = _carregar()
+    shas = invertido.contendo(termos)
+    if not shas:
+        return set()
+    return {nome for nome, entrada in indice["arquivos"].items() if entrada["sha256"] in shas}
+
+
+if __name__ == "__main__":
+    # python -m utils.manuais -> indexa (ou reindexa o que mudou) todos os PDFs de pdfs/
+    if PdfReader is None:
+        print("pypdf não está instalado: pip install pypdf")
+    else:
+        extraidos = indexar_manuais()
+        indice = _ler_indice()
+        print(f"{extraidos} PDF(s) extraído(s); {len(indice['arquivos'])} no índice {INDICE_MANUAIS_FILE}")
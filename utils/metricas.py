@@ -0,0 +1,258 @@
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import streamlit as st
+
+from utils.travas import gravar_atomico
+
+# -----------------------------------------------------------
+# Métricas operacionais no formato de texto do Prometheus
+# -----------------------------------------------------------
+# Contadores, medidores e histogramas em memória, por processo. Os nomes
+# ficam declarados em METRICAS; os módulos só chamam contar/observar/
+# cronometrar com os rótulos. Exportação (ambas opcionais, em secrets ou
+# variáveis de ambiente):
+#   METRICAS_PORTA   -> servidor HTTP local com GET /metrics
+#                       (METRICAS_HOST, padrão 127.0.0.1);
+#   METRICAS_ARQUIVO -> arquivo .prom regravado a cada METRICAS_INTERVALO
+#                       segundos (para o textfile collector do node_exporter).
+BALDES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+INTERVALO_PADRAO = 15
+SESSAO_EXPIRA_SEGUNDOS = 30 * 60
+
+METRICAS = {
+    "reposicao_github_requisicoes_total": ("counter", "Chamadas à API do GitHub por método e status HTTP (\"erro\" sem resposta)."),
+    "reposicao_github_latencia_segundos": ("histogram", "Duração das chamadas à API do GitHub."),
+    "reposicao_github_retentativas_total": ("counter", "Novas tentativas de operações no GitHub."),
+    "reposicao_github_envios_total": ("counter", "Envios ao GitHub por operação e resultado."),
+    "reposicao_github_arquivos_enviados_total": ("counter", "Arquivos enviados ao GitHub."),
+    "reposicao_github_bytes_enviados_total": ("counter", "Bytes de arquivos enviados ao GitHub."),
+    "reposicao_github_arquivos_ignorados_total": ("counter", "Arquivos não enviados por serem iguais aos do branch."),
+    "reposicao_github_bytes_ignorados_total": ("counter", "Bytes não enviados por serem iguais aos do branch."),
+    "reposicao_github_commits_evitados_total": ("counter", "Publicações sem nenhum arquivo alterado."),
+    "reposicao_github_espera_limite_segundos": ("histogram", "Esperas antes de chamadas para respeitar o limite de requisições."),
+    "reposicao_github_limite_restante": ("gauge", "Último X-RateLimit-Remaining recebido do GitHub."),
+    "reposicao_github_orcamento_retentativas": ("gauge", "Fichas disponíveis para novas tentativas."),
+    "reposicao_fila_jobs_total": ("counter", "Execuções de jobs da fila de publicação por resultado."),
+    "reposicao_fila_jobs": ("gauge", "Jobs na fila de publicação por status."),
+    "reposicao_json_leitura_segundos": ("histogram", "Duração da leitura de arquivos JSON por tipo."),
+    "reposicao_json_gravacao_segundos": ("histogram", "Duração da gravação de arquivos JSON por tipo."),
+    "reposicao_cache_consultas_total": ("counter", "Consultas aos caches em memória por resultado (acerto/falta)."),
+    "reposicao_sessoes_ativas": ("gauge", "Sessões com alguma execução de página nos últimos SESSAO_EXPIRA_SEGUNDOS."),
+}
+
+_lock = threading.Lock()
+_valores = {}      # nome -> {rótulos (tupla ordenada): número ou histograma}
+_medidores = {}    # nome -> função chamada na exportação
+_exportacao_lock = threading.Lock()
+_exportacao = {"iniciada": False, "servidor": None, "porta": None}
+_sessoes = {}      # id da sessão (em session_state) -> time.monotonic() da última execução
+_CHAVE_SESSAO = "_metricas_sessao"
+
+
+def _rotulos(rotulos):
+    return tuple(sorted((k, str(v)) for k, v in rotulos.items()))
+
+
+def contar(nome, valor=1, **rotulos):
+    chave = _rotulos(rotulos)
+    with _lock:
+        serie = _valores.setdefault(nome, {})
+        serie[chave] = serie.get(chave, 0) + valor
+
+
+def definir(nome, valor, **rotulos):
+    with _lock:
+        _valores.setdefault(nome, {})[_rotulos(rotulos)] = valor
+
+
+def observar(nome, valor, **rotulos):
+    chave = _rotulos(rotulos)
+    with _lock:
+        serie = _valores.setdefault(nome, {})
+        hist = serie.get(chave)
+        if hist is None:
+            hist = serie[chave] = {"baldes": [0] * len(BALDES_SEGUNDOS), "soma": 0.0, "contagem": 0}
+        for i, limite in enumerate(BALDES_SEGUNDOS):
+            if valor <= limite:
+                hist["baldes"][i] += 1
+        hist["soma"] += valor
+        hist["contagem"] += 1
+
+
+@contextmanager
+def cronometrar(nome, **rotulos):
+    """Observa a duração do bloco `with` no histograma `nome`."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar(nome, time.perf_counter() - inicio, **rotulos)
+
+
+def registrar_medidor(nome, funcao):
+    """
+    `funcao` é chamada a cada exportação e retorna um número ou uma lista
+    de (rótulos, número).
+    """
+    with _lock:
+        _medidores[nome] = funcao
+
+
+def registrar_sessao():
+    """Marca a sessão atual como ativa; chamado a cada execução de página (perfil.iniciar_execucao)."""
+    sessao = st.session_state.get(_CHAVE_SESSAO)
+    if sessao is None:
+        sessao = st.session_state[_CHAVE_SESSAO] = uuid.uuid4().hex
+    with _lock:
+        _sessoes[sessao] = time.monotonic()
+
+
+def _sessoes_ativas():
+    # sessões sem execução há SESSAO_EXPIRA_SEGUNDOS saem da conta (o
+    # Streamlit não avisa quando uma sessão termina pela API pública)
+    limite = time.monotonic() - SESSAO_EXPIRA_SEGUNDOS
+    with _lock:
+        for sessao in [s for s, visto in _sessoes.items() if visto < limite]:
+            del _sessoes[sessao]
+        return len(_sessoes)
+
+
+registrar_medidor("reposicao_sessoes_ativas", _sessoes_ativas)
+
+
+# -----------------------------------------------------------
+# Formato de texto
+# -----------------------------------------------------------
+def _escapar(valor):
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatar_rotulos(rotulos, extra=()):
+    pares = list(rotulos) + list(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}"
+
+
+def _numero(valor):
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return repr(valor) if isinstance(valor, float) else str(valor)
+
+
+def _coletar_medidores():
+    with _lock:
+        medidores = list(_medidores.items())
+    for nome, funcao in medidores:
+        try:
+            resultado = funcao()
+        except Exception as e:
+            print(f"[metricas] falha no medidor {nome}: {e}")
+            continue
+        if isinstance(resultado, (int, float)):
+            resultado = [({}, resultado)]
+        valores = {_rotulos(r): v for r, v in resultado}
+        with _lock:
+            _valores[nome] = valores
+
+
+def texto_prometheus():
+    """Todas as métricas do processo no formato de exposição do Prometheus."""
+    _coletar_medidores()
+    with _lock:
+        copia = {
+            nome: {r: (dict(v, baldes=list(v["baldes"])) if isinstance(v, dict) else v) for r, v in serie.items()}
+            for nome, serie in _valores.items()
+        }
+    linhas = []
+    for nome in sorted(copia):
+        tipo, ajuda = METRICAS.get(nome, ("untyped", ""))
+        if ajuda:
+            linhas.append(f"# HELP {nome} {ajuda}")
+        linhas.append(f"# TYPE {nome} {tipo}")
+        for rotulos, valor in sorted(copia[nome].items()):
+            if tipo != "histogram":
+                linhas.append(f"{nome}{_formatar_rotulos(rotulos)} {_numero(valor)}")
+                continue
+            for limite, n in zip(BALDES_SEGUNDOS, valor["baldes"]):
+                linhas.append(f"{nome}_bucket{_formatar_rotulos(rotulos, [('le', _numero(float(limite)))])} {n}")
+            linhas.append(f"{nome}_bucket{_formatar_rotulos(rotulos, [('le', '+Inf')])} {valor['contagem']}")
+            linhas.append(f"{nome}_sum{_formatar_rotulos(rotulos)} {_numero(valor['soma'])}")
+            linhas.append(f"{nome}_count{_formatar_rotulos(rotulos)} {valor['contagem']}")
+    return "\n".join(linhas) + "\n"
+
+
+# -----------------------------------------------------------
+# Exportação
+# -----------------------------------------------------------
+def _config(nome, padrao=None):
+    try:
+        valor = st.secrets.get(nome)
+    except Exception:
+        valor = None
+    if valor is None:
+        valor = os.environ.get(nome, padrao)
+    return valor
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        corpo = texto_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def _gravar_periodicamente(caminho, intervalo):
+    while True:
+        try:
+            gravar_atomico(caminho, texto_prometheus().encode("utf-8"))
+        except Exception as e:
+            print(f"[metricas] falha ao gravar {caminho}: {e}")
+        time.sleep(intervalo)
+
+
+def iniciar_exportacao():
+    """
+    Sobe o endpoint e/ou a gravação periódica configurados (uma vez por
+    processo). Retorna a porta do endpoint, ou None.
+    """
+    with _exportacao_lock:
+        if _exportacao["iniciada"]:
+            return _exportacao["porta"]
+        _exportacao["iniciada"] = True
+
+        porta = _config("METRICAS_PORTA")
+        if porta:
+            host = _config("METRICAS_HOST", "127.0.0.1")
+            try:
+                servidor = ThreadingHTTPServer((host, int(porta)), _Handler)
+            except OSError as e:
+                # outro processo do app já ocupa a porta
+                print(f"[metricas] endpoint não iniciado em {host}:{porta}: {e}")
+            else:
+                servidor.daemon_threads = True
+                threading.Thread(target=servidor.serve_forever, name="metricas-http", daemon=True).start()
+                _exportacao["servidor"] = servidor
+                _exportacao["porta"] = servidor.server_address[1]
+
+        arquivo = _config("METRICAS_ARQUIVO")
+        if arquivo:
+            intervalo = float(_config("METRICAS_INTERVALO", INTERVALO_PADRAO))
+            threading.Thread(
+                target=_gravar_periodicamente, args=(arquivo, intervalo), name="metricas-arquivo", daemon=True
+            ).start()
+        return _exportacao["porta"]
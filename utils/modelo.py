@@ -0,0 +1,106 @@
+import sys
+from collections.abc import Mapping
+from typing import NamedTuple
+
+# -----------------------------------------------------------
+# Modelo de peças e catálogos em memória
+# -----------------------------------------------------------
+# Cada peça do database vira um Peca: objeto com __slots__ (sem o dict
+# por instância) e código internado. Não há como alterar uma Peca: não tem
+# __setitem__, e atribuir ou apagar atributos levanta AttributeError (os
+# slots só são preenchidos na construção). Por isso a mesma instância é
+# compartilhada pelo cache do database, pelos catálogos resolvidos, pelos
+# resultados da busca e pelo session_state de todas as sessões; quem
+# precisa alterar uma peça trabalha sobre dict(peca).
+# Peca continua sendo um Mapping: peca["nome"], peca.get("manual"),
+# "manual" in peca, dict(peca) e {**peca} funcionam como no dict de antes.
+CAMPOS = ("codigo", "nome", "descricao", "imagem", "manual")   # em slots, nesta ordem
+_CAMPOS_FIXOS = frozenset(CAMPOS)
+
+
+_definir = object.__setattr__
+
+
+def _internar(valor):
+    return sys.intern(valor) if type(valor) is str else valor
+
+
+class Peca(Mapping):
+    """
+    Peça somente leitura. Os campos comuns ficam em slots (None = ausente);
+    os demais, e os comuns com null explícito, ficam em `extras`.
+    """
+    __slots__ = CAMPOS + ("extras",)
+
+    def __init__(self, codigo=None, nome=None, descricao=None, imagem=None, manual=None, extras=None):
+        _definir(self, "codigo", _internar(codigo))
+        _definir(self, "nome", nome)
+        _definir(self, "descricao", descricao)
+        _definir(self, "imagem", imagem)
+        _definir(self, "manual", manual)
+        _definir(self, "extras", extras or None)
+
+    def __setattr__(self, campo, valor):
+        raise AttributeError(f"Peca é somente leitura (use dict(peca) para alterar): {campo}")
+
+    def __delattr__(self, campo):
+        raise AttributeError(f"Peca é somente leitura: {campo}")
+
+    def __reduce__(self):
+        # pickle/copy recriam pelo construtor (não há como preencher os slots depois)
+        return (Peca, (self.codigo, self.nome, self.descricao, self.imagem, self.manual, self.extras))
+
+    @classmethod
+    def de_dict(cls, dados):
+        """Peca a partir de um dict (ou de outra Peca, devolvida como está)."""
+        if type(dados) is cls:
+            return dados
+        g = dados.get
+        valores = (g("codigo"), g("nome"), g("descricao"), g("imagem"), g("manual"))
+        extras = None
+        if len(dados) != len(CAMPOS) - valores.count(None):
+            # há campos fora dos slots (ou null explícito)
+            extras = {_internar(k): v for k, v in dados.items() if v is None or k not in _CAMPOS_FIXOS}
+        return cls(*valores, extras)
+
+    def com_ajustes(self, ajustes):
+        """Nova Peca com os campos de `ajustes` por cima (a original não muda)."""
+        if not ajustes:
+            return self
+        return Peca.de_dict({**self, **ajustes})
+
+    def __getitem__(self, campo):
+        if campo in _CAMPOS_FIXOS:
+            valor = getattr(self, campo)
+            if valor is not None:
+                return valor
+        if self.extras is not None and campo in self.extras:
+            return self.extras[campo]
+        raise KeyError(campo)
+
+    def __contains__(self, campo):
+        if campo in _CAMPOS_FIXOS and getattr(self, campo) is not None:
+            return True
+        return self.extras is not None and campo in self.extras
+
+    def __iter__(self):
+        for campo in CAMPOS:
+            if getattr(self, campo) is not None:
+                yield campo
+        if self.extras is not None:
+            yield from self.extras
+
+    def __len__(self):
+        return sum(getattr(self, campo) is not None for campo in CAMPOS) + len(self.extras or ())
+
+    def __repr__(self):
+        return f"Peca({dict(self)!r})"
+
+
+class Catalogo(NamedTuple):
+    """
+    Peças de um catálogo já resolvidas no database (utils/resolucao.py).
+    Compartilhado entre sessões; desempacota como (pecas, faltando).
+    """
+    pecas: tuple
+    faltando: tuple
@@ -0,0 +1,171 @@
+import collections
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+try:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:  # versões antigas do Streamlit
+    def get_script_run_ctx():
+        return None
+
+from utils.metricas import registrar_sessao
+
+# -----------------------------------------------------------
+# Perfil por execução de página (opcional)
+# -----------------------------------------------------------
+# Ativado por PERFIL = true em secrets (ou variável de ambiente PERFIL=1).
+# Desativado, cada chamada abaixo custa só a consulta a uma flag.
+# Cada execução (rerun) de uma página acumula em session_state:
+#   - tempo das seções nomeadas (with secao("..."));
+#   - arquivos lidos e bytes (registrar_leitura);
+#   - chamadas HTTP (registrar_http).
+# Só chamadas feitas na thread da página entram na conta; o worker da
+# fila de envios, por exemplo, não. Quando a próxima execução começa, a
+# anterior vai para um histórico comum a todas as sessões.
+# Como a página pode terminar em st.stop(), o total vai do início até o
+# último evento registrado.
+HISTORICO_MAXIMO = 200
+_CHAVE = "_perfil_execucao"
+
+_config = {"ativo": None}
+_historico_lock = threading.Lock()
+_historico = collections.deque(maxlen=HISTORICO_MAXIMO)
+
+
+def ativo():
+    if _config["ativo"] is None:
+        try:
+            valor = st.secrets.get("PERFIL")
+        except Exception:
+            valor = None
+        if valor is None:
+            valor = os.environ.get("PERFIL", "")
+        _config["ativo"] = str(valor).strip().lower() in ("1", "true", "sim", "yes", "on")
+    return _config["ativo"]
+
+
+def _execucao():
+    """Coleta da execução atual, ou None fora da thread de uma página."""
+    if not ativo() or get_script_run_ctx() is None:
+        return None
+    return st.session_state.get(_CHAVE)
+
+
+def _nova_execucao(pagina):
+    agora = time.perf_counter()
+    return {
+        "pagina": pagina,
+        "quando": time.time(),
+        "inicio": agora,
+        "ultimo": agora,
+        "secoes": {},
+        "leituras": 0,
+        "bytes_lidos": 0,
+        "http": 0,
+        "http_segundos": 0.0,
+    }
+
+
+def _resumo(execucao):
+    return {
+        "pagina": execucao["pagina"],
+        "quando": execucao["quando"],
+        "total_ms": (execucao["ultimo"] - execucao["inicio"]) * 1000,
+        "secoes": {nome: dict(s) for nome, s in execucao["secoes"].items()},
+        "leituras": execucao["leituras"],
+        "bytes_lidos": execucao["bytes_lidos"],
+        "http": execucao["http"],
+        "http_ms": execucao["http_segundos"] * 1000,
+    }
+
+
+def _rerun_de_fragmento():
+    ctx = get_script_run_ctx()
+    return bool(getattr(ctx, "fragment_ids_this_run", None))
+
+
+def iniciar_execucao(pagina, fragmento=False):
+    """
+    Chamar no topo de cada página. Fecha a execução anterior da sessão
+    (que vai para o histórico) e começa uma nova. Retorna o resumo da
+    anterior, ou None.
+    Com `fragmento=True` (no início de um st.fragment) só age quando a
+    execução é apenas do fragmento, não da página inteira.
+    """
+    if get_script_run_ctx() is None:
+        return None
+    registrar_sessao()   # conta como sessão ativa mesmo com o perfil desativado
+    if not ativo():
+        return None
+    if fragmento and not _rerun_de_fragmento():
+        return None
+    anterior = st.session_state.get(_CHAVE)
+    resumo = None
+    if anterior is not None:
+        resumo = _resumo(anterior)
+        with _historico_lock:
+            _historico.append(resumo)
+    st.session_state[_CHAVE] = _nova_execucao(pagina)
+    st.session_state["_perfil_ultima"] = resumo
+    return resumo
+
+
+@contextmanager
+def secao(nome):
+    """Soma o tempo do bloco `with` à seção `nome` da execução atual."""
+    execucao = _execucao()
+    if execucao is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        fim = time.perf_counter()
+        atual = execucao["secoes"].setdefault(nome, {"ms": 0.0, "vezes": 0})
+        atual["ms"] += (fim - inicio) * 1000
+        atual["vezes"] += 1
+        execucao["ultimo"] = max(execucao["ultimo"], fim)
+
+
+def registrar_leitura(tamanho):
+    execucao = _execucao()
+    if execucao is not None:
+        execucao["leituras"] += 1
+        execucao["bytes_lidos"] += tamanho
+        execucao["ultimo"] = time.perf_counter()
+
+
+def registrar_http(segundos):
+    execucao = _execucao()
+    if execucao is not None:
+        execucao["http"] += 1
+        execucao["http_segundos"] += segundos
+        execucao["ultimo"] = time.perf_counter()
+
+
+def ultima_execucao():
+    """Resumo da execução anterior desta sessão (a atual ainda não terminou)."""
+    if not ativo():
+        return None
+    return st.session_state.get("_perfil_ultima")
+
+
+def historico():
+    with _historico_lock:
+        return list(_historico)
+
+
+def percentil(valores, p):
+    """Percentil `p` (0-100) com interpolação linear."""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    indice = (len(ordenados) - 1) * p / 100
+    baixo = int(indice)
+    alto = min(baixo + 1, len(ordenados) - 1)
+    return ordenados[baixo] + (ordenados[alto] - ordenados[baixo]) * (indice - baixo)
@@ -0,0 +1,135 @@
+import os
+import threading
+from collections.abc import Mapping
+
+from utils.armazenamento import obter_armazenamento
+from utils.clients import CLIENTES_DIR
+from utils.importDatabase import carregar_database
+from utils.metricas import contar
+from utils.modelo import Catalogo, Peca
+from utils.travas import versao_registro
+
+# -----------------------------------------------------------
+# Catálogos por referência
+# -----------------------------------------------------------
+# Em clientes/*.json, "pecas" guarda só referências ao database:
+#   "6800-90A"                                   -> a peça como está no database
+#   {"codigo": "6800-90A", "ajustes": {...}}     -> com campos próprios do cliente
+# Arquivos antigos trazem a peça inteira ({"codigo", "nome", ...}); ela só
+# é usada se o código não existir mais no database (que é sempre quem vale:
+# só "ajustes" explícitos passam por cima dele).
+# A resolução fica em cache por cliente até o catálogo ou o database mudar.
+# Peças sem ajustes são as próprias instâncias do database (utils/modelo.py),
+# sem cópia por catálogo.
+_cache_lock = threading.Lock()
+_cache = {}
+
+
+def codigo_da_entrada(entrada):
+    if isinstance(entrada, Mapping):
+        return entrada.get("codigo")
+    return entrada
+
+
+def ajustes_da_entrada(entrada):
+    """Campos próprios do cliente ("ajustes") de uma entrada do catálogo."""
+    if not isinstance(entrada, Mapping):
+        return {}
+    return dict(entrada.get("ajustes") or {})
+
+
+def _resolver_entrada(entrada, pecas_bd):
+    codigo = codigo_da_entrada(entrada)
+    base = pecas_bd.get(codigo)
+    if base is not None:
+        return Peca.de_dict(base).com_ajustes(ajustes_da_entrada(entrada))
+    if isinstance(entrada, Mapping) and len(set(entrada) - {"codigo", "ajustes"}) > 0:
+        peca = Peca.de_dict({k: v for k, v in entrada.items() if k != "ajustes"})
+        return peca.com_ajustes(entrada.get("ajustes"))
+    return None
+
+
+def resolver_pecas(dados_cliente, chave=None):
+    """
+    Retorna o Catalogo (pecas, faltando): as peças do catálogo já
+    combinadas com o database e os códigos que não foram encontrados.
+    É compartilhado entre sessões.
+    """
+    pecas_bd = carregar_database()
+    entradas = dados_cliente.get("pecas", [])
+    versao = versao_registro(entradas)
+    chave = chave or dados_cliente.get("cliente", "")
+
+    with _cache_lock:
+        item = _cache.get(chave)
+        if item is not None and item["versao"] == versao and item["bd"] is pecas_bd:
+            contar("reposicao_cache_consultas_total", cache="resolucao", resultado="acerto")
+            return item["catalogo"]
+    contar("reposicao_cache_consultas_total", cache="resolucao", resultado="falta")
+
+    pecas, faltando, vistos = [], [], set()
+    for entrada in entradas:
+        codigo = codigo_da_entrada(entrada)
+        if codigo is None or codigo in vistos:
+            continue
+        vistos.add(codigo)
+        peca = _resolver_entrada(entrada, pecas_bd)
+        if peca is None:
+            faltando.append(codigo)
+        else:
+            pecas.append(peca)
+
+    catalogo = Catalogo(tuple(pecas), tuple(faltando))
+    with _cache_lock:
+        _cache[chave] = {"versao": versao, "bd": pecas_bd, "catalogo": catalogo}
+    return catalogo
+
+
+def referencias(entradas):
+    """
+    Converte as peças de um catálogo para referências. Entradas antigas
+    com a peça inteira só são mantidas se o código não estiver no database;
+    os "ajustes" explícitos são preservados.
+    """
+    pecas_bd = carregar_database()
+    refs, vistos = [], set()
+    for entrada in entradas:
+        codigo = codigo_da_entrada(entrada)
+        if codigo is None or codigo in vistos:
+            continue
+        vistos.add(codigo)
+        if isinstance(entrada, Mapping) and codigo not in pecas_bd:
+            refs.append(dict(entrada))
+        elif ajustes_da_entrada(entrada):
+            refs.append({"codigo": codigo, "ajustes": ajustes_da_entrada(entrada)})
+        else:
+            refs.append(codigo)
+    return refs
+
+
+def migrar_catalogos():
+    """Regrava todos os clientes/*.json no formato por referência."""
+    armazenamento = obter_armazenamento()
+    migrados = []
+    for arq in sorted(os.listdir(CLIENTES_DIR)):
+        if not arq.endswith(".json"):
+            continue
+        caminho = os.path.join(CLIENTES_DIR, arq)
+        dados = armazenamento.carregar_catalogo(caminho)
+        refs = referencias(dados.get("pecas", []))
+        if refs != dados.get("pecas"):
+            armazenamento.salvar_catalogo(caminho, dict(dados, pecas=refs), versao_esperada=versao_registro(dados))
+            migrados.append(caminho)
+    return migrados
+
+
+if __name__ == "__main__":
+    # python -m utils.resolucao migrar -> converte os catálogos para referências
+    import sys
+    if sys.argv[1:] == ["migrar"]:
+        migrados = migrar_catalogos()
+        for caminho in migrados:
+            print(f"migrado: {caminho}")
+        print(f"{len(migrados)} catálogo(s) migrado(s)")
+    else:
+        print("uso: python -m utils.resolucao migrar")
@@ -0,0 +1,150 @@
+import random
+import threading
+import time
+
+import requests
+
+from utils.metricas import contar, observar, registrar_medidor
+
+# -----------------------------------------------------------
+# Novas tentativas e limites de requisições da API do GitHub
+# -----------------------------------------------------------
+# - falhas transitórias (conexão, 429, 5xx e 403 de limite) são repetidas
+#   com espera exponencial com jitter completo, ou pelo Retry-After;
+# - os cabeçalhos X-RateLimit-* de cada resposta são guardados: perto do
+#   fim da cota as chamadas são espaçadas até o reset e, depois de um
+#   bloqueio, esperam o tempo indicado antes de sair;
+# - um orçamento de fichas, comum ao processo, limita as novas
+#   tentativas: cada uma gasta uma ficha e cada resposta bem-sucedida
+#   devolve uma fração. Com o GitHub fora do ar as tentativas acabam logo
+#   e a fila (utils/fila.py) reagenda o job, em vez de cada chamada
+#   insistir sozinha.
+MAX_TENTATIVAS = 4
+ESPERA_BASE = 0.5          # segundos; dobra a cada tentativa
+ESPERA_MAXIMA = 30
+STATUS_TRANSITORIOS = {429, 500, 502, 503, 504}
+ORCAMENTO_MAXIMO = 10      # fichas
+RECARGA_POR_SUCESSO = 0.1
+RESERVA_LIMITE = 20        # abaixo disso as chamadas restantes são distribuídas até o reset
+ESPERA_LIMITE_MAXIMA = 60  # nunca segura uma chamada por mais que isso
+
+_lock = threading.Lock()
+_estado = {"restante": None, "reinicio": None, "bloqueado_ate": 0.0, "fichas": float(ORCAMENTO_MAXIMO)}
+
+
+def _numero(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _limitada(resp):
+    """403/429 por limite de requisições (primário ou secundário)."""
+    if resp.status_code == 429:
+        return True
+    if resp.status_code != 403:
+        return False
+    if resp.headers.get("Retry-After") is not None or resp.headers.get("X-RateLimit-Remaining") == "0":
+        return True
+    try:
+        return "rate limit" in resp.text.lower()
+    except Exception:
+        return False
+
+
+def retentavel(resp):
+    return resp.status_code in STATUS_TRANSITORIOS or _limitada(resp)
+
+
+def registrar_resposta(resp):
+    """Atualiza o estado do limite com os cabeçalhos de `resp`."""
+    agora = time.time()
+    restante = _numero(resp.headers.get("X-RateLimit-Remaining"))
+    reinicio = _numero(resp.headers.get("X-RateLimit-Reset"))
+    retry_after = _numero(resp.headers.get("Retry-After"))
+    with _lock:
+        if restante is not None:
+            _estado["restante"], _estado["reinicio"] = restante, reinicio
+        if _limitada(resp):
+            if retry_after is not None:
+                ate = agora + retry_after
+            elif restante == 0 and reinicio is not None:
+                ate = reinicio
+            else:
+                # limite secundário sem indicação: a documentação pede ao menos um minuto
+                ate = agora + ESPERA_LIMITE_MAXIMA
+            _estado["bloqueado_ate"] = max(_estado["bloqueado_ate"], ate)
+        elif resp.status_code < 400:
+            _estado["fichas"] = min(ORCAMENTO_MAXIMO, _estado["fichas"] + RECARGA_POR_SUCESSO)
+
+
+def espera_limite():
+    """Segundos a esperar antes da próxima chamada para respeitar o limite."""
+    agora = time.time()
+    with _lock:
+        espera = _estado["bloqueado_ate"] - agora
+        restante, reinicio = _estado["restante"], _estado["reinicio"]
+    if espera <= 0 and restante is not None and reinicio is not None and restante < RESERVA_LIMITE:
+        espera = (reinicio - agora) / (restante + 1)
+    return min(max(espera, 0.0), ESPERA_LIMITE_MAXIMA)
+
+
+def aguardar_limite():
+    espera = espera_limite()
+    if espera > 0:
+        observar("reposicao_github_espera_limite_segundos", espera)
+        time.sleep(espera)
+
+
+def _gastar_ficha():
+    with _lock:
+        if _estado["fichas"] < 1:
+            return False
+        _estado["fichas"] -= 1
+        return True
+
+
+def espera_para(tentativa, resp=None):
+    """Retry-After da resposta, se houver; senão espera exponencial com jitter completo."""
+    if resp is not None:
+        retry_after = _numero(resp.headers.get("Retry-After"))
+        if retry_after is not None:
+            return min(retry_after, ESPERA_MAXIMA)
+    return random.uniform(0, min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** tentativa))
+
+
+def executar(chamada, operacao, max_tentativas=MAX_TENTATIVAS):
+    """
+    Chama `chamada()` (que devolve um requests.Response) até obter uma
+    resposta não transitória, esgotar `max_tentativas` ou o orçamento.
+    Devolve a última resposta; se a última tentativa falhou sem resposta,
+    a exceção do requests sobe.
+    """
+    for tentativa in range(max_tentativas):
+        erro, resp = None, None
+        try:
+            resp = chamada()
+        except requests.RequestException as e:
+            erro = e
+        else:
+            if not retentavel(resp):
+                return resp
+        if tentativa + 1 >= max_tentativas or not _gastar_ficha():
+            break
+        contar("reposicao_github_retentativas_total", operacao=operacao)
+        time.sleep(espera_para(tentativa, resp))
+    if resp is None:
+        raise erro
+    return resp
+
+
+def estado_limite():
+    """Cópia do estado atual: restante, reinicio, bloqueado_ate e fichas."""
+    with _lock:
+        return dict(_estado)
+
+
+registrar_medidor("reposicao_github_limite_restante",
+                  lambda: [] if _estado["restante"] is None else _estado["restante"])
+registrar_medidor("reposicao_github_orcamento_retentativas", lambda: _estado["fichas"])
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# -----------------------------------------------------------
+# Travas de arquivo e gravação atômica
+# -----------------------------------------------------------
+# Cada arquivo gravado pelo app tem uma trava consultiva própria em
+# database/.travas/, válida entre processos (flock / msvcrt.locking) e
+# entre threads do mesmo processo. Travas de arquivos diferentes não se
+# bloqueiam: editar peças e editar catálogos seguem em paralelo.
+# A mesma thread pode aninhar trava_arquivo do mesmo caminho: só a chamada
+# mais externa abre e trava o arquivo (um segundo flock em outro descritor
+# esperaria pelo primeiro para sempre); as internas apenas contam o nível.
+TRAVAS_DIR = "database/.travas"
+
+_travas_locais_lock = threading.Lock()
+_travas_locais = {}
+_niveis = threading.local()   # por_caminho: {caminho: profundidade} desta thread
+
+
+def _trava_local(caminho):
+    with _travas_locais_lock:
+        return _travas_locais.setdefault(caminho, threading.Lock())
+
+
+def _arquivo_trava(caminho):
+    nome = os.path.normpath(caminho).replace(os.sep, "__").replace(":", "_")
+    return os.path.join(TRAVAS_DIR, f"{nome}.lock")
+
+
+@contextmanager
+def trava_arquivo(caminho):
+    """
+    Trava exclusiva de `caminho` enquanto o bloco `with` executa.
+    Pode ser aninhada na mesma thread.
+    """
+    caminho_norm = os.path.normpath(caminho)
+    niveis = getattr(_niveis, "por_caminho", None)
+    if niveis is None:
+        niveis = _niveis.por_caminho = {}
+    if niveis.get(caminho_norm):
+        # esta thread já tem a trava (chamada mais externa)
+        niveis[caminho_norm] += 1
+        try:
+            yield
+        finally:
+            niveis[caminho_norm] -= 1
+        return
+
+    with _trava_local(caminho_norm):
+        os.makedirs(TRAVAS_DIR, exist_ok=True)
+        with open(_arquivo_trava(caminho), "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        time.sleep(0.05)
+            niveis[caminho_norm] = 1
+            try:
+                yield
+            finally:
+                niveis[caminho_norm] = 0
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def gravar_atomico(caminho, conteudo):
+    """
+    Grava bytes em um temporário na mesma pasta e troca com os.replace:
+    leitores veem o arquivo antigo ou o novo, nunca um meio-termo.
+    """
+    pasta = os.path.dirname(caminho) or "."
+    os.makedirs(pasta, exist_ok=True)
+    tmp = os.path.join(pasta, f".{os.path.basename(caminho)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, caminho)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def versao_registro(dados):
+    """Impressão digital de uma peça/catálogo para checagem otimista de versão."""
+    if dados is None:
+        return None
+    texto = json.dumps(dados, sort_keys=True, ensure_ascii=False, default=dict)
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import threading
+
+import streamlit as st
+
+from utils.images import abrir_imagem, gerar_variantes
+
+# -----------------------------------------------------------
+# Gravação de arquivos enviados pelas páginas de administração
+# -----------------------------------------------------------
+# O conteúdo é copiado para o disco em blocos (nunca inteiro em memória),
+# com o SHA-256 calculado durante a cópia e o tamanho limitado por
+# UPLOAD_MAX_MB (secrets ou variável de ambiente). O arquivo final só
+# aparece no destino se a cópia terminar: leitores nunca veem um PDF pela
+# metade.
+BLOCO = 1024 * 1024
+UPLOAD_MAX_MB_PADRAO = 50
+
+FORMATOS_IMAGEM = {"jpg": "JPEG", "png": "PNG"}
+
+
+class UploadGrandeDemais(ValueError):
+    pass
+
+
+def limite_upload():
+    """Tamanho máximo de um arquivo enviado, em bytes."""
+    try:
+        valor = st.secrets.get("UPLOAD_MAX_MB")
+    except Exception:
+        valor = None
+    valor = valor or os.environ.get("UPLOAD_MAX_MB") or UPLOAD_MAX_MB_PADRAO
+    return int(float(valor) * 1024 * 1024)
+
+
+def _tamanho_informado(arquivo):
+    """Tamanho do UploadedFile ou, para um arquivo em disco, o do sistema (None se não souber)."""
+    if getattr(arquivo, "size", None) is not None:
+        return arquivo.size
+    try:
+        return os.fstat(arquivo.fileno()).st_size
+    except (AttributeError, OSError):
+        return None
+
+
+def _conferir_tamanho(tamanho, limite):
+    if tamanho > limite:
+        raise UploadGrandeDemais(
+            f"arquivo maior que o limite de {limite // (1024 * 1024)} MB"
+        )
+
+
+def gravar_upload(arquivo, destino, limite=None):
+    """
+    Copia `arquivo` (UploadedFile ou qualquer objeto com read) para
+    `destino` em blocos. Retorna (tamanho, sha256 em hexadecimal).
+    Levanta UploadGrandeDemais se passar de `limite` bytes.
+    """
+    limite = limite_upload() if limite is None else limite
+    # UploadedFile informa o tamanho: recusa antes de copiar qualquer byte
+    if getattr(arquivo, "size", None) is not None:
+        _conferir_tamanho(arquivo.size, limite)
+    if hasattr(arquivo, "seek"):
+        arquivo.seek(0)
+
+    pasta = os.path.dirname(destino) or "."
+    os.makedirs(pasta, exist_ok=True)
+    tmp = os.path.join(pasta, f".{os.path.basename(destino)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    resumo = hashlib.sha256()
+    tamanho = 0
+    try:
+        with open(tmp, "wb") as f:
+            while True:
+                bloco = arquivo.read(BLOCO)
+                if not bloco:
+                    break
+                tamanho += len(bloco)
+                _conferir_tamanho(tamanho, limite)
+                resumo.update(bloco)
+                f.write(bloco)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, destino)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return tamanho, resumo.hexdigest()
+
+
+def salvar_imagem_upload(arquivo, destino, ext, limite=None):
+    """
+    Decodifica a imagem enviada (UploadedFile ou arquivo aberto) com
+    tamanho limitado, grava o original em `destino` (no formato de `ext`)
+    e gera as variantes. Retorna a lista de variantes gravadas.
+    """
+    limite = limite_upload() if limite is None else limite
+    tamanho = _tamanho_informado(arquivo)
+    if tamanho is not None:
+        _conferir_tamanho(tamanho, limite)
+    if hasattr(arquivo, "seek"):
+        arquivo.seek(0)
+
+    imagem = abrir_imagem(arquivo)
+    if ext == "jpg" and imagem.mode in ("RGBA", "P", "LA"):
+        imagem = imagem.convert("RGB")
+    os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+    imagem.save(destino, format=FORMATOS_IMAGEM.get(ext, "PNG"))
+    return gerar_variantes(destino, imagem)